@@ -1,72 +1,197 @@
+import math
 import random
-from dataclasses import dataclass
 from typing import List, Optional, Tuple
 
-import pygame
+import numpy as np
 
 from evolution.beast.brain.brain import Brain
 from evolution.beast.dna.dna import DNA
 from evolution.beast.interact import Action, InputSet, MoveForward, Turn
-from evolution.datastructures.kdtree import KDTree
-from evolution.simulation.render_helpers import draw_dashed_line
+from evolution.beast.lineage import lineage
+from evolution.beast.population import (
+    DESPAWN_TIME,
+    FIGHTING_COOLDOWN,
+    MATE_DETECTION_RANGE,
+    NOT_MOVED_LIMIT,
+    SPEED,
+    Population,
+    PopulationColumn,
+)
+from evolution.datastructures.spatial_index import SpatialIndex
 from evolution.util.math_helpers import get_direction, rand_int_lower_range
-from evolution.world.world import Position, translate
+from evolution.world.world import Position
 
-DESPAWN_TIME = 50
-FIGHTING_COOLDOWN = 100
-NOT_MOVED_LIMIT = 100
 beast_counter = 0
 
 
+def next_ids(count: int) -> np.ndarray:
+    """Reserve ids for `count` new beasts"""
+    global beast_counter
+    ids = np.arange(beast_counter, beast_counter + count, dtype=np.int64)
+    beast_counter += count
+    return ids
+
+
 class Beast:
-    id: int
-    brain: Brain
-    dna: DNA
-    reproduction_cooldown: int = 0
-    fight_cooldown: int = 0
-    dead: int = 0
-    killed: bool = False
-    not_moved: int = 0
+    """
+    A single beast. All numeric state lives in the row of the beast in its `Population`, this object is a view on that
+    row. A new beast starts out in a population of its own, until it is added to the population of the world.
+    """
 
-    position: Position
+    # Views are created for every beast in the spatial index, so they are kept as small as possible
+    __slots__ = ("id", "_dna", "_brain", "_population", "_row", "__weakref__")
+
+    id: int
+    _dna: Optional[DNA]
+    _brain: Optional[Brain]
+    _population: Population
+    _row: int
+
+    x = PopulationColumn("x", int)
+    y = PopulationColumn("y", int)
+    rotation = PopulationColumn("rotation", int)
+    energy = PopulationColumn("energy", float)
+    energy_consumption = PopulationColumn("energy_consumption", float)
+    reproduction_cooldown = PopulationColumn("reproduction_cooldown", int)
+    base_reproduction_cooldown = PopulationColumn("base_reproduction_cooldown", int)
+    fight_cooldown = PopulationColumn("fight_cooldown", int)
+    dead = PopulationColumn("dead", int)
+    killed = PopulationColumn("killed", bool)
+    not_moved = PopulationColumn("not_moved", int)
+    size = PopulationColumn("size", int)
+    speed = PopulationColumn("speed", int)
+    max_turning_rate = PopulationColumn("max_turning_rate", int)
+    fertility = PopulationColumn("fertility", int)
+    mate_detection_range = PopulationColumn("mate_detection_range", int)
+    nearest_distance = PopulationColumn("nearest_distance", float)
+    nearest_direction = PopulationColumn("nearest_direction", int)
 
     def __init__(self, dna: DNA = None, position: Position = None, parents: Tuple["Beast", "Beast"] = None):
         global beast_counter
         self.id = beast_counter
         beast_counter += 1
+        Population(capacity=1).append(self)
+        self._population.id[self._row] = self.id
+
         self.dna = dna if dna else DNA()
         self.position = position if position else Position.random()
 
-        self.parents: Optional[Tuple[Beast, Beast]] = parents
-        self.children: List[Beast] = []
+        if parents is not None:
+            self._population.parent_ids[self._row] = (parents[0].id, parents[1].id)
+        lineage.record_births(np.array([self.id]), self._population.parent_ids[self._row])
 
         self.rotation = random.randint(0, 360)
 
-        self.brain: Brain = Brain(self.dna)
-
-        self.energy: float = self.dna.get_gene("base_energy").get_value()
-        self.size: int = self.dna.get_gene("size").get_value()
-        self.energy_consumption: float = self.dna.get_gene("energy_consumption").get_value() * (self.size / 10)
-        self.color: Tuple[int, int, int] = self.dna.get_gene("color").get_value()
-        self.base_reproduction_cooldown: int = self.dna.get_gene("reproduction_cooldown").get_value()
-        self.fertility: int = self.dna.get_gene("fertility").get_value()
-        self.mate_detection_range: int = 100  # TODO: Make genetic
-        self.speed: int = 5  # TODO: Make genetic
-
-        self.max_turning_rate: int = 90 - self.size * 9
-
-        self.selected: bool = False
-
-        self.input_set: Optional[InputSet] = None
-        self.nearest_mate: Optional[Beast] = None
-
-        font = pygame.font.SysFont("Calibri", 10)
-        self.name = font.render(str(self.id), True, (0, 0, 0))
-        self.name_offset = (self.name.get_width() / 2, self.name.get_height() / 2)
-        self.stats = BeastStats()
+        self._brain = None
+        # The brain itself is only built again when it is looked at, the simulation uses the compiled brain
+        sources, targets, strengths, turn_first = Brain(self.dna).compile()
+        self._population.brain_sources[self._row] = sources
+        self._population.brain_targets[self._row] = targets
+        self._population.brain_strengths[self._row] = strengths
+        self._population.turn_first[self._row] = turn_first
+
+        phenotype = self.dna.phenotype
+        self.energy = phenotype.base_energy
+        self.size = phenotype.size
+        self.energy_consumption = phenotype.energy_consumption * (self.size / 10)
+        self.base_reproduction_cooldown = phenotype.reproduction_cooldown
+        self.fertility = phenotype.fertility
+        self.mate_detection_range = MATE_DETECTION_RANGE
+        self.speed = SPEED
+
+        self.max_turning_rate = 90 - self.size * 9
+
+    @classmethod
+    def view(cls, population: Population, row: int) -> "Beast":
+        """
+        Beast for a row that was filled without creating a beast, as when loading a snapshot or for births. Only the
+        state that is not stored in the population is derived again.
+        """
+        beast = cls.__new__(cls)
+        beast._population = population
+        beast._row = row
+        beast.id = int(population.id[row])
+        beast._dna = None
+        beast._brain = None
+        return beast
+
+    @property
+    def dna(self) -> DNA:
+        if self._dna is None:
+            # Views are created without decoding their DNA, as most of them never need it
+            self._dna = DNA.from_bytes(self._population.dna[self._row].tobytes())
+        return self._dna
+
+    @dna.setter
+    def dna(self, dna: DNA):
+        self._dna = dna
+        self._population.dna[self._row] = np.frombuffer(dna.to_bytes(), dtype=np.uint8)
+
+    @property
+    def brain(self) -> Brain:
+        """Brain of the beast, built on first use as the simulation itself uses the compiled brain in the population"""
+        if self._brain is None:
+            self._brain = Brain(self.dna)
+        return self._brain
+
+    @property
+    def stats(self) -> "BeastStats":
+        """Created on use, the statistics themselves are stored in the population"""
+        return BeastStats(self)
+
+    @property
+    def color(self) -> Tuple[int, int, int]:
+        return self.dna.phenotype.color
+
+    @property
+    def parent_ids(self) -> Optional[Tuple[int, int]]:
+        first, second = self._population.parent_ids[self._row].tolist()
+        return (first, second) if first >= 0 else None
+
+    @property
+    def parents(self) -> Optional[Tuple[int, int]]:
+        """Ids of the parents, looked up in the `lineage` so that beasts do not keep their relatives in memory"""
+        return lineage.parents(self.id)
+
+    @property
+    def children(self) -> List[int]:
+        """Ids of the children, oldest first, see `parents`"""
+        return lineage.children(self.id)
+
+    @property
+    def position(self) -> Position:
+        """Copy of the position of the beast, assign a new position to move it"""
+        return Position(self.x, self.y)
+
+    @position.setter
+    def position(self, position: Position):
+        self.x = position.x
+        self.y = position.y
+
+    @property
+    def nearest_mate(self) -> Optional["Beast"]:
+        row = self._population.nearest[self._row]
+        return self._population[row] if row >= 0 else None
+
+    @nearest_mate.setter
+    def nearest_mate(self, mate: Optional["Beast"]):
+        # Only beasts in the same population can be referenced
+        if mate is not None and mate._population is self._population:
+            self._population.nearest[self._row] = mate._row
+        else:
+            self._population.nearest[self._row] = -1
+
+    @property
+    def input_set(self) -> InputSet:
+        """Inputs of the brain in the last step"""
+        if math.isnan(self.nearest_distance):
+            return InputSet(distance_to_nearest_mate=None, direction_of_nearest_mate=None)
+        return InputSet(
+            distance_to_nearest_mate=self.nearest_distance, direction_of_nearest_mate=self.nearest_direction
+        )
 
     def _reset_energy(self):
-        self.energy = self.dna.get_gene("base_energy").get_value()
+        self.energy = self.dna.phenotype.base_energy
 
     def __str__(self):
         return f"Beast {self.id} (dead status {self.dead})"
@@ -93,7 +218,7 @@ class Beast:
             f"stats: {self.stats}"
         )
 
-    def step(self, tree: KDTree):
+    def step(self, tree: SpatialIndex):
         if self.dead > 0:
             self.dead += 1
         else:
@@ -124,8 +249,6 @@ class Beast:
             new_dna = self.dna.merge(other.dna)
             new_dna.mutate()
             new_beast = Beast(dna=new_dna, position=self.position.copy(), parents=(self, other))
-            self.children.append(new_beast)
-            other.children.append(new_beast)
             new_beast.reset_reproduction_cooldown()
             self.reset_reproduction_cooldown()
             other.reset_reproduction_cooldown()
@@ -179,18 +302,13 @@ class Beast:
     def _can_fight(self) -> bool:
         return not self.dead and self.fight_cooldown == 0
 
-    def _get_inputs(self, tree: KDTree) -> InputSet:
-        nearest_point, distance = tree.find_nearest_neighbour(self.position.tuple(), self)
+    def _get_inputs(self, tree: SpatialIndex) -> InputSet:
+        nearest_point, distance = tree.find_nearest_neighbour(self.position.tuple(), self, self.mate_detection_range)
         nearest_mate = nearest_point.obj if nearest_point else None
         self.nearest_mate = nearest_mate
-        input_set = InputSet(
-            distance_to_nearest_mate=(distance if nearest_mate is not None else None),
-            direction_of_nearest_mate=(
-                self._get_relative_direction(nearest_mate) if nearest_mate is not None else None
-            ),
-        )
-        self.input_set = input_set
-        return input_set
+        self.nearest_distance = distance if nearest_mate is not None else math.nan
+        self.nearest_direction = self._get_relative_direction(nearest_mate) if nearest_mate is not None else 0
+        return self.input_set
 
     def _get_relative_direction(self, mate: "Beast") -> int:
         relative_direction = get_direction(self.position.tuple(), mate.position.tuple()) - self.rotation
@@ -200,49 +318,14 @@ class Beast:
             relative_direction += 360
         return relative_direction
 
-    def draw(self, screen: pygame.surface.Surface, render_nearest_mate: bool = False, render_name: bool = True):
-        if self.dead > 0:
-            self._draw_dead(screen)
-        else:
-            self._draw_beast(screen)
-            if render_nearest_mate:
-                self._draw_to_nearest_mate(screen)
-            if render_name:
-                self._draw_name(screen)
-
-    def _draw_beast(self, screen: pygame.surface.Surface):
-        tail_end = translate(self.position.tuple(), self.rotation - 180, 3 * self.size)
-        pygame.draw.line(screen, (0, 0, 0), self.position.tuple(), tail_end, 3)
-        if self.selected:
-            edge_color = (255, 0, 0)
-            edge_width = 3
-        else:
-            edge_color = (0, 0, 0)
-            edge_width = 1
-        pygame.draw.circle(screen, edge_color, self.position.tuple(), self.size + edge_width)
-        pygame.draw.circle(screen, self.color, self.position.tuple(), self.size)
-
-    def _draw_name(self, screen: pygame.surface.Surface):
-        screen.blit(self.name, (self.position.x - self.name_offset[0], self.position.y - self.name_offset[1]))
-
-    def _draw_dead(self, screen: pygame.surface.Surface):
-        c_val = int((255 / DESPAWN_TIME) * (self.dead - 1))
-        color = (255, c_val, c_val) if self.killed else (c_val, c_val, c_val)
-        pygame.draw.line(screen, color, self.position.tuple(), translate(self.position.tuple(), 180, 10), 3)
-        pygame.draw.line(
-            screen, color, (self.position.x - 3, self.position.y + 3), (self.position.x + 3, self.position.y + 3), 3
-        )
-
-    def _draw_to_nearest_mate(self, screen: pygame.surface.Surface):
-        if self.nearest_mate is not None:
-            draw_dashed_line(screen, self.color, self.position.tuple(), self.nearest_mate.position.tuple(), 1)
-
     def reset_reproduction_cooldown(self):
         self.reproduction_cooldown = self.base_reproduction_cooldown
 
     def _apply_action(self, action: Action) -> float:
         if isinstance(action, MoveForward):
-            self.position.move(self.rotation, self.speed)
+            position = self.position
+            position.move(self.rotation, self.speed)
+            self.position = position
             return self.energy_consumption / 5 * self.speed
         elif isinstance(action, Turn):
             turn_amount = max(-self.max_turning_rate, min(self.max_turning_rate, action.degrees))
@@ -252,11 +335,25 @@ class Beast:
             return 0
 
 
-@dataclass
 class BeastStats:
-    fights: int = 0
-    fights_won: int = 0
-    children: int = 0
+    """Statistics of a beast, stored in the population like the state of the beast itself"""
+
+    fights = PopulationColumn("stats_fights", int)
+    fights_won = PopulationColumn("stats_fights_won", int)
+    children = PopulationColumn("stats_children", int)
+
+    __slots__ = ("beast",)
+
+    def __init__(self, beast: Beast):
+        self.beast = beast
+
+    @property
+    def _population(self) -> Population:
+        return self.beast._population
+
+    @property
+    def _row(self) -> int:
+        return self.beast._row
 
     def __str__(self):
         return f"Fights: {self.fights} (won {self.fights_won})\n" f"Children: {self.children}"
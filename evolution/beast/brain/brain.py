@@ -1,33 +1,23 @@
-import math
 import random
-from typing import Any, Dict, Iterable, List, Tuple, cast
-
-import networkx as nx
-import pygame
-
-from evolution.beast.brain.neuron import (
-    Connection,
-    InputNeuron,
-    InputType,
-    InternalNeuron,
-    Neuron,
-    OutputNeuron,
-    OutputType,
-)
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from evolution.beast.brain.neuron import Connection, InputNeuron, InputType, Neuron, OutputNeuron, OutputType
 from evolution.beast.dna.dna import DNA
-from evolution.beast.dna.gene import NeuronConnectionGene
 from evolution.beast.interact import Action, InputSet, MoveForward, Noop, Turn
-from evolution.util.math_helpers import get_direction, translate
+
+RANDOM_INPUT_MAX = 10
+NEURON_CONNECTION_GENES = ["neuron_connection_1", "neuron_connection_2", "neuron_connection_3", "neuron_connection_4"]
+NUM_CONNECTIONS = len(NEURON_CONNECTION_GENES)
 
 
 class Brain:
     def __init__(self, dna: DNA):
         self.dna: DNA = dna
+        phenotype = self.dna.phenotype
         self.neuron_connections: List[Connection] = [
-            Connection(cast(NeuronConnectionGene, self.dna.get_gene("neuron_connection_1"))),
-            Connection(cast(NeuronConnectionGene, self.dna.get_gene("neuron_connection_2"))),
-            Connection(cast(NeuronConnectionGene, self.dna.get_gene("neuron_connection_3"))),
-            Connection(cast(NeuronConnectionGene, self.dna.get_gene("neuron_connection_4"))),
+            Connection(getattr(phenotype, gene)) for gene in NEURON_CONNECTION_GENES
         ]
 
         self.output_neurons: Dict[OutputType, OutputNeuron] = {}
@@ -39,6 +29,26 @@ class Brain:
                 else:
                     self.output_neurons[connection.neuron_2.neuron_type] = connection.neuron_2
 
+    def compile(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, bool]:
+        """
+        Compile the connections of the brain into arrays with an entry per connection, for evaluation of many brains at
+        once with `step_brains`. Returns the input type, output type and strength of every connection, and whether the
+        turn action is performed before moving forward. The connections of an output are in the order of its
+        `incoming_connections`, which is the order `step` adds them up in.
+        """
+        sources = np.zeros(NUM_CONNECTIONS, dtype=np.int64)
+        targets = np.zeros(NUM_CONNECTIONS, dtype=np.int64)
+        strengths = np.zeros(NUM_CONNECTIONS)
+        for index, connection in enumerate(self.neuron_connections):
+            if not isinstance(connection.neuron_1, InputNeuron):
+                raise NotImplementedError(connection.neuron_1)
+            sources[index] = connection.neuron_1.neuron_type.value
+            targets[index] = connection.neuron_2.neuron_type.value
+            strengths[index] = connection.strength
+
+        turn_first = next(iter(self.output_neurons), None) == OutputType.TURN
+        return sources, targets, strengths, turn_first
+
     def _get_output_neuron(self, neuron: OutputNeuron):
         if neuron.neuron_type not in self.output_neurons:
             self.output_neurons[neuron.neuron_type] = neuron
@@ -74,7 +84,7 @@ class Brain:
         elif neuron.neuron_type == InputType.MATE_DIRECTION:
             return (1 / inputs.direction_of_nearest_mate) * 180 if inputs.direction_of_nearest_mate else 0
         elif neuron.neuron_type == InputType.RANDOM_INPUT:
-            return random.randint(0, 10)
+            return random.randint(0, RANDOM_INPUT_MAX)
         else:
             raise NotImplementedError(neuron.neuron_type)
 
@@ -86,99 +96,62 @@ class Brain:
         else:
             raise NotImplementedError(neuron.neuron_type)
 
-    def get_graph(self) -> nx.DiGraph:
-        G = nx.DiGraph()
-
-        for n in self.neuron_connections:
-            G.add_edge(n.neuron_1, n.neuron_2, strength=n.strength)
-
-        return G
-
-
-class BrainRenderer:
-    NODE_SIZE = 10
-    NEURON_COLORS = {InputNeuron: "red", InternalNeuron: "blue", OutputNeuron: "green"}
-    IMGSIZE = 300
-    MARGIN = 50
-    FIGSIZE = (3, 3)
-    DPI = 100
-
-    def __init__(self):
-        self.font = pygame.font.SysFont("Calibri", 8)
-
-    def draw_brain(self, brain: Brain) -> pygame.surface.Surface:
-        graph = brain.get_graph()
-
-        colors = {node: self.NEURON_COLORS[type(node)] for node in graph.nodes()}
-        labels = {node: node.neuron_type.name for node in graph.nodes()}
-        edge_labels = {(n1, n2): f"{graph[n1][n2]['strength']:.2f}" for n1, n2 in graph.edges()}
-        pos = nx.planar_layout(
-            graph, scale=(self.IMGSIZE / 2) - self.MARGIN, center=(self.IMGSIZE / 2, self.IMGSIZE / 2)
-        )
-
-        surface = pygame.Surface((self.IMGSIZE, self.IMGSIZE))
-        surface.fill("white")
-        self._draw_nodes(surface, graph.nodes(), pos, colors)
-        self._draw_node_labels(surface, graph.nodes(), pos, labels)
-        self._draw_edges(surface, graph.edges(), pos)
-        self._draw_edge_labels(surface, graph.edges(), pos, edge_labels)
-        return surface
-
-    def _draw_nodes(
-        self,
-        surface: pygame.surface.Surface,
-        nodes: Iterable[Neuron],
-        pos: Dict[Neuron, Tuple[int, int]],
-        colors: Dict[Any, str],
-    ):
-        for node in nodes:
-            pygame.draw.circle(
-                surface,
-                colors[node],
-                pos[node],
-                self.NODE_SIZE,
-            )
-
-    def _draw_node_labels(
-        self,
-        surface: pygame.surface.Surface,
-        nodes: Iterable[Any],
-        pos: Dict[Any, Tuple[int, int]],
-        labels: Dict[Any, str],
-    ):
-        for node in nodes:
-            position = pos[node]
-            label = self.font.render(labels[node], True, (0, 0, 0))
-            surface.blit(label, (position[0] - label.get_width() / 2, position[1] + self.font.get_linesize()))
-
-    def _draw_edges(
-        self, surface: pygame.surface.Surface, edges: Iterable[Tuple[Any, Any]], pos: Dict[Any, Tuple[int, int]]
-    ):
-        for node1, node2 in edges:
-            direction = get_direction(pos[node1], pos[node2])
-            begin = translate(pos[node1], direction, self.NODE_SIZE + 1)
-            end = translate(pos[node2], direction, -self.NODE_SIZE + 1)
-            pygame.draw.aaline(surface, "black", begin, end)
-            pygame.draw.polygon(
-                surface,
-                "black",
-                (
-                    (end),
-                    (translate(end, direction + 135, 5)),
-                    (translate(end, direction - 135, 5)),
-                ),
-            )
 
-    def _draw_edge_labels(
-        self,
-        surface: pygame.surface.Surface,
-        edges: Iterable[Tuple[Any, Any]],
-        pos: Dict[Any, Tuple[int, int]],
-        labels: Dict[Tuple[Any, Any], str],
-    ):
-        for node1, node2 in edges:
-            direction = get_direction(pos[node1], pos[node2])
-            distance = math.dist(pos[node1], pos[node2])
-            position = translate(pos[node1], direction, int(distance / 2))
-            label = self.font.render(labels[(node1, node2)], True, (0, 0, 0))
-            surface.blit(label, (position[0] - label.get_width() / 2, position[1] + self.font.get_linesize()))
+def compile_brains(phenotypes: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    `Brain.compile` for many genomes at once, given the gene columns of `GenomeDecoder.decode_genomes`, without
+    building the brains. Returns the input types, output types and strengths of the connections, and whether the turn
+    comes first, with a row per genome.
+    """
+    connections = [phenotypes[gene] for gene in NEURON_CONNECTION_GENES]
+    sources = np.stack([connection["neuron1_type"] % len(InputType) for connection in connections], axis=1)
+    targets = np.stack([connection["neuron2_type"] % len(OutputType) for connection in connections], axis=1)
+    strengths = np.stack([connection["strength"] for connection in connections], axis=1)
+
+    # The output neuron of the first connection is the first one the brain steps
+    turn_first = targets[:, 0] == OutputType.TURN.value
+    return sources.astype(np.int64), targets.astype(np.int64), strengths.astype(np.float64), turn_first
+
+
+def get_input_matrix(distance: np.ndarray, direction: np.ndarray) -> np.ndarray:
+    """
+    Stack the inputs of many beasts into one matrix of beasts x input types, with the same values as
+    `Brain._get_value_from_input_neuron` except that the random input is drawn once per beast instead of once per
+    connection. A distance of NaN means there is no nearest mate.
+    """
+    inputs = np.zeros((len(distance), len(InputType)))
+    inputs[:, InputType.MATE_DISTANCE.value] = np.where(np.isnan(distance), 0, distance)
+    has_direction = direction != 0
+    inputs[has_direction, InputType.MATE_DIRECTION.value] = (1 / direction[has_direction]) * 180
+    inputs[:, InputType.RANDOM_INPUT.value] = np.random.randint(0, RANDOM_INPUT_MAX + 1, len(distance))
+    return inputs
+
+
+def brain_values(inputs: np.ndarray, sources: np.ndarray, targets: np.ndarray, strengths: np.ndarray) -> np.ndarray:
+    """
+    Value of every output of the compiled brains of many beasts, with a row per beast. The connections are added up one
+    by one, in the same order as `Brain.step`, so the values are equal to the last bit.
+    """
+    rows = np.arange(len(inputs))
+    values = np.zeros((len(inputs), len(OutputType)))
+    for connection in range(sources.shape[1]):
+        # Each connection of a beast adds to a single output, so no element is added to twice
+        values[rows, targets[:, connection]] += inputs[rows, sources[:, connection]] * strengths[:, connection]
+    return values
+
+
+def step_brains(
+    inputs: np.ndarray, sources: np.ndarray, targets: np.ndarray, strengths: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Evaluate the compiled brains (see `Brain.compile`) of many beasts at once. Returns per beast whether it moves
+    forward, whether it turns and how many degrees it turns, matching the actions of `Brain.step`.
+
+    The values of the outputs are those of `brain_values`. The random input is one value per beast (see
+    `get_input_matrix`), where `Brain.step` draws a new one for every connection.
+    """
+    values = brain_values(inputs, sources, targets, strengths)
+    move = (targets == OutputType.MOVE_FORWARD.value).any(axis=1) & (values[:, OutputType.MOVE_FORWARD.value] != 0)
+    turn = (targets == OutputType.TURN.value).any(axis=1)
+    degrees = np.round(values[:, OutputType.TURN.value]).astype(np.int64)
+    return move, turn, degrees
@@ -1,9 +1,7 @@
 from dataclasses import dataclass
 from enum import Enum
 from random import randint
-from typing import List, Union, cast
-
-from evolution.beast.dna.gene import NeuronConnectionGene
+from typing import Dict, List, Union, cast
 
 
 class InputType(Enum):
@@ -21,6 +19,8 @@ NeuronType = Union[InputType, OutputType]
 
 
 class Neuron:
+    __slots__ = ("incoming_connections", "outgoing_connections", "neuron_type", "id")
+
     def __init__(self):
         self.incoming_connections: List["Connection"] = []
         self.outgoing_connections: List["Connection"] = []
@@ -39,6 +39,8 @@ class Neuron:
 
 
 class InputNeuron(Neuron):
+    __slots__ = ()
+
     def __init__(self, neuron_type: InputType):
         super().__init__()
         self.neuron_type: InputType = neuron_type
@@ -48,6 +50,8 @@ class InputNeuron(Neuron):
 
 
 class InternalNeuron(Neuron):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
@@ -56,6 +60,8 @@ class InternalNeuron(Neuron):
 
 
 class OutputNeuron(Neuron):
+    __slots__ = ()
+
     def __init__(self, neuron_type: OutputType):
         super().__init__()
         self.neuron_type: OutputType = neuron_type
@@ -64,14 +70,14 @@ class OutputNeuron(Neuron):
         return f"OutputNeuron {self.neuron_type} <{id(self)}>"
 
 
-@dataclass
+@dataclass(slots=True)
 class Connection:
     neuron_1: Neuron
     neuron_2: Neuron
     strength: float
 
-    def __init__(self, gene: NeuronConnectionGene):
-        gene_unpacked = gene.get_value()
+    def __init__(self, gene_unpacked: Dict[str, int | float]):
+        """Connection for the value of a `NeuronConnectionGene`"""
         self.neuron_1 = get_neuron_1(
             cast(int, gene_unpacked["neuron1_class"]), cast(int, gene_unpacked["neuron1_type"])
         )
@@ -1,32 +1,93 @@
+import math
 import random
+from typing import Optional
+
+import numpy as np
 
 from evolution.beast.dna.gene import DNA_LENGTH, Gene, get_gene
+from evolution.beast.dna.phenotype import Phenotype, decoder
+
+DNA_BITS = DNA_LENGTH * 4
+# Lowest bit of every hex character of the genome
+NIBBLE_LOW_BITS = int("1" * DNA_LENGTH, base=16)
+MUTATION_PROBABILITY = 1 / 1001
 
 
 class DNA:
-    dna: str
+    """
+    Genome of DNA_LENGTH hex characters, stored as a single integer. The first hex character of the genome is the most
+    significant one, so the genome reads the same as its hex representation.
+    """
 
-    def __init__(self, dna_str: str = None):
-        if dna_str is not None:
-            self.dna = dna_str
+    genome: int
+
+    def __init__(self, dna_str: Optional[str] = None, genome: Optional[int] = None):
+        if genome is not None:
+            self.genome = genome
+        elif dna_str is not None:
+            self.genome = int(dna_str, base=16)
         else:
-            hex_descriptor = f"%0{DNA_LENGTH}x"
-            self.dna = hex_descriptor % random.randrange(16**DNA_LENGTH)
+            self.genome = random.getrandbits(DNA_BITS)
+        self._phenotype: Optional[Phenotype] = None
+
+    @property
+    def phenotype(self) -> Phenotype:
+        """Values of all genes, decoded on first use"""
+        if self._phenotype is None:
+            self._phenotype = decoder.decode(self.genome)
+        return self._phenotype
+
+    @property
+    def dna(self) -> str:
+        """The genome as a string of hex characters"""
+        return f"{self.genome:0{DNA_LENGTH}x}"
+
+    @classmethod
+    def from_bytes(cls, packed: bytes) -> "DNA":
+        return cls(genome=int.from_bytes(packed, "big"))
+
+    def to_bytes(self) -> bytes:
+        """DNA packed as two hex characters per byte"""
+        return self.genome.to_bytes(DNA_LENGTH // 2, "big")
 
     def merge(self, other: "DNA"):
-        new_string = ""
-        for a, b in zip(self.dna, other.dna):
-            new_string += random.choice([a, b])
-        return DNA(new_string)
+        """Take every hex character from either of the two genomes, with equal chance"""
+        # One random bit per hex character, spread over the whole character
+        mask = (random.getrandbits(DNA_BITS) & NIBBLE_LOW_BITS) * 0xF
+        return DNA(genome=(self.genome & mask) | (other.genome & ~mask))
 
     def mutate(self):
-        new_str = ""
-        for char in self.dna:
-            if random.randint(0, 1000) == 0:
-                new_str += f"{random.randint(0, 16):x}"
-            else:
-                new_str += char
-        self.dna = new_str
+        """Replace every hex character by a random one with a chance of MUTATION_PROBABILITY"""
+        mask = 0
+        # Skip ahead to the next mutated character directly, instead of drawing a random number for every character
+        location = _geometric(MUTATION_PROBABILITY)
+        while location < DNA_LENGTH:
+            # XOR with a uniformly random value gives a uniformly random character
+            mask |= random.getrandbits(4) << ((DNA_LENGTH - 1 - location) * 4)
+            location += 1 + _geometric(MUTATION_PROBABILITY)
+        if mask != 0:
+            self.genome ^= mask
+            self._phenotype = None
 
     def get_gene(self, description: str) -> Gene:
-        return get_gene(self.dna, description)
+        return get_gene(self.genome, description)
+
+
+def merge_genomes(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """`DNA.merge` for rows of packed genomes (see `DNA.to_bytes`), merging every row of `first` with that of `second`"""
+    # One random bit per hex character, spread over the whole character
+    take_first = np.random.randint(0, 2, size=first.shape + (2,), dtype=np.uint8)
+    mask = take_first[..., 0] * np.uint8(0xF0) | take_first[..., 1] * np.uint8(0x0F)
+    return (first & mask) | (second & ~mask)
+
+
+def mutate_genomes(packed: np.ndarray) -> np.ndarray:
+    """`DNA.mutate` for rows of packed genomes, returning the mutated genomes"""
+    mutated = np.random.random_sample(packed.shape + (2,)) < MUTATION_PROBABILITY
+    values = np.random.randint(0, 16, size=packed.shape + (2,), dtype=np.uint8) * mutated
+    return packed ^ (values[..., 0] << np.uint8(4) | values[..., 1])
+
+
+def _geometric(probability: float) -> int:
+    """Number of failures before the first success of repeated trials with the given chance of success"""
+    return int(math.log(1.0 - random.random()) / math.log(1.0 - probability))
@@ -1,66 +1,129 @@
 from dataclasses import dataclass, field
 from typing import Any, Dict, Tuple, Type
 
+import numpy as np
+
 DNA_LENGTH = 128
 GENE_SIZE = 8
+GENE_MASK = (1 << (GENE_SIZE * 4)) - 1
+
+
+def get_bits(genome: int, location: int, length: int) -> int:
+    """
+    Value of the `length` hex characters from `location` on of the genome, with location 0 being the most significant
+    hex character of a genome of DNA_LENGTH hex characters
+    """
+    return (genome >> ((DNA_LENGTH - location - length) * 4)) & ((1 << (length * 4)) - 1)
 
 
 @dataclass
 class Gene:
+    # The dataclasses declare their slots themselves, as `dataclass(slots=True)` breaks `super()` in `__init__`
+    __slots__ = ("value",)
+
     value: int
 
-    def __init__(self, location: int, dna: str):
-        self.value = int(dna[location : location + GENE_SIZE], base=16)
+    def __init__(self, location: int, genome: int):
+        self.value = get_bits(genome, location, GENE_SIZE)
 
     def get_value(self):
         raise NotImplementedError
 
+    @staticmethod
+    def decode(value: int, *args: Any, **kwargs: Any) -> Any:
+        """Value of a gene from its bits, `get_value` without creating a gene"""
+        raise NotImplementedError
+
+    @staticmethod
+    def decode_array(values: np.ndarray, *args: Any, **kwargs: Any) -> np.ndarray:
+        """`decode` for an array of gene bits at once"""
+        raise NotImplementedError
+
 
 @dataclass
 class FloatGene(Gene):
-    min: float = 0.0
-    max: float = 1.0
+    __slots__ = ("min", "max")
+
+    min: float
+    max: float
 
-    def __init__(self, location: int, dna: str, min: float = 0.0, max: float = 1.0):
+    def __init__(self, location: int, genome: int, min: float = 0.0, max: float = 1.0):
         self.min = min
         self.max = max
-        super().__init__(location, dna)
+        super().__init__(location, genome)
 
     def get_value(self) -> float:
-        scaled = float(self.value) / 2 ** (GENE_SIZE * 4)
-        return (scaled * (self.max - self.min)) + self.min
+        return self.decode(self.value, self.min, self.max)
+
+    @staticmethod
+    def decode(value: int, min: float = 0.0, max: float = 1.0) -> float:
+        scaled = float(value) / 2 ** (GENE_SIZE * 4)
+        return (scaled * (max - min)) + min
+
+    @staticmethod
+    def decode_array(values: np.ndarray, min: float = 0.0, max: float = 1.0) -> np.ndarray:
+        scaled = values.astype(np.float64) / 2 ** (GENE_SIZE * 4)
+        return (scaled * (max - min)) + min
 
 
 @dataclass
 class IntGene(Gene):
-    min: int = 0
-    max: int = 100
+    __slots__ = ("min", "max")
 
-    def __init__(self, location: int, dna: str, min: int = 0, max: int = 100):
+    min: int
+    max: int
+
+    def __init__(self, location: int, genome: int, min: int = 0, max: int = 100):
         self.min = min
         self.max = max
-        super().__init__(location, dna)
+        super().__init__(location, genome)
 
     def get_value(self) -> int:
-        scaled = float(self.value / 2 ** (GENE_SIZE * 4))
-        return int(scaled * (self.max - self.min)) + self.min
+        return self.decode(self.value, self.min, self.max)
+
+    @staticmethod
+    def decode(value: int, min: int = 0, max: int = 100) -> int:
+        scaled = float(value / 2 ** (GENE_SIZE * 4))
+        return int(scaled * (max - min)) + min
+
+    @staticmethod
+    def decode_array(values: np.ndarray, min: int = 0, max: int = 100) -> np.ndarray:
+        scaled = values.astype(np.float64) / 2 ** (GENE_SIZE * 4)
+        return (scaled * (max - min)).astype(np.int64) + min
 
 
 @dataclass
 class Tuple3Gene(Gene):
-    def __init__(self, location: int, dna: str):
-        self.value = int(dna[location : location + 8], base=16)
+    __slots__ = ()
+
+    def __init__(self, location: int, genome: int):
+        self.value = get_bits(genome, location, 8)
 
     def get_value(self) -> Tuple[int, int, int]:
-        return (self.value & 0xFF, (self.value & 0xFF00) >> 8, (self.value & 0xFF0000) >> 16)
+        return self.decode(self.value)
+
+    @staticmethod
+    def decode(value: int) -> Tuple[int, int, int]:
+        return (value & 0xFF, (value & 0xFF00) >> 8, (value & 0xFF0000) >> 16)
+
+    @staticmethod
+    def decode_array(values: np.ndarray) -> np.ndarray:
+        """One row of three values per gene"""
+        values = values.astype(np.int64)
+        return np.stack([values & 0xFF, (values & 0xFF00) >> 8, (values & 0xFF0000) >> 16], axis=-1)
 
 
 @dataclass
 class NeuronConnectionGene(Gene):
-    def __init__(self, location: int, dna: str, min: float, max: float):
+    __slots__ = ("min", "max")
+
+    min: float
+    max: float
+
+    def __init__(self, location: int, genome: int, min: float, max: float):
         self.min = min
         self.max = max
-        super().__init__(location, dna)
+        super().__init__(location, genome)
 
     def get_value(self) -> Dict[str, int | float]:
         """
@@ -71,14 +134,41 @@ class NeuronConnectionGene(Gene):
         bit 8  - bit 12  (5 bits): neuron 2 type
         bit 13 - bit 32 (20 bits): strength of connection (scaled to range(min, max))
         """
+        return self.decode(self.value, self.min, self.max)
+
+    @staticmethod
+    def decode(value: int, min: float, max: float) -> Dict[str, int | float]:
         return {
-            "neuron1_class": int(self.value >> 31),
-            "neuron1_type": int(self.value >> 26 & 31),
-            "neuron2_class": int(self.value >> 25 & 1),
-            "neuron2_type": int(self.value >> 20 & 31),
-            "strength": (float(self.value & 0xFFFFF) / 0xFFFFF * (self.max - self.min)) + self.min,
+            "neuron1_class": int(value >> 31),
+            "neuron1_type": int(value >> 26 & 31),
+            "neuron2_class": int(value >> 25 & 1),
+            "neuron2_type": int(value >> 20 & 31),
+            "strength": (float(value & 0xFFFFF) / 0xFFFFF * (max - min)) + min,
         }
 
+    @staticmethod
+    def decode_array(values: np.ndarray, min: float, max: float) -> np.ndarray:
+        """Structured array with the same fields as the dictionary of `decode`"""
+        values = values.astype(np.int64)
+        decoded = np.zeros(values.shape, dtype=CONNECTION_DTYPE)
+        decoded["neuron1_class"] = values >> 31
+        decoded["neuron1_type"] = values >> 26 & 31
+        decoded["neuron2_class"] = values >> 25 & 1
+        decoded["neuron2_type"] = values >> 20 & 31
+        decoded["strength"] = ((values & 0xFFFFF) / 0xFFFFF * (max - min)) + min
+        return decoded
+
+
+CONNECTION_DTYPE = np.dtype(
+    [
+        ("neuron1_class", np.int64),
+        ("neuron1_type", np.int64),
+        ("neuron2_class", np.int64),
+        ("neuron2_type", np.int64),
+        ("strength", np.float64),
+    ]
+)
+
 
 @dataclass
 class DNAStructure:
@@ -101,6 +191,6 @@ dna_structure: Dict[str, DNAStructure] = {
 }
 
 
-def get_gene(dna_str: str, description: str) -> Gene:
+def get_gene(genome: int, description: str) -> Gene:
     structure = dna_structure[description]
-    return structure.type(structure.location, dna_str, **structure.args)
+    return structure.type(structure.location, genome, **structure.args)
@@ -0,0 +1,92 @@
+from functools import partial
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from evolution.beast.dna.gene import DNA_LENGTH, GENE_MASK, GENE_SIZE, DNAStructure, dna_structure
+
+
+class Phenotype:
+    """Values of all genes of a genome, see `GenomeDecoder`"""
+
+    __slots__ = (
+        "base_energy",
+        "energy_consumption",
+        "size",
+        "color",
+        "reproduction_cooldown",
+        "fertility",
+        "neuron_connection_1",
+        "neuron_connection_2",
+        "neuron_connection_3",
+        "neuron_connection_4",
+    )
+
+    base_energy: int
+    energy_consumption: float
+    size: int
+    color: Tuple[int, int, int]
+    reproduction_cooldown: int
+    fertility: int
+    neuron_connection_1: Dict[str, int | float]
+    neuron_connection_2: Dict[str, int | float]
+    neuron_connection_3: Dict[str, int | float]
+    neuron_connection_4: Dict[str, int | float]
+
+    def __init__(self, *values: Any):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"Phenotype({values})"
+
+
+class GenomeDecoder:
+    """
+    Decoder for all genes of a DNA structure at once. The location and decoding of every gene are looked up once when
+    the decoder is made, so decoding a genome is a shift, a mask and a call per gene.
+    """
+
+    def __init__(self, structure: Dict[str, DNAStructure]):
+        if set(structure) != set(Phenotype.__slots__):
+            raise ValueError(f"The genes {sorted(structure)} do not match the phenotype {Phenotype.__slots__}")
+        self.structure = structure
+        # Shift of the lowest bit and decoding function of every gene, in the order of the phenotype fields
+        self._genes: List[Tuple[int, Callable[[int], Any]]] = [
+            (
+                (DNA_LENGTH - structure[name].location - GENE_SIZE) * 4,
+                partial(structure[name].type.decode, **structure[name].args),
+            )
+            for name in Phenotype.__slots__
+        ]
+
+    def decode(self, genome: int) -> Phenotype:
+        return Phenotype(*[decode(genome >> shift & GENE_MASK) for shift, decode in self._genes])
+
+    def decode_genomes(self, packed: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Decode many genomes at once, given as an array with the packed bytes of one genome per row (see
+        `DNA.to_bytes`). Returns a column per gene, with a row per genome.
+        """
+        return {name: self.decode_gene(packed, name) for name in self.structure}
+
+    def decode_gene(self, packed: np.ndarray, name: str) -> np.ndarray:
+        """Decode a single gene of many genomes at once, see `decode_genomes`"""
+        structure = self.structure[name]
+        return structure.type.decode_array(_gene_bits(packed, structure.location), **structure.args)
+
+
+def _gene_bits(packed: np.ndarray, location: int) -> np.ndarray:
+    """Bits of the gene at `location` (in hex characters) of every row of packed genomes"""
+    first_byte = location // 2
+    last_byte = (location + GENE_SIZE - 1) // 2
+    values = np.zeros(len(packed), dtype=np.uint64)
+    for byte in range(first_byte, last_byte + 1):
+        values = (values << np.uint64(8)) | packed[:, byte].astype(np.uint64)
+    # Drop the low hex character of the last byte if the gene ends halfway through it
+    trailing_characters = (last_byte + 1) * 2 - (location + GENE_SIZE)
+    return (values >> np.uint64(trailing_characters * 4)) & np.uint64(GENE_MASK)
+
+
+decoder = GenomeDecoder(dna_structure)
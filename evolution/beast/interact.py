@@ -6,13 +6,13 @@ class Action:
     pass
 
 
-@dataclass
+@dataclass(slots=True)
 class InputSet:
     distance_to_nearest_mate: Optional[float]
     direction_of_nearest_mate: Optional[float]
 
     def all_none(self):
-        return all([val is None for val in vars(self).values()])
+        return all(getattr(self, name) is None for name in self.__slots__)
 
     def __str__(self):
         distance = f"{self.distance_to_nearest_mate:.2f}" if self.distance_to_nearest_mate is not None else "-"
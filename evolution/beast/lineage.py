@@ -0,0 +1,133 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+MIN_CAPACITY = 1024
+# Once there are more records, the oldest dead beasts are forgotten
+MAX_RECORDS = 2**22
+
+
+class Lineage:
+    """
+    Append-only table of the beasts that came into the world: their id, the ids of their parents, and the steps they
+    were born and died at. Beasts only refer to their relatives by id, so dead beasts can be freed while their history
+    takes 24 bytes per beast (plus the id to look it up by) in arrays that grow by doubling.
+
+    Records are kept sorted by id, which is the order in which beasts are created, so a lookup is a binary search. Steps
+    are counted by `advance`, and are -1 for beasts that have not died.
+
+    Only dead beasts are forgotten, and beasts are only marked dead by the population they live in. A beast that is
+    created but never added to the world, like a `Beast.reproduce` child in a test or benchmark, keeps its record for
+    as long as the lineage lives.
+    """
+
+    def __init__(self, max_records: int = MAX_RECORDS):
+        self.max_records = max_records
+        self.step = 0
+        self.length = 0
+        self._ids = np.empty(MIN_CAPACITY, dtype=np.int64)
+        self._parents = np.empty((MIN_CAPACITY, 2), dtype=np.int64)
+        self._born = np.empty(MIN_CAPACITY, dtype=np.int32)
+        self._died = np.empty(MIN_CAPACITY, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return self.length
+
+    @property
+    def nbytes(self) -> int:
+        return self._ids.nbytes + self._parents.nbytes + self._born.nbytes + self._died.nbytes
+
+    def advance(self):
+        self.step += 1
+
+    def record_births(self, ids: np.ndarray, parent_ids: np.ndarray):
+        """
+        Record beasts that came into the world in this step, with a row of two parent ids per beast, -1 for beasts that
+        were not born. Beasts that are already known keep their record.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        parent_ids = np.asarray(parent_ids, dtype=np.int64).reshape(-1, 2)
+        new = self._rows(ids) < 0
+        ids = ids[new]
+        if len(ids) == 0:
+            return
+
+        start = self.length
+        end = start + len(ids)
+        self._reserve(end)
+        self._ids[start:end] = ids
+        self._parents[start:end] = parent_ids[new]
+        self._born[start:end] = self.step
+        self._died[start:end] = -1
+        self.length = end
+        if np.any(np.diff(self._ids[max(start - 1, 0) : end]) < 0):
+            self._sort()
+        if self.length > self.max_records:
+            self._forget_oldest()
+
+    def record_deaths(self, ids: np.ndarray):
+        """Record that the beasts died in this step, unless they already died before"""
+        rows = self._rows(np.asarray(ids, dtype=np.int64))
+        rows = rows[rows >= 0]
+        rows = rows[self._died[rows] < 0]
+        self._died[rows] = self.step
+
+    def parents(self, beast_id: int) -> Optional[Tuple[int, int]]:
+        """Ids of the parents of a beast, None if it was not born or is not known"""
+        row = int(self._rows(np.array([beast_id]))[0])
+        if row < 0 or self._parents[row, 0] < 0:
+            return None
+        first, second = self._parents[row].tolist()
+        return (first, second)
+
+    def children(self, beast_id: int) -> List[int]:
+        """Ids of the children of a beast, oldest first"""
+        parents = self._parents[: self.length]
+        return self._ids[: self.length][(parents[:, 0] == beast_id) | (parents[:, 1] == beast_id)].tolist()
+
+    def birth_step(self, beast_id: int) -> Optional[int]:
+        row = int(self._rows(np.array([beast_id]))[0])
+        return int(self._born[row]) if row >= 0 else None
+
+    def death_step(self, beast_id: int) -> Optional[int]:
+        row = int(self._rows(np.array([beast_id]))[0])
+        return int(self._died[row]) if row >= 0 and self._died[row] >= 0 else None
+
+    def _rows(self, ids: np.ndarray) -> np.ndarray:
+        """Row of the record of every id, -1 for unknown ids"""
+        known = self._ids[: self.length]
+        rows = np.searchsorted(known, ids)
+        found = rows < self.length
+        found[found] = known[rows[found]] == ids[found]
+        return np.where(found, rows, -1)
+
+    def _reserve(self, length: int):
+        if length <= len(self._ids):
+            return
+        capacity = max(length, 2 * len(self._ids))
+        for name in ("_ids", "_parents", "_born", "_died"):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[: self.length] = old[: self.length]
+            setattr(self, name, new)
+
+    def _sort(self):
+        self._keep(np.argsort(self._ids[: self.length], kind="stable"))
+
+    def _forget_oldest(self):
+        """Forget the oldest dead beasts until a quarter of the records is free, so forgetting is rare"""
+        excess = self.length - 3 * self.max_records // 4
+        dead = self._died[: self.length] >= 0
+        forget = dead & (np.cumsum(dead) <= excess)
+        self._keep(np.flatnonzero(~forget))
+
+    def _keep(self, rows: np.ndarray):
+        """Keep the records of `rows`, in that order"""
+        for name in ("_ids", "_parents", "_born", "_died"):
+            array = getattr(self, name)
+            array[: len(rows)] = array[rows]
+        self.length = len(rows)
+
+
+# Shared by all populations, beasts are recorded when they are created or born, see `Beast` and `Population.add_births`
+lineage = Lineage()
@@ -0,0 +1,463 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Protocol, Tuple, cast
+
+import numpy as np
+
+from evolution.beast.brain.brain import NUM_CONNECTIONS, compile_brains, get_input_matrix, step_brains
+from evolution.beast.dna.dna import merge_genomes, mutate_genomes
+from evolution.beast.dna.gene import DNA_LENGTH
+from evolution.beast.dna.phenotype import decoder
+from evolution.beast.lineage import lineage
+from evolution.datastructures.spatial_index import SpatialIndex
+from evolution.util.math_helpers import get_directions
+from evolution.util.profiling import step_timers
+from evolution.world.world import BORDER_BUFFER, world
+
+if TYPE_CHECKING:
+    from evolution.beast.beast import Beast
+
+DESPAWN_TIME = 50
+FIGHTING_COOLDOWN = 100
+NOT_MOVED_LIMIT = 100
+MATE_DETECTION_RANGE = 100  # TODO: Make genetic
+SPEED = 5  # TODO: Make genetic
+
+
+@dataclass
+class ColumnSpec:
+    dtype: Any
+    shape: Tuple[int, ...] = ()
+    default: Any = 0
+
+
+# Per beast state stored in the population. A column has one entry of the given shape per beast.
+COLUMNS: Dict[str, ColumnSpec] = {
+    "id": ColumnSpec(np.int64),
+    # Ids of the parents, -1 for beasts that were not born
+    "parent_ids": ColumnSpec(np.int64, (2,), default=-1),
+    # DNA packed as two hex characters per byte, see `DNA.to_bytes`
+    "dna": ColumnSpec(np.uint8, (DNA_LENGTH // 2,)),
+    "x": ColumnSpec(np.int64),
+    "y": ColumnSpec(np.int64),
+    "rotation": ColumnSpec(np.int64),
+    "energy": ColumnSpec(np.float64),
+    "energy_consumption": ColumnSpec(np.float64),
+    "reproduction_cooldown": ColumnSpec(np.int64),
+    "base_reproduction_cooldown": ColumnSpec(np.int64),
+    "fight_cooldown": ColumnSpec(np.int64),
+    "dead": ColumnSpec(np.int64),
+    "killed": ColumnSpec(np.bool_),
+    "not_moved": ColumnSpec(np.int64),
+    "size": ColumnSpec(np.int64),
+    "speed": ColumnSpec(np.int64),
+    "max_turning_rate": ColumnSpec(np.int64),
+    "fertility": ColumnSpec(np.int64),
+    "mate_detection_range": ColumnSpec(np.int64),
+    # Row of the nearest mate, -1 if there is none
+    "nearest": ColumnSpec(np.int64, default=-1),
+    # Inputs of the last step, see `Beast.input_set`
+    "nearest_distance": ColumnSpec(np.float64, default=np.nan),
+    "nearest_direction": ColumnSpec(np.int64),
+    # Compiled brain, with an entry per connection, see `Brain.compile`
+    "brain_sources": ColumnSpec(np.int64, (NUM_CONNECTIONS,)),
+    "brain_targets": ColumnSpec(np.int64, (NUM_CONNECTIONS,)),
+    "brain_strengths": ColumnSpec(np.float64, (NUM_CONNECTIONS,)),
+    "turn_first": ColumnSpec(np.bool_),
+    # See `BeastStats`
+    "stats_fights": ColumnSpec(np.int64),
+    "stats_fights_won": ColumnSpec(np.int64),
+    "stats_children": ColumnSpec(np.int64),
+}
+
+MIN_CAPACITY = 16
+
+
+class PopulationRow(Protocol):
+    """A row in a population, such as a `Beast` or its `BeastStats`"""
+
+    @property
+    def _population(self) -> "Population":
+        ...
+
+    @property
+    def _row(self) -> int:
+        ...
+
+
+class PopulationColumn:
+    """
+    Descriptor exposing one population column as an attribute of a `Beast`, reading from and writing to the row of the
+    beast in the population it belongs to.
+    """
+
+    def __init__(self, column: str, cast: Callable[[Any], Any]):
+        self.column = column
+        self.cast = cast
+
+    def __get__(self, beast: Optional[PopulationRow], owner: Any = None) -> Any:
+        if beast is None:
+            return self
+        return self.cast(getattr(beast._population, self.column)[beast._row])
+
+    def __set__(self, beast: PopulationRow, value: Any):
+        getattr(beast._population, self.column)[beast._row] = value
+
+
+class Population:
+    """
+    Structure-of-arrays store for all beasts, with one row per beast. Rows are kept in the order in which beasts were
+    added, so the population can be used like the list of beasts it replaces.
+
+    `Beast` objects are thin views on their row. A beast belongs to exactly one population: appending it to another
+    population moves its row, and removing it moves its row into a private population of its own so that references
+    to it (for example from the UI) stay valid. Rows that were filled directly, as when loading a snapshot, only get
+    their view when the beast is first accessed.
+    """
+
+    # The arrays of COLUMNS, with room for `capacity` beasts of which the first `length` are in use
+    id: np.ndarray
+    parent_ids: np.ndarray
+    dna: np.ndarray
+    x: np.ndarray
+    y: np.ndarray
+    rotation: np.ndarray
+    energy: np.ndarray
+    energy_consumption: np.ndarray
+    reproduction_cooldown: np.ndarray
+    base_reproduction_cooldown: np.ndarray
+    fight_cooldown: np.ndarray
+    dead: np.ndarray
+    killed: np.ndarray
+    not_moved: np.ndarray
+    size: np.ndarray
+    speed: np.ndarray
+    max_turning_rate: np.ndarray
+    fertility: np.ndarray
+    mate_detection_range: np.ndarray
+    nearest: np.ndarray
+    nearest_distance: np.ndarray
+    nearest_direction: np.ndarray
+    brain_sources: np.ndarray
+    brain_targets: np.ndarray
+    brain_strengths: np.ndarray
+    turn_first: np.ndarray
+    stats_fights: np.ndarray
+    stats_fights_won: np.ndarray
+    stats_children: np.ndarray
+
+    def __init__(self, beasts: Iterable["Beast"] = (), capacity: int = MIN_CAPACITY):
+        self.length = 0
+        self.capacity = max(capacity, 1)
+        for name, spec in COLUMNS.items():
+            setattr(self, name, np.zeros((self.capacity,) + spec.shape, dtype=spec.dtype))
+        # None for the rows without a view yet
+        self.beasts: List[Optional["Beast"]] = []
+        self._num_without_view = 0
+        self.extend(beasts)
+
+    @classmethod
+    def from_columns(cls, length: int, columns: Dict[str, np.ndarray]) -> "Population":
+        """Population of `length` beasts with the given column values, columns that are not given get their default"""
+        population = cls(capacity=length)
+        for name, spec in COLUMNS.items():
+            getattr(population, name)[:length] = columns[name] if name in columns else spec.default
+        population.length = length
+        population.beasts = [None] * length
+        population._num_without_view = length
+        return population
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self) -> Iterator["Beast"]:
+        if self._num_without_view == 0:
+            # Every beast has a view
+            return iter(cast(List["Beast"], self.beasts))
+        return (self[row] for row in range(self.length))
+
+    def __getitem__(self, index: int) -> "Beast":
+        beast = self.beasts[index]
+        if beast is None:
+            beast = self._create_view(range(self.length)[index])
+        return beast
+
+    def _create_view(self, row: int) -> "Beast":
+        from evolution.beast.beast import Beast
+
+        beast = Beast.view(self, row)
+        self.beasts[row] = beast
+        self._num_without_view -= 1
+        return beast
+
+    def __contains__(self, beast: Any) -> bool:
+        return getattr(beast, "_population", None) is self
+
+    def __iadd__(self, beasts: Iterable["Beast"]) -> "Population":
+        self.extend(beasts)
+        return self
+
+    def column(self, name: str) -> np.ndarray:
+        """View on the column for the beasts currently in the population"""
+        return getattr(self, name)[: self.length]
+
+    def append(self, beast: "Beast"):
+        previous: Optional[Population] = getattr(beast, "_population", None)
+        if previous is self:
+            raise ValueError(f"{beast} is already part of this population")
+
+        self._reserve(self.length + 1)
+        row = self.length
+        for name, spec in COLUMNS.items():
+            getattr(self, name)[row] = getattr(previous, name)[beast._row] if previous is not None else spec.default
+        # Rows of the previous population are meaningless here
+        self.nearest[row] = -1
+
+        beast._population = self
+        beast._row = row
+        self.beasts.append(beast)
+        self.length += 1
+
+    def extend(self, beasts: Iterable["Beast"]):
+        for beast in beasts:
+            self.append(beast)
+
+    def spawn(
+        self,
+        packed_dna: np.ndarray,
+        x: np.ndarray,
+        y: np.ndarray,
+        ids: np.ndarray,
+        parent_ids: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Add new beasts with the given packed DNA (see `DNA.to_bytes`) and position at once, set up as `Beast.__init__`
+        does. Returns the rows of the new beasts, their `Beast` views are only created when they are first accessed.
+        """
+        count = len(packed_dna)
+        self._reserve(self.length + count)
+        rows = np.arange(self.length, self.length + count)
+        for name, spec in COLUMNS.items():
+            getattr(self, name)[rows] = spec.default
+
+        self.id[rows] = ids
+        if parent_ids is not None:
+            self.parent_ids[rows] = parent_ids
+        self.dna[rows] = packed_dna
+        self.x[rows] = x
+        self.y[rows] = y
+        self.rotation[rows] = np.random.randint(0, 361, count)
+
+        phenotypes = decoder.decode_genomes(packed_dna)
+        compiled = compile_brains(phenotypes)
+        self.brain_sources[rows], self.brain_targets[rows], self.brain_strengths[rows], self.turn_first[rows] = compiled
+        size = phenotypes["size"]
+        self.energy[rows] = phenotypes["base_energy"]
+        self.size[rows] = size
+        self.energy_consumption[rows] = phenotypes["energy_consumption"] * (size / 10)
+        self.base_reproduction_cooldown[rows] = phenotypes["reproduction_cooldown"]
+        self.fertility[rows] = phenotypes["fertility"]
+        self.mate_detection_range[rows] = MATE_DETECTION_RANGE
+        self.speed[rows] = SPEED
+        self.max_turning_rate[rows] = 90 - size * 9
+
+        self.beasts.extend([None] * count)
+        self._num_without_view += count
+        self.length += count
+        return rows
+
+    def add_births(self, first: np.ndarray, second: np.ndarray, ids: np.ndarray) -> np.ndarray:
+        """
+        Let every beast in `first` have a child with the beast in the same place in `second`, as a successful
+        `Beast.reproduce` does. A beast can only be in one pair. Returns the rows of the children.
+        """
+        genomes = mutate_genomes(merge_genomes(self.dna[first], self.dna[second]))
+        parent_ids = np.stack([self.id[first], self.id[second]], axis=1)
+        rows = self.spawn(genomes, self.x[first], self.y[first], ids, parent_ids)
+        lineage.record_births(ids, parent_ids)
+
+        for reset in (rows, first, second):
+            self.reproduction_cooldown[reset] = self.base_reproduction_cooldown[reset]
+        self.stats_children[first] += 1
+        return rows
+
+    def apply_fights(self, first: np.ndarray, second: np.ndarray, outcome: np.ndarray) -> np.ndarray:
+        """
+        Let every beast in `first` fight the beast in the same place in `second`, as `Beast.fight` does, with an
+        `outcome` of 1 if the beast in `first` won, -1 if it lost and 0 if the fight was not concluded. A beast can only
+        be in one fight. Returns the rows of the beasts killed.
+        """
+        self.stats_fights[first] += 1
+        self.fight_cooldown[first] = FIGHTING_COOLDOWN
+        self.fight_cooldown[second] = FIGHTING_COOLDOWN
+
+        winners = np.concatenate([first[outcome > 0], second[outcome < 0]])
+        losers = np.concatenate([second[outcome > 0], first[outcome < 0]])
+        self.energy[winners] = decoder.decode_gene(self.dna[winners], "base_energy")
+        self.dead[losers] = 1
+        self.killed[losers] = True
+        self.stats_fights_won[first[outcome > 0]] += 1
+
+        for fighters in (first[outcome == 0], second[outcome == 0]):
+            self.energy[fighters] -= self.energy_consumption[fighters] * 20
+        return losers
+
+    def remove(self, beast: "Beast"):
+        if beast not in self:
+            raise ValueError(f"{beast} is not part of this population")
+        keep = np.ones(self.length, dtype=bool)
+        keep[beast._row] = False
+        self.remove_rows(~keep)
+
+    def remove_rows(self, remove: np.ndarray):
+        """Remove all beasts for which `remove` is set, keeping the order of the remaining beasts"""
+        removed_rows = np.flatnonzero(remove)
+        if len(removed_rows) == 0:
+            return
+
+        keep = ~remove
+        kept_rows = np.flatnonzero(keep)
+        new_rows = np.where(keep, np.cumsum(keep) - 1, -1)
+
+        for row in removed_rows.tolist():
+            beast = self.beasts[row]
+            if beast is None:
+                # Nothing refers to a beast without a view, so there is nothing to keep
+                self._num_without_view -= 1
+            else:
+                Population(capacity=1).append(beast)
+
+        new_length = len(kept_rows)
+        for name in COLUMNS:
+            column = getattr(self, name)
+            column[:new_length] = column[kept_rows]
+
+        nearest = self.nearest[:new_length]
+        has_nearest = nearest >= 0
+        nearest[has_nearest] = new_rows[nearest[has_nearest]]
+
+        first_changed = int(removed_rows[0])
+        self.beasts = [self.beasts[row] for row in kept_rows]
+        for row in range(first_changed, new_length):
+            beast = self.beasts[row]
+            if beast is not None:
+                beast._row = row
+        self.length = new_length
+
+    def _reserve(self, length: int):
+        if length <= self.capacity:
+            return
+        capacity = max(self.capacity * 2, length, MIN_CAPACITY)
+        for name, spec in COLUMNS.items():
+            column = np.zeros((capacity,) + spec.shape, dtype=spec.dtype)
+            column[: self.length] = getattr(self, name)[: self.length]
+            setattr(self, name, column)
+        self.capacity = capacity
+
+    def alive_rows(self) -> np.ndarray:
+        return np.flatnonzero(self.column("dead") == 0)
+
+    def any_alive(self) -> bool:
+        return bool(np.any(self.column("dead") == 0))
+
+    def step(self, tree: SpatialIndex):
+        """
+        Step all beasts at once. This is equivalent to calling `Beast.step` and `Beast.validate` on every beast, except
+        that all beasts sense the world as it was at the start of the step, instead of seeing the beasts before them
+        already moved. Beasts are despawned by `simulate_beasts`, before the step.
+        """
+        dead = self.column("dead")
+        alive = dead == 0
+        dead[~alive] += 1
+
+        rows = np.flatnonzero(alive)
+        energy_consumption = self.energy_consumption[rows]
+        self.energy[rows] -= energy_consumption / 10
+
+        move, turn, degrees, turn_first = self._think(tree, rows)
+        previous_x = self.x[rows]
+        previous_y = self.y[rows]
+
+        self._turn(rows[turn & turn_first], degrees[turn & turn_first])
+        moving = rows[move]
+        self._move(moving)
+        self.energy[moving] -= energy_consumption[move] / 5 * self.speed[moving]
+        self._turn(rows[turn & ~turn_first], degrees[turn & ~turn_first])
+
+        not_moving = rows[(self.x[rows] == previous_x) & (self.y[rows] == previous_y)]
+        self.not_moved[not_moving] += 1
+        self.dead[not_moving[self.not_moved[not_moving] > NOT_MOVED_LIMIT]] = 1
+
+        self.reproduction_cooldown[rows] = np.maximum(self.reproduction_cooldown[rows] - 1, 0)
+        self.fight_cooldown[rows] = np.maximum(self.fight_cooldown[rows] - 1, 0)
+
+        # Validate
+        dead[(self.column("energy") < 0) & (dead == 0)] = 1
+
+        step_timers.lap("actions")
+
+    def _think(self, tree: SpatialIndex, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Let the brains of the beasts in `rows` decide on their actions. Returns per row whether to move forward, whether
+        to turn, the degrees to turn and whether the turn comes before the move.
+        """
+        self._sense(tree, rows)
+        step_timers.lap("sensing")
+        inputs = get_input_matrix(self.nearest_distance[rows], self.nearest_direction[rows])
+        move, turn, degrees = step_brains(
+            inputs, self.brain_sources[rows], self.brain_targets[rows], self.brain_strengths[rows]
+        )
+        step_timers.lap("brains")
+        return move, turn, degrees, self.turn_first[rows]
+
+    def _sense(self, tree: SpatialIndex, rows: np.ndarray):
+        """
+        Find the nearest mate within the mate detection range of the beasts in `rows`, with the distance and relative
+        direction to it
+        """
+        nearest = np.full(self.length, -1, dtype=np.int64)
+        distance = np.full(self.length, np.nan)
+        found = np.zeros(self.length, dtype=bool)
+        detection_range = self.mate_detection_range[: self.length]
+        max_range = int(detection_range[rows].max()) if len(rows) > 0 else 0
+        index_rows, neighbours, neighbour_distances = tree.nearest_neighbour_rows(max_range)
+        found[index_rows] = True
+        in_range = (neighbours >= 0) & (neighbour_distances < detection_range[index_rows])
+        nearest[index_rows[in_range]] = neighbours[in_range]
+        distance[index_rows[in_range]] = neighbour_distances[in_range]
+
+        # Beasts missing from the index still sense the beasts in it
+        for row in rows[~found[rows]]:
+            location = (int(self.x[row]), int(self.y[row]))
+            neighbour, neighbour_distance = tree.find_nearest_neighbour(location, self[row], int(detection_range[row]))
+            if neighbour is not None:
+                nearest[row] = neighbour.obj._row
+                distance[row] = neighbour_distance
+
+        nearest = nearest[rows]
+        distance = distance[rows]
+        has_nearest = nearest >= 0
+        direction = np.zeros(len(rows), dtype=np.int64)
+        mates = nearest[has_nearest]
+        direction[has_nearest] = get_directions(
+            self.x[rows[has_nearest]], self.y[rows[has_nearest]], self.x[mates], self.y[mates]
+        )
+        direction -= self.rotation[rows] * has_nearest
+        direction[direction > 180] -= 360
+        direction[direction < -180] += 360
+
+        self.nearest[rows] = nearest
+        self.nearest_distance[rows] = distance
+        self.nearest_direction[rows] = direction
+
+    def _turn(self, rows: np.ndarray, degrees: np.ndarray):
+        max_turning_rate = self.max_turning_rate[rows]
+        turn_amount = np.maximum(-max_turning_rate, np.minimum(max_turning_rate, degrees))
+        self.rotation[rows] = (self.rotation[rows] + turn_amount) % 360
+
+    def _move(self, rows: np.ndarray):
+        radians = np.radians(self.rotation[rows])
+        speed = self.speed[rows]
+        new_x = np.round(self.x[rows] + np.sin(radians) * speed).astype(np.int64)
+        new_y = np.round(self.y[rows] - np.cos(radians) * speed).astype(np.int64)
+        self.x[rows] = np.maximum(np.minimum(new_x, world.x_limit), BORDER_BUFFER)
+        self.y[rows] = np.maximum(np.minimum(new_y, world.y_limit), BORDER_BUFFER)
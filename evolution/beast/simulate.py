@@ -1,61 +1,243 @@
-import math
-from typing import List
+from typing import Dict, List, Set, Tuple, Type
 
-from pygame.rect import Rect
+import numpy as np
 
-from evolution.beast.beast import Beast
+from evolution.beast.beast import Beast, next_ids
+from evolution.beast.lineage import lineage
+from evolution.beast.population import DESPAWN_TIME, FIGHTING_COOLDOWN
+from evolution.datastructures.array_kdtree import ArrayKDTree
+from evolution.datastructures.hashgrid import HashGrid
 from evolution.datastructures.kdtree import KDTree, KDTreePoint
-from evolution.simulation.ui_constants import XSIZE, YSIZE
+from evolution.datastructures.spatial_index import SpatialIndex, SpatialIndexType
+from evolution.datastructures.tiled_index import TiledIndex
+from evolution.util.profiling import step_timers
+from evolution.world.frame import capture_frame
+from evolution.world.metrics import population_metrics
 from evolution.world.state import state
+from evolution.world.world import world
 
 MAX_REPLICATION_DISTANCE = 15
+# Cells of about the distance at which beasts interact, so a nearest mate search mostly stays within a few cells
+HASH_GRID_CELL_SIZE = 2 * MAX_REPLICATION_DISTANCE
 
+SPATIAL_INDEX_CLASSES: Dict[SpatialIndexType, Type[SpatialIndex]] = {
+    SpatialIndexType.KDTREE: KDTree,
+    SpatialIndexType.HASH_GRID: HashGrid,
+    SpatialIndexType.ARRAY_KDTREE: ArrayKDTree,
+    SpatialIndexType.TILED: TiledIndex,
+}
 
-def simulate_beasts():
-    if len([beast for beast in state.beasts if beast.dead == 0]) == 0:
+
+def simulate_beasts(publish: bool = True):
+    """Perform a step of the simulation, and publish the resulting frame if `publish` and frames are published at all"""
+    if not state.beasts.any_alive():
         state.active = False
         return
 
-    tree = _get_kd_tree()
+    step_timers.start()
+    # The beasts that are despawned this step are dead already, removing them first keeps the rows of the other beasts
+    # the same for the rest of the step
+    state.beasts.remove_rows(state.beasts.column("dead") >= DESPAWN_TIME)
+    step_timers.lap("despawn")
+    tree = _get_spatial_index()
     state.tree = tree
+    step_timers.lap("tree")
     _simulate_beasts(tree)
-    state.beasts += _simulate_reproduction(tree)
-
-
-def _get_kd_tree() -> KDTree:
-    tree = KDTree(
-        Rect(0, 0, XSIZE, YSIZE),
-        insert_objects=[
-            KDTreePoint(beast.position.x, beast.position.y, beast) for beast in state.beasts if beast.dead == 0
-        ],
+    if not tree.incremental and not tree.live_positions:
+        # Find partners at the positions after moving
+        tree = _build_spatial_index()
+        state.tree = tree
+        step_timers.lap("tree")
+    children, fights = _simulate_reproduction(tree)
+    step_timers.lap("reproduction")
+    if tree.incremental:
+        for row in children.tolist():
+            child = state.beasts[row]
+            tree.insert(child, child.x, child.y)
+        step_timers.lap("tree")
+    # Beasts that died this step, starved or killed, are dead for a single step
+    lineage.record_deaths(state.beasts.column("id")[state.beasts.column("dead") == 1])
+    lineage.advance()
+    if state.record_metrics:
+        population_metrics.record(lineage.step, state.beasts, len(children), fights)
+        step_timers.lap("metrics")
+    if publish and state.publish_frames:
+        publish_frame()
+        step_timers.lap("frame")
+    step_timers.end()
+
+
+def publish_frame():
+    """Make the current state of the world the frame that is drawn"""
+    state.frame = capture_frame(
+        state.beasts,
+        state.tree,
+        state.selected_beast_id,
+        state.viewport,
+        outline=state.render_kdtree,
+        nodes=state.capture_tree_nodes,
     )
-    return tree
-
-
-def _simulate_beasts(tree: KDTree):
-    despawn_beasts: List[Beast] = []
 
-    for beast in state.beasts:
-        beast.step(tree)
-        beast.validate()
-        if beast.despawnable():
-            despawn_beasts.append(beast)
 
-    for beast in despawn_beasts:
-        state.beasts.remove(beast)
-
-
-def _simulate_reproduction(tree: KDTree) -> List[Beast]:
-    new_beasts: List[Beast] = []
-    for beast in state.beasts:
-        nearest_beast = beast.nearest_mate
-        if nearest_beast is not None:
-            distance = math.dist(beast.position.tuple(), nearest_beast.position.tuple())
-            if distance < MAX_REPLICATION_DISTANCE:
-                new_beasts += beast.reproduce(nearest_beast)
-
-                if len(new_beasts) == 0:
-                    # No reproduction, fight instead TODO improve
-                    beast.fight(nearest_beast)
+def _get_spatial_index() -> SpatialIndex:
+    """
+    The spatial index is kept up to date during the step, so the index of the previous step is reused. A new index is
+    only built at the start, after switching the type of index, when beasts were added outside of the simulation, or
+    every step for indices that cannot be updated.
+    """
+    index = state.tree
+    if (
+        index is None
+        or not index.incremental
+        or not isinstance(index, SPATIAL_INDEX_CLASSES[state.spatial_index_type])
+        or index.num_points() != len(state.beasts.alive_rows())
+    ):
+        index = _build_spatial_index()
+    return index
+
+
+def _build_spatial_index() -> SpatialIndex:
+    population = state.beasts
+    rows = population.alive_rows()
+    area = world.area()
+    if state.spatial_index_type == SpatialIndexType.TILED:
+        # Holds the rows instead of a point per beast
+        return TiledIndex(area, population, rows, state.num_workers)
+
+    points = [
+        KDTreePoint(x, y, population[row])
+        for row, x, y in zip(rows, population.x[rows].tolist(), population.y[rows].tolist())
+    ]
+    if state.spatial_index_type == SpatialIndexType.HASH_GRID:
+        return HashGrid(area, HASH_GRID_CELL_SIZE, points)
+    elif state.spatial_index_type == SpatialIndexType.ARRAY_KDTREE:
+        return ArrayKDTree(area, points)
+    else:
+        return KDTree(area, insert_objects=points)
+
+
+def _simulate_beasts(tree: SpatialIndex):
+    population = state.beasts
+    rows = population.alive_rows()
+    previous_x = population.x[rows]
+    previous_y = population.y[rows]
+
+    # Beasts to despawn were removed at the start of the step
+    population.step(tree)
+    if tree.incremental:
+        _update_spatial_index(tree, rows, previous_x, previous_y)
+        step_timers.lap("tree")
+
+
+def _update_spatial_index(tree: SpatialIndex, rows: np.ndarray, previous_x: np.ndarray, previous_y: np.ndarray):
+    """Move the beasts in `rows` to their new position in the index, removing those that died"""
+    population = state.beasts
+    x = population.x[rows]
+    y = population.y[rows]
+    died = population.dead[rows] > 0
+    moved = ~died & ((x != previous_x) | (y != previous_y))
+
+    for row in rows[died]:
+        tree.remove(population[row])
+    for row, new_x, new_y in zip(rows[moved], x[moved].tolist(), y[moved].tolist()):
+        tree.update(population[row], new_x, new_y)
+
+
+def _simulate_reproduction(tree: SpatialIndex) -> Tuple[np.ndarray, int]:
+    """
+    Every beast tries to reproduce with the partners closer than MAX_REPLICATION_DISTANCE, nearest first, and fights
+    the nearest of them if it could not reproduce with any. Beasts that can neither reproduce nor fight are skipped.
+
+    Reproduction is batched: the chance of success is drawn for all pairs at once, every beast reproduces at most once
+    and the children of all pairs are born together. Returns the rows of the children and the number of fights.
+    """
+    population = state.beasts
+    alive = population.column("dead") == 0
+    can_reproduce = alive & (population.column("reproduction_cooldown") == 0)
+    can_fight = alive & (population.column("fight_cooldown") == 0)
+
+    rows = np.flatnonzero(can_reproduce | can_fight)
+    counts, nearby = tree.rows_within_radius(population.x[rows], population.y[rows], MAX_REPLICATION_DISTANCE)
+
+    # All pairs of a beast and one of its partners, by beast and then by distance
+    first = np.repeat(rows, counts)
+    is_partner = (nearby != first) & alive[nearby]
+    first = first[is_partner]
+    second = nearby[is_partner]
+    candidates = can_reproduce[first] & can_reproduce[second]
+    fertility = population.column("fertility").astype(np.int64)
+    success = np.zeros(len(first), dtype=bool)
+    success[candidates] = np.random.randint(0, fertility[first[candidates]] * fertility[second[candidates]] + 1) == 0
+
+    # The first success of a beast counts, unless either beast already reproduced in an earlier pair
+    reproduced: Set[int] = set()
+    mothers: List[int] = []
+    fathers: List[int] = []
+    for mother, father in zip(first[success].tolist(), second[success].tolist()):
+        if mother not in reproduced and father not in reproduced:
+            reproduced.update((mother, father))
+            mothers.append(mother)
+            fathers.append(father)
+    children = population.add_births(
+        np.array(mothers, dtype=np.int64), np.array(fathers, dtype=np.int64), next_ids(len(mothers))
+    )
 
-    return new_beasts
+    # No reproduction, fight instead TODO improve
+    fights = _simulate_fights(tree, rows, first, second, reproduced)
+    return children, fights
+
+
+def _simulate_fights(
+    tree: SpatialIndex, rows: np.ndarray, first: np.ndarray, second: np.ndarray, initiators: Set[int]
+) -> int:
+    """
+    Every beast in `rows` that did not reproduce fights the nearest of its living partners in the pairs `first` and
+    `second`, if both can fight, as `Beast.fight` does. A beast fights at most once a step, as fighting starts its
+    cooldown. The fights are picked in order, as a beast killed in a fight is no partner for later ones, and then
+    applied to the population at once. Returns the number of fights.
+    """
+    population = state.beasts
+    dead = population.dead.tolist()
+    fight_cooldown = population.fight_cooldown.tolist()
+    size = population.size.tolist()
+    energy = population.energy.tolist()
+    # The chances of every beast for if it starts a fight, drawn as `Beast._fight_result` does
+    chances = np.random.randint(0, Beast.MAX_UPPERHAND_FACTOR + 1, (2, len(rows), 2)).min(axis=2)
+    conclusion_chance = chances[0].tolist()
+    win_chance = (chances[1] * np.random.choice([-1, 1], len(rows))).tolist()
+
+    # The partners of a beast are the pairs from `starts` to `ends`
+    starts = np.searchsorted(first, rows, side="left").tolist()
+    ends = np.searchsorted(first, rows, side="right").tolist()
+    partners = second.tolist()
+    fighters: List[int] = []
+    opponents: List[int] = []
+    outcomes: List[int] = []
+    for index, (row, start, end) in enumerate(zip(rows.tolist(), starts, ends)):
+        if row in initiators or dead[row] > 0:
+            continue
+        opponent = next((partner for partner in partners[start:end] if dead[partner] == 0), None)
+        if opponent is None or fight_cooldown[row] != 0 or fight_cooldown[opponent] != 0:
+            # One of them cannot fight
+            continue
+
+        fight_cooldown[row] = fight_cooldown[opponent] = FIGHTING_COOLDOWN
+        upperhand_factor = (size[row] - size[opponent]) + (energy[row] - energy[opponent]) / 500
+        if conclusion_chance[index] < abs(upperhand_factor):
+            outcome = 1 if win_chance[index] < upperhand_factor else -1
+            dead[opponent if outcome > 0 else row] = 1
+        else:
+            outcome = 0
+        fighters.append(row)
+        opponents.append(opponent)
+        outcomes.append(outcome)
+
+    killed = population.apply_fights(
+        np.array(fighters, dtype=np.int64), np.array(opponents, dtype=np.int64), np.array(outcomes, dtype=np.int64)
+    )
+    if tree.incremental:
+        for row in killed.tolist():
+            beast = population[row]
+            if beast in tree:
+                tree.remove(beast)
+    return len(fighters)
@@ -0,0 +1,184 @@
+import math
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+from pygame.rect import Rect
+
+from evolution.datastructures.kdtree import MAX_POINTS, KDTreePoint
+from evolution.datastructures.spatial_index import SPLIT_LINE, IndexOutline, SpatialIndex
+
+
+class ArrayKDTree(SpatialIndex):
+    """
+    KD-tree stored in flat arrays instead of linked node objects. Nodes use the implicit layout of a complete binary
+    tree (the children of node i are 2i + 1 and 2i + 2), and leaves hold up to MAX_POINTS points. Each node covers a
+    range of `order`, the permutation of the points that the tree is built on.
+
+    The tree is built with `argpartition` around the median instead of sorting at every level, and searched with an
+    explicit stack, so neither depends on the recursion limit. The tree is rebuilt every step instead of updated.
+    """
+
+    incremental = False
+
+    def __init__(self, area: Rect, insert_objects: List[KDTreePoint] = []):
+        self.area = area
+        self._points = list(insert_objects)
+        num_points = len(self._points)
+
+        depth = max(0, math.ceil(math.log2(num_points / MAX_POINTS))) if num_points > 0 else 0
+        num_nodes = 2 ** (depth + 1) - 1
+        self.start = np.zeros(num_nodes, dtype=np.int64)
+        self.end = np.zeros(num_nodes, dtype=np.int64)
+        self.split = np.zeros(num_nodes, dtype=np.int64)
+        self.axis = np.zeros(num_nodes, dtype=np.int8)
+        self.leaf = np.zeros(num_nodes, dtype=bool)
+        # The last level of the layout is only partially used
+        self.used = np.zeros(num_nodes, dtype=bool)
+        # Area of every node as left, top, right, bottom
+        self.bounds = np.zeros((num_nodes, 4), dtype=np.int64)
+
+        self.coordinates = np.array([(point.x, point.y) for point in self._points], dtype=np.int64).reshape(-1, 2)
+        self.order = np.arange(num_points)
+        self._build()
+
+        # Plain lists are much faster than NumPy arrays for the element-wise access of a search
+        self._x: List[int] = self.coordinates[:, 0].tolist()
+        self._y: List[int] = self.coordinates[:, 1].tolist()
+        self._order: List[int] = self.order.tolist()
+        self._start: List[int] = self.start.tolist()
+        self._end: List[int] = self.end.tolist()
+        self._split: List[int] = self.split.tolist()
+        self._axis: List[int] = self.axis.tolist()
+        self._leaf: List[bool] = self.leaf.tolist()
+        self._bounds: List[List[int]] = self.bounds.tolist()
+
+    def _build(self):
+        stack = [(0, 0, len(self._points), 0, (self.area.left, self.area.top, self.area.right, self.area.bottom))]
+        while stack:
+            node, start, end, axis, bounds = stack.pop()
+            self.used[node] = True
+            self.start[node] = start
+            self.end[node] = end
+            self.axis[node] = axis
+            self.bounds[node] = bounds
+            if end - start <= MAX_POINTS:
+                self.leaf[node] = True
+                continue
+
+            median = (start + end) // 2
+            segment = self.order[start:end]
+            self.order[start:end] = segment[np.argpartition(self.coordinates[segment, axis], median - start)]
+            split = int(self.coordinates[self.order[median], axis])
+            self.split[node] = split
+
+            left, top, right, bottom = bounds
+            if axis == 0:
+                left_bounds, right_bounds = (left, top, split, bottom), (split, top, right, bottom)
+            else:
+                left_bounds, right_bounds = (left, top, right, split), (left, split, right, bottom)
+            stack.append((2 * node + 1, start, median, 1 - axis, left_bounds))
+            stack.append((2 * node + 2, median, end, 1 - axis, right_bounds))
+
+    def points(self) -> List[KDTreePoint]:
+        return list(self._points)
+
+    def num_points(self) -> int:
+        return len(self._points)
+
+    def __contains__(self, obj: Any) -> bool:
+        return any(point.obj is obj for point in self._points)
+
+    def find_nearest_neighbour(
+        self, location: Tuple[int, int], obj: Any, max_distance: float = math.inf
+    ) -> Tuple[Optional[KDTreePoint], float]:
+        x, y = location
+        current_best = max_distance**2
+        best_index = -1
+
+        # Nodes still to visit, with the lowest distance any of their points can have
+        stack: List[Tuple[int, float]] = [(0, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if bound >= current_best:
+                continue
+
+            if self._leaf[node]:
+                for index in self._order[self._start[node] : self._end[node]]:
+                    distance = (self._x[index] - x) ** 2 + (self._y[index] - y) ** 2
+                    if distance < current_best and self._points[index].obj is not obj:
+                        current_best = distance
+                        best_index = index
+            else:
+                difference = (x if self._axis[node] == 0 else y) - self._split[node]
+                if difference < 0:
+                    near, far = 2 * node + 1, 2 * node + 2
+                else:
+                    near, far = 2 * node + 2, 2 * node + 1
+                stack.append((far, max(bound, difference**2)))
+                stack.append((near, bound))
+
+        if best_index < 0:
+            return None, math.inf
+        return self._points[best_index], math.sqrt(current_best)
+
+    def within_radius(self, location: Tuple[int, int], radius: float) -> List[Tuple[KDTreePoint, float]]:
+        x, y = location
+        bound = radius**2
+        results: List[Tuple[float, int]] = []
+
+        stack = [0] if self._points else []
+        while stack:
+            node = stack.pop()
+            left, top, right, bottom = self._bounds[node]
+            dx = max(left - x, 0, x - right)
+            dy = max(top - y, 0, y - bottom)
+            if dx * dx + dy * dy >= bound:
+                continue
+
+            if self._leaf[node]:
+                for index in self._order[self._start[node] : self._end[node]]:
+                    distance = (self._x[index] - x) ** 2 + (self._y[index] - y) ** 2
+                    if distance < bound:
+                        results.append((distance, index))
+            else:
+                stack.append(2 * node + 1)
+                stack.append(2 * node + 2)
+
+        results.sort()
+        return [(self._points[index], math.sqrt(distance)) for distance, index in results]
+
+    def within_rect(self, rect: Rect) -> List[KDTreePoint]:
+        rect_left, rect_top, rect_right, rect_bottom = rect.left, rect.top, rect.right, rect.bottom
+        points: List[KDTreePoint] = []
+
+        stack = [0] if self._points else []
+        while stack:
+            node = stack.pop()
+            left, top, right, bottom = self._bounds[node]
+            if left >= rect_right or right < rect_left or top >= rect_bottom or bottom < rect_top:
+                continue
+
+            if self._leaf[node]:
+                for index in self._order[self._start[node] : self._end[node]]:
+                    if rect_left <= self._x[index] < rect_right and rect_top <= self._y[index] < rect_bottom:
+                        points.append(self._points[index])
+            else:
+                stack.append(2 * node + 1)
+                stack.append(2 * node + 2)
+        return points
+
+    def outline(self) -> IndexOutline:
+        nodes = np.flatnonzero(self.used & ~self.leaf)
+        left, top, right, bottom = self.bounds[nodes].T
+        split = self.split[nodes]
+        vertical = self.axis[nodes] == 0
+        lines = np.stack(
+            [
+                np.where(vertical, split, left),
+                np.where(vertical, top, split),
+                np.where(vertical, split, right),
+                np.where(vertical, bottom, split),
+            ],
+            axis=1,
+        )
+        return IndexOutline.create([(lines, SPLIT_LINE)])
@@ -0,0 +1,180 @@
+import math
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pygame.rect import Rect
+
+from evolution.datastructures.kdtree import KDTreePoint
+from evolution.datastructures.spatial_index import GRID_LINE, IndexOutline, SpatialIndex
+from evolution.util.math_helpers import square_dist
+
+Cell = Tuple[int, int]
+
+
+class HashGrid(SpatialIndex):
+    """
+    Uniform grid of square cells, storing the points of each occupied cell. Inserting, removing and moving a point is
+    O(1), and for a roughly uniform density of points a nearest neighbour search only visits the few cells around the
+    location.
+    """
+
+    def __init__(self, area: Rect, cell_size: int, insert_objects: Iterable[KDTreePoint] = ()):
+        self.area = area
+        self.cell_size = cell_size
+        self.cells: Dict[Cell, List[KDTreePoint]] = {}
+        self.objects: Dict[Any, KDTreePoint] = {}
+        for point in insert_objects:
+            self._insert_point(point)
+
+    def _cell(self, x: float, y: float) -> Cell:
+        return (int(x // self.cell_size), int(y // self.cell_size))
+
+    def _insert_point(self, point: KDTreePoint):
+        self.cells.setdefault(self._cell(point.x, point.y), []).append(point)
+        self.objects[point.obj] = point
+
+    def insert(self, obj: Any, x: int, y: int):
+        self._insert_point(KDTreePoint(x, y, obj))
+
+    def remove(self, obj: Any):
+        point = self.objects.pop(obj)
+        self._remove_from_cell(point)
+
+    def _remove_from_cell(self, point: KDTreePoint):
+        cell = self._cell(point.x, point.y)
+        points = self.cells[cell]
+        points.remove(point)
+        if len(points) == 0:
+            del self.cells[cell]
+
+    def update(self, obj: Any, x: int, y: int):
+        point = self.objects[obj]
+        if self._cell(x, y) != self._cell(point.x, point.y):
+            self._remove_from_cell(point)
+            point.x = x
+            point.y = y
+            self.cells.setdefault(self._cell(x, y), []).append(point)
+        else:
+            point.x = x
+            point.y = y
+
+    def points(self) -> List[KDTreePoint]:
+        return list(self.objects.values())
+
+    def num_points(self) -> int:
+        return len(self.objects)
+
+    def __contains__(self, obj: Any) -> bool:
+        return obj in self.objects
+
+    def find_nearest_neighbour(
+        self, location: Tuple[int, int], obj: Any, max_distance: float = math.inf
+    ) -> Tuple[Optional[KDTreePoint], float]:
+        center_x, center_y = self._cell(location[0], location[1])
+        best_node: Optional[KDTreePoint] = None
+        current_best = max_distance**2
+
+        ring = 0
+        while True:
+            if (2 * ring + 1) ** 2 > len(self.cells):
+                # Scanning the rings would visit more cells than are occupied, check the remaining cells directly
+                return self._scan_occupied_cells(location, obj, center_x, center_y, ring, best_node, current_best)
+
+            for cell in self._ring(center_x, center_y, ring):
+                best_node, current_best = self._check_cell(cell, location, obj, best_node, current_best)
+
+            # Points in the next rings are at least `ring` cells away from the location
+            if current_best <= (ring * self.cell_size) ** 2:
+                return self._result(best_node, current_best)
+            ring += 1
+
+    @staticmethod
+    def _result(best_node: Optional[KDTreePoint], current_best: float) -> Tuple[Optional[KDTreePoint], float]:
+        return best_node, (math.sqrt(current_best) if best_node is not None else math.inf)
+
+    def _scan_occupied_cells(
+        self,
+        location: Tuple[int, int],
+        obj: Any,
+        center_x: int,
+        center_y: int,
+        first_ring: int,
+        best_node: Optional[KDTreePoint],
+        current_best: float,
+    ) -> Tuple[Optional[KDTreePoint], float]:
+        for cell in self.cells:
+            if max(abs(cell[0] - center_x), abs(cell[1] - center_y)) >= first_ring:
+                best_node, current_best = self._check_cell(cell, location, obj, best_node, current_best)
+        return self._result(best_node, current_best)
+
+    def within_radius(self, location: Tuple[int, int], radius: float) -> List[Tuple[KDTreePoint, float]]:
+        x, y = location
+        bound = radius**2
+        cells_per_side = 2 * radius / self.cell_size + 2
+        if cells_per_side**2 > len(self.cells):
+            # The range covers more cells than are occupied, check the occupied cells directly
+            cells: Iterable[Cell] = list(self.cells)
+        else:
+            first_x, first_y = self._cell(x - radius, y - radius)
+            last_x, last_y = self._cell(x + radius, y + radius)
+            cells = ((cell_x, cell_y) for cell_x in range(first_x, last_x + 1) for cell_y in range(first_y, last_y + 1))
+
+        results: List[Tuple[KDTreePoint, float]] = []
+        for cell in cells:
+            for point in self.cells.get(cell, ()):
+                distance = square_dist((point.x, point.y), location)
+                if distance < bound:
+                    results.append((point, math.sqrt(distance)))
+
+        results.sort(key=lambda result: result[1])
+        return results
+
+    def _check_cell(
+        self,
+        cell: Cell,
+        location: Tuple[int, int],
+        obj: Any,
+        best_node: Optional[KDTreePoint],
+        current_best: float,
+    ) -> Tuple[Optional[KDTreePoint], float]:
+        for point in self.cells.get(cell, ()):
+            if point.obj is not obj:
+                distance = square_dist((point.x, point.y), location)
+                if distance < current_best:
+                    best_node, current_best = point, distance
+        return best_node, current_best
+
+    @staticmethod
+    def _ring(center_x: int, center_y: int, ring: int) -> Iterable[Cell]:
+        if ring == 0:
+            yield (center_x, center_y)
+            return
+        for x in range(center_x - ring, center_x + ring + 1):
+            yield (x, center_y - ring)
+            yield (x, center_y + ring)
+        for y in range(center_y - ring + 1, center_y + ring):
+            yield (center_x - ring, y)
+            yield (center_x + ring, y)
+
+    def within_rect(self, rect: Rect) -> List[KDTreePoint]:
+        first_x, first_y = self._cell(rect.left, rect.top)
+        last_x, last_y = self._cell(rect.right, rect.bottom)
+        if (last_x - first_x + 1) * (last_y - first_y + 1) > len(self.cells):
+            # The rectangle covers more cells than are occupied, check the occupied cells directly
+            cells: Iterable[Cell] = [
+                cell for cell in self.cells if first_x <= cell[0] <= last_x and first_y <= cell[1] <= last_y
+            ]
+        else:
+            cells = ((cell_x, cell_y) for cell_x in range(first_x, last_x + 1) for cell_y in range(first_y, last_y + 1))
+
+        return [point for cell in cells for point in self.cells.get(cell, ()) if rect.collidepoint(point.x, point.y)]
+
+    def outline(self) -> IndexOutline:
+        area = self.area
+        grid_lines = [(x, area.top, x, area.bottom) for x in range(area.left, area.right, self.cell_size)] + [
+            (area.left, y, area.right, y) for y in range(area.top, area.bottom, self.cell_size)
+        ]
+        cells = [
+            (cell_x * self.cell_size, cell_y * self.cell_size, self.cell_size, self.cell_size)
+            for cell_x, cell_y in self.cells
+        ]
+        return IndexOutline.create([(grid_lines, GRID_LINE)], cells)
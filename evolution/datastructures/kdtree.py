@@ -1,15 +1,22 @@
+import heapq
 import math
-from typing import Any, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple, cast
 
-import pygame
 from pygame.rect import Rect
 
+from evolution.datastructures.spatial_index import SPLIT_LINE, IndexOutline, SpatialIndex
 from evolution.util.math_helpers import square_dist
 
 MAX_POINTS = 4
+# A subtree is rebuilt once one of its children holds more than this fraction of its nodes
+SCAPEGOAT_ALPHA = 0.7
+# The whole tree is rebuilt once more than this fraction of its nodes are of deleted points
+MAX_DELETED_FRACTION = 0.5
 
 
 class KDTreePoint:
+    __slots__ = ("x", "y", "obj")
+
     def __init__(self, x: int, y: int, obj: Any):
         self.x = x
         self.y = y
@@ -19,7 +26,34 @@ class KDTreePoint:
         return f"({self.x}, {self.y}) - {self.obj}"
 
 
-class KDTree:
+class KDTree(SpatialIndex):
+    """
+    KD-tree with one point per node. Besides building the tree at once from a list of points, points can be inserted,
+    removed and moved, so one tree can be kept up to date across simulation steps.
+
+    Each node splits its area at a fixed coordinate, which is the coordinate of its own point when the split is made.
+    The point of a node can afterwards move anywhere within the area of the node without invalidating the tree, other
+    moves are a removal followed by an insertion. Removed points of nodes with children are only marked as deleted.
+    Subtrees that become unbalanced through insertions are rebuilt (as in a scapegoat tree), and the whole tree is
+    rebuilt once too many of its nodes are deleted.
+    """
+
+    # There is a node for every point
+    __slots__ = (
+        "area",
+        "left",
+        "right",
+        "depth",
+        "parent",
+        "vertical",
+        "point",
+        "split",
+        "deleted",
+        "size",
+        "count",
+        "nodes",
+    )
+
     def __init__(
         self,
         area: Rect,
@@ -35,22 +69,32 @@ class KDTree:
         self.parent = parent
         self.vertical = vertical
 
+        self.point: Optional[KDTreePoint] = None
+        self.split: int = 0
+        self.deleted: bool = False
+        # Number of points in this subtree, and number of nodes including those of deleted points
+        self.size: int = 0
+        self.count: int = 0
+        # Node of every object in the tree, shared by all nodes
+        self.nodes: Dict[Any, KDTree] = parent.nodes if parent is not None else {}
+
         self._insert(insert_objects)
 
     def num_points(self):
-        count = 0
-        if self.left is not None:
-            count += self.left.num_points()
-        if self.right is not None:
-            count += self.right.num_points()
-        if self.point is not None:
-            count += 1
-        return count
+        return self.size
+
+    def __contains__(self, obj: Any) -> bool:
+        return obj in self.nodes
 
     def _insert(self, points: List[KDTreePoint]) -> None:
+        self.size = self.count = len(points)
+        if len(points) == 0:
+            # Only happens for an empty tree
+            return
+
         if len(points) == 1:
             # Last point, make this a leave node
-            self.point = points[0]
+            self._set_point(points[0])
             return
 
         if self.vertical:
@@ -60,35 +104,181 @@ class KDTree:
 
         sorted_points = sorted(points, key=key)
         median = math.floor(len(sorted_points) / 2)
-        self.point = sorted_points[median]
+        self._set_point(sorted_points[median])
         left_points = sorted_points[:median]
         right_points = sorted_points[median + 1 :]
         if len(left_points) > 0:
-            self.left = KDTree(self._left_rect(self.point), self.depth + 1, left_points, self, not self.vertical)
+            self.left = KDTree(self._left_rect(), self.depth + 1, left_points, self, not self.vertical)
         if len(right_points) > 0:
-            self.right = KDTree(self._right_rect(self.point), self.depth + 1, right_points, self, not self.vertical)
+            self.right = KDTree(self._right_rect(), self.depth + 1, right_points, self, not self.vertical)
+
+    def _set_point(self, point: KDTreePoint):
+        self.point = point
+        self.split = point.x if self.vertical else point.y
+        self.nodes[point.obj] = self
 
-    def _left_rect(self, point: KDTreePoint) -> Rect:
+    def _left_rect(self) -> Rect:
         if self.vertical:
-            return Rect(self.area.left, self.area.top, (point.x - self.area.left), self.area.height)
+            return Rect(self.area.left, self.area.top, (self.split - self.area.left), self.area.height)
         else:
-            return Rect(self.area.left, self.area.top, self.area.width, (point.y - self.area.top))
+            return Rect(self.area.left, self.area.top, self.area.width, (self.split - self.area.top))
 
-    def _right_rect(self, point: KDTreePoint) -> Rect:
+    def _right_rect(self) -> Rect:
         if self.vertical:
-            return Rect(point.x, self.area.top, (self.area.right - point.x), self.area.height)
+            return Rect(self.split, self.area.top, (self.area.right - self.split), self.area.height)
         else:
-            return Rect(self.area.left, point.y, self.area.width, (self.area.bottom - point.y))
+            return Rect(self.area.left, self.split, self.area.width, (self.area.bottom - self.split))
+
+    def _is_leave(self) -> bool:
+        return self.left is None and self.right is None
+
+    def _contains_location(self, x: int, y: int) -> bool:
+        return self.area.left <= x <= self.area.right and self.area.top <= y <= self.area.bottom
+
+    def insert(self, obj: Any, x: int, y: int):
+        point = KDTreePoint(x, y, obj)
+        if self.point is None:
+            self._insert([point])
+            return
+
+        node = self
+        while True:
+            node.size += 1
+            node.count += 1
+            if node._is_leave():
+                # The point of a leave may have moved since the split was made, split at its current location instead
+                leave_point = cast(KDTreePoint, node.point)
+                node.split = leave_point.x if node.vertical else leave_point.y
+
+            go_left = (x if node.vertical else y) < node.split
+            child = node.left if go_left else node.right
+            if child is None:
+                rect = node._left_rect() if go_left else node._right_rect()
+                child = KDTree(rect, node.depth + 1, [point], node, not node.vertical)
+                if go_left:
+                    node.left = child
+                else:
+                    node.right = child
+                break
+            node = child
+
+        self._rebalance(child)
+
+    def remove(self, obj: Any):
+        node = self.nodes.pop(obj)
+        node.deleted = True
+        ancestor: Optional[KDTree] = node
+        while ancestor is not None:
+            ancestor.size -= 1
+            ancestor = ancestor.parent
+        node._prune()
+
+        if self.count - self.size > MAX_DELETED_FRACTION * self.count:
+            self._rebuild()
+
+    def update(self, obj: Any, x: int, y: int):
+        node = self.nodes[obj]
+        if node._contains_location(x, y):
+            point = cast(KDTreePoint, node.point)
+            point.x = x
+            point.y = y
+        else:
+            self.remove(obj)
+            self.insert(obj, x, y)
+
+    def _prune(self):
+        """Detach this node if it is deleted and has no children, continuing with the parent"""
+        node: Optional[KDTree] = self
+        while node is not None and node.deleted and node._is_leave():
+            parent = node.parent
+            if parent is None:
+                # Empty tree
+                node.point = None
+                node.deleted = False
+                node.count = 0
+                return
+
+            if parent.left is node:
+                parent.left = None
+            else:
+                parent.right = None
+            ancestor: Optional[KDTree] = parent
+            while ancestor is not None:
+                ancestor.count -= 1
+                ancestor = ancestor.parent
+            node = parent
+
+    def _rebalance(self, node: "KDTree"):
+        """Rebuild the highest subtree on the path from `node` to the root that is out of balance"""
+        scapegoat: Optional[KDTree] = None
+        ancestor: Optional[KDTree] = node
+        while ancestor is not None:
+            largest_child = max(
+                ancestor.left.count if ancestor.left is not None else 0,
+                ancestor.right.count if ancestor.right is not None else 0,
+            )
+            if largest_child > SCAPEGOAT_ALPHA * ancestor.count:
+                scapegoat = ancestor
+            ancestor = ancestor.parent
+
+        if scapegoat is not None:
+            scapegoat._rebuild()
+
+    def _rebuild(self):
+        old_count = self.count
+        points = self.points()
+        self.left = None
+        self.right = None
+        self.point = None
+        self.deleted = False
+        self._insert(points)
+
+        ancestor = self.parent
+        while ancestor is not None:
+            ancestor.count -= old_count - self.count
+            ancestor = ancestor.parent
+
+    def points(self) -> List[KDTreePoint]:
+        """All points in this subtree"""
+        points: List[KDTreePoint] = []
+        stack: List[KDTree] = [self]
+        while stack:
+            node = stack.pop()
+            if node.point is not None and not node.deleted:
+                points.append(node.point)
+            if node.left is not None:
+                stack.append(node.left)
+            if node.right is not None:
+                stack.append(node.right)
+        return points
+
+    def within_rect(self, rect: Rect) -> List[KDTreePoint]:
+        left, top, right, bottom = rect.left, rect.top, rect.right, rect.bottom
+        points: List[KDTreePoint] = []
+        stack: List[KDTree] = [self] if self.point is not None else []
+        while stack:
+            node = stack.pop()
+            point = node.point
+            if point is not None and not node.deleted and left <= point.x < right and top <= point.y < bottom:
+                points.append(point)
+            for child in (node.left, node.right):
+                if child is not None:
+                    area = child.area
+                    if area.left < right and area.right >= left and area.top < bottom and area.bottom >= top:
+                        stack.append(child)
+        return points
+
+    def _is_candidate(self, obj: Any) -> bool:
+        return self.point is not None and not self.deleted and obj != self.point.obj
 
     def find_nearest_neighbour(
-        self,
-        location: Tuple[int, int],
-        obj: Any,
-        current_best: float = math.inf,
-        best_node: Optional[KDTreePoint] = None,
+        self, location: Tuple[int, int], obj: Any, max_distance: float = math.inf
     ) -> Tuple[Optional[KDTreePoint], float]:
-        node, squared_distance = self._find_nearest_neighbour(location, obj, current_best, best_node)
-        return node, math.sqrt(squared_distance)
+        if self.point is None:
+            return None, math.inf
+        # Starting with the range as the best distance prunes every subtree that lies out of range
+        node, squared_distance = self._find_nearest_neighbour(location, obj, max_distance**2)
+        return node, (math.sqrt(squared_distance) if node is not None else math.inf)
 
     def _find_nearest_neighbour(
         self,
@@ -97,23 +287,141 @@ class KDTree:
         current_best: float = math.inf,
         best_node: Optional[KDTreePoint] = None,
     ) -> Tuple[Optional[KDTreePoint], float]:
-        if obj != self.point.obj:
-            next_tree, other_tree = self._determine_next_subtree(location)
-            local_dist = square_dist((self.point.x, self.point.y), location)
-            return self._handle_tree(location, obj, next_tree, other_tree, local_dist, current_best, best_node)
-        else:
-            # If the node we are looking at is the object for which we are searching, we need to make sure to check both
-            # trees
-            best_node_1, current_best_1 = self._handle_tree(
-                location, obj, self.left, self.right, 0, current_best, best_node
-            )
-            best_node_2, current_best_2 = self._handle_tree(
-                location, obj, self.right, self.left, 0, current_best, best_node
-            )
-            if current_best_1 < current_best_2:
-                return best_node_1, current_best_1
-            else:
-                return best_node_2, current_best_2
+        next_tree, other_tree = self._determine_next_subtree(location)
+        # The point of the object for which we are searching (or a removed point) can never be the nearest, but its
+        # subtrees still need to be searched
+        point = cast(KDTreePoint, self.point)
+        local_dist = square_dist((point.x, point.y), location) if self._is_candidate(obj) else math.inf
+        return self._handle_tree(location, obj, next_tree, other_tree, local_dist, current_best, best_node)
+
+    def all_nearest_neighbours(
+        self, max_distance: float = math.inf
+    ) -> List[Tuple[KDTreePoint, Optional[KDTreePoint], float]]:
+        """
+        Find the nearest neighbour of every point in the tree in one pass over its nodes. Instead of starting at the root
+        for every point, the search for the point of a node starts in the subtree of that node, and then moves up to
+        the root, only visiting the other subtree of an ancestor when its split is closer than the best point so far.
+        As the first candidates are close by, most of the tree is pruned.
+        """
+        results: List[Tuple[KDTreePoint, Optional[KDTreePoint], float]] = []
+        stack: List[KDTree] = [self] if self.point is not None else []
+        while stack:
+            node = stack.pop()
+            if node.left is not None:
+                stack.append(node.left)
+            if node.right is not None:
+                stack.append(node.right)
+            if node.deleted:
+                continue
+
+            best_node, current_best = node._find_nearest_neighbour_from_node(self, max_distance**2)
+            point = cast(KDTreePoint, node.point)
+            results.append((point, best_node, math.sqrt(current_best) if best_node is not None else math.inf))
+
+        return results
+
+    def _find_nearest_neighbour_from_node(
+        self, root: "KDTree", current_best: float = math.inf
+    ) -> Tuple[Optional[KDTreePoint], float]:
+        point = cast(KDTreePoint, self.point)
+        location = (point.x, point.y)
+        obj = point.obj
+        best_node, current_best = self._find_nearest_neighbour(location, obj, current_best)
+
+        child: KDTree = self
+        ancestor = self.parent
+        while child is not root and ancestor is not None:
+            ancestor_point = ancestor.point
+            if ancestor_point is not None and ancestor._is_candidate(obj):
+                local_dist = square_dist((ancestor_point.x, ancestor_point.y), location)
+                if local_dist < current_best:
+                    best_node, current_best = ancestor_point, local_dist
+
+            # The location lies in the area of the child, so no point on the other side is closer than the split
+            other_tree = ancestor.right if child is ancestor.left else ancestor.left
+            distance_to_plane = abs(location[0 if ancestor.vertical else 1] - ancestor.split)
+            if other_tree is not None and distance_to_plane**2 < current_best:
+                best_node, current_best = other_tree._find_nearest_neighbour(location, obj, current_best, best_node)
+
+            child = ancestor
+            ancestor = ancestor.parent
+
+        return best_node, current_best
+
+    def k_nearest(
+        self, location: Tuple[int, int], k: int, exclude: Any = None, max_distance: float = math.inf
+    ) -> List[Tuple[KDTreePoint, float]]:
+        if self.point is None or k <= 0:
+            return []
+
+        # The best points so far as a max-heap of negated squared distances, with a counter to break ties
+        heap: List[Tuple[float, int, KDTreePoint]] = []
+        counter = 0
+        bound = max_distance**2
+        # Nodes still to visit, with the squared distance to their area
+        stack: List[Tuple[KDTree, float]] = [(self, 0)]
+        while stack:
+            node, area_distance = stack.pop()
+            # The bound shrinks as the heap fills up, so nodes pushed earlier may have gone out of range
+            if area_distance >= bound:
+                continue
+
+            point = node.point
+            if point is not None and node._is_candidate(exclude):
+                distance = square_dist((point.x, point.y), location)
+                if distance < bound:
+                    heapq.heappush(heap, (-distance, -counter, point))
+                    counter += 1
+                    if len(heap) > k:
+                        heapq.heappop(heap)
+                    if len(heap) == k:
+                        bound = -heap[0][0]
+
+            node._push_children(stack, location, bound)
+
+        return [(point, math.sqrt(-distance)) for distance, _, point in sorted(heap, reverse=True)]
+
+    def within_radius(self, location: Tuple[int, int], radius: float) -> List[Tuple[KDTreePoint, float]]:
+        if self.point is None:
+            return []
+
+        x, y = location
+        bound = radius**2
+        results: List[Tuple[float, KDTreePoint]] = []
+        # Only nodes with an area in range are pushed, the checks are inlined as this runs for every beast each step
+        stack: List[KDTree] = [self]
+        while stack:
+            node = stack.pop()
+            point = node.point
+            if point is not None and not node.deleted:
+                distance = (point.x - x) ** 2 + (point.y - y) ** 2
+                if distance < bound:
+                    results.append((distance, point))
+            for child in (node.left, node.right):
+                if child is not None:
+                    area = child.area
+                    dx = max(area.left - x, 0, x - area.right)
+                    dy = max(area.top - y, 0, y - area.bottom)
+                    if dx * dx + dy * dy < bound:
+                        stack.append(child)
+
+        results.sort(key=lambda result: result[0])
+        return [(point, math.sqrt(distance)) for distance, point in results]
+
+    def _push_children(self, stack: List[Tuple["KDTree", float]], location: Tuple[int, int], bound: float):
+        """Push the children whose area is in range, the child on the side of the location last so it is visited first"""
+        next_tree, other_tree = self._determine_next_subtree(location)
+        for child in (other_tree, next_tree):
+            if child is not None:
+                area_distance = child._square_distance_to_area(location)
+                if area_distance < bound:
+                    stack.append((child, area_distance))
+
+    def _square_distance_to_area(self, location: Tuple[int, int]) -> float:
+        x, y = location
+        dx = max(self.area.left - x, 0, x - self.area.right)
+        dy = max(self.area.top - y, 0, y - self.area.bottom)
+        return dx * dx + dy * dy
 
     def _handle_tree(
         self,
@@ -125,19 +433,19 @@ class KDTree:
         current_best: float,
         best_node: Optional[KDTreePoint],
     ) -> Tuple[Optional[KDTreePoint], float]:
-        if next_tree is None:
+        if next_tree is None and other_tree is None:
             return self._handle_leave(obj, local_dist, current_best, best_node)
         else:
             return self._handle_non_leave(location, obj, next_tree, other_tree, local_dist, current_best, best_node)
 
     def _determine_next_subtree(self, location: Tuple[int, int]) -> Tuple[Optional["KDTree"], Optional["KDTree"]]:
         if self.vertical:
-            if location[0] < self.point.x:
+            if location[0] < self.split:
                 return self.left, self.right
             else:
                 return self.right, self.left
         else:
-            if location[1] < self.point.y:
+            if location[1] < self.split:
                 return self.left, self.right
             else:
                 return self.right, self.left
@@ -149,7 +457,7 @@ class KDTree:
         current_best: float,
         best_node: Optional[KDTreePoint],
     ) -> Tuple[Optional[KDTreePoint], float]:
-        if local_dist < current_best and self.point.obj != obj:
+        if local_dist < current_best and self._is_candidate(obj):
             return self.point, local_dist
         else:
             return best_node, current_best
@@ -158,18 +466,19 @@ class KDTree:
         self,
         location: Tuple[int, int],
         obj: Any,
-        next_tree: "KDTree",
+        next_tree: Optional["KDTree"],
         other_tree: Optional["KDTree"],
         local_dist: float,
         current_best: float,
         best_node: Optional[KDTreePoint],
     ) -> Tuple[Optional[KDTreePoint], float]:
-        best_node, current_best = next_tree._find_nearest_neighbour(location, obj, current_best, best_node)
-        if local_dist < current_best and self.point.obj != obj:
+        if next_tree is not None:
+            best_node, current_best = next_tree._find_nearest_neighbour(location, obj, current_best, best_node)
+        if local_dist < current_best and self._is_candidate(obj):
             current_best = local_dist
             best_node = self.point
 
-        distance_to_plane = abs(location[0] - self.point.x) if self.vertical else abs(location[1] - self.point.y)
+        distance_to_plane = abs(location[0] - self.split) if self.vertical else abs(location[1] - self.split)
         if distance_to_plane**2 < current_best and other_tree is not None:
             return other_tree._find_nearest_neighbour(location, obj, current_best, best_node)
         else:
@@ -181,7 +490,8 @@ class KDTree:
     def print(self, tab=0):
         out_lines = []
         tab_str = " " * tab * 2
-        out_lines.append(f"{tab_str}+ Subtree point - {self._printable_rect(self.area)} - {self.point}")
+        deleted = " (deleted)" if self.deleted else ""
+        out_lines.append(f"{tab_str}+ Subtree point - {self._printable_rect(self.area)} - {self.point}{deleted}")
 
         if self.left is not None:
             out_lines.append(f"{tab_str}  L:\n{self.left.print(tab + 1)}")
@@ -194,18 +504,16 @@ class KDTree:
     def _printable_rect(rect):
         return f"X-range: {rect[0]}-{rect[0] + rect[2]}, Y-range: {rect[1]}-{rect[1] + rect[3]}"
 
-    def draw(self, screen: pygame.surface.Surface):
-        if self.vertical:
-            begin = (self.point.x, self.area.top)
-            end = (self.point.x, self.area.bottom)
-            color = "green"
-        else:
-            begin = (self.area.left, self.point.y)
-            end = (self.area.right, self.point.y)
-            color = "orange"
-
-        pygame.draw.aaline(screen, color, begin, end)
-        if self.left:
-            self.left.draw(screen)
-        if self.right:
-            self.right.draw(screen)
+    def outline(self) -> IndexOutline:
+        lines = []
+        stack: List[KDTree] = [self]
+        while stack:
+            node = stack.pop()
+            if node.point is None:
+                continue
+            if node.vertical:
+                lines.append((node.split, node.area.top, node.split, node.area.bottom))
+            else:
+                lines.append((node.area.left, node.split, node.area.right, node.split))
+            stack += [child for child in (node.left, node.right) if child is not None]
+        return IndexOutline.create([(lines, SPLIT_LINE)])
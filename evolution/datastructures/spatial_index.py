@@ -0,0 +1,173 @@
+import heapq
+import math
+from dataclasses import dataclass
+from enum import Enum
+from typing import TYPE_CHECKING, Any, List, Optional, Tuple
+
+import numpy as np
+from pygame.rect import Rect
+
+if TYPE_CHECKING:
+    from evolution.datastructures.kdtree import KDTreePoint
+
+# Locations that `rows_within_radius` searches at once, the points found take far more memory than their rows
+ROWS_QUERY_BATCH = 8192
+
+# Kinds of the lines of an `IndexOutline`
+SPLIT_LINE = 0
+GRID_LINE = 1
+TILE_LINE = 2
+
+
+class SpatialIndexType(Enum):
+    KDTREE = 0
+    HASH_GRID = 1
+    ARRAY_KDTREE = 2
+    TILED = 3
+
+
+@dataclass(frozen=True)
+class IndexOutline:
+    """
+    Read-only copy of what is drawn of a spatial index, in world coordinates. `lines` has a row of x1, y1, x2, y2 per
+    line, with its kind in `kinds`, and `rects` has a row of left, top, width, height per rect.
+    """
+
+    lines: np.ndarray
+    kinds: np.ndarray
+    rects: np.ndarray
+
+    @staticmethod
+    def create(lines: List[Tuple[Any, int]], rects: Any = ()) -> "IndexOutline":
+        """Outline of the lines of each kind in `lines`, the arrays are copied and made read-only"""
+        line_arrays = [np.asarray(part, dtype=float).reshape(-1, 4) for part, _ in lines]
+        outline = IndexOutline(
+            np.concatenate([np.zeros((0, 4))] + line_arrays),
+            np.concatenate(
+                [np.zeros(0, dtype=np.int8)]
+                + [np.full(len(part), kind, dtype=np.int8) for part, (_, kind) in zip(line_arrays, lines)]
+            ),
+            np.array(rects, dtype=float).reshape(-1, 4),
+        )
+        for array in (outline.lines, outline.kinds, outline.rects):
+            array.flags.writeable = False
+        return outline
+
+
+class SpatialIndex:
+    """
+    Index over points in the world, each carrying an object, to find the nearest other object to a location. An index
+    is kept up to date as objects appear, disappear and move, instead of being rebuilt every simulation step, unless it
+    is not `incremental`. An index with `live_positions` reads the positions of its objects at every query, so it stays
+    valid while they move.
+
+    The `..._rows` queries are for indices over the beasts of a population, and answer by row in the population.
+    """
+
+    # Lets indices with a node per point leave out the instance dictionary
+    __slots__ = ()
+
+    incremental: bool = True
+    live_positions: bool = False
+
+    def find_nearest_neighbour(
+        self, location: Tuple[int, int], obj: Any, max_distance: float = math.inf
+    ) -> Tuple[Optional["KDTreePoint"], float]:
+        """
+        Find the point nearest to `location`, ignoring the point of `obj` and points at `max_distance` or further.
+        Returns the point and its distance, or None and infinity if there is no such point.
+        """
+        raise NotImplementedError
+
+    def all_nearest_neighbours(
+        self, max_distance: float = math.inf
+    ) -> List[Tuple["KDTreePoint", Optional["KDTreePoint"], float]]:
+        """
+        Find the nearest neighbour closer than `max_distance` of every point in the index. Returns the point, its
+        nearest neighbour and the distance between them for every point, with None and infinity if there is none.
+        """
+        results = []
+        for point in self.points():
+            neighbour, distance = self.find_nearest_neighbour((point.x, point.y), point.obj, max_distance)
+            results.append((point, neighbour, distance))
+        return results
+
+    def nearest_neighbour_rows(self, max_distance: float = math.inf) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        `all_nearest_neighbours` by row. Returns the rows of the beasts in the index, and per beast the row of its
+        nearest neighbour (-1 if none) and the distance to it.
+        """
+        results = self.all_nearest_neighbours(max_distance)
+        rows = np.array([point.obj._row for point, _, _ in results], dtype=np.int64)
+        neighbours = np.array(
+            [neighbour.obj._row if neighbour is not None else -1 for _, neighbour, _ in results], dtype=np.int64
+        )
+        distances = np.array([distance for _, _, distance in results], dtype=float)
+        return rows, neighbours, distances
+
+    def k_nearest(
+        self, location: Tuple[int, int], k: int, exclude: Any = None, max_distance: float = math.inf
+    ) -> List[Tuple["KDTreePoint", float]]:
+        """
+        Find the `k` points nearest to `location` that are closer than `max_distance`, ignoring the point of `exclude`.
+        Returns the points with their distance, nearest first.
+        """
+        candidates = [
+            (point, math.sqrt((point.x - location[0]) ** 2 + (point.y - location[1]) ** 2))
+            for point in self.points()
+            if point.obj is not exclude
+        ]
+        return heapq.nsmallest(
+            k, [candidate for candidate in candidates if candidate[1] < max_distance], lambda c: c[1]
+        )
+
+    def within_radius(self, location: Tuple[int, int], radius: float) -> List[Tuple["KDTreePoint", float]]:
+        """Find all points closer than `radius` to `location`. Returns the points with their distance, nearest first."""
+        return self.k_nearest(location, self.num_points(), max_distance=radius)
+
+    def many_within_radius(
+        self, locations: List[Tuple[int, int]], radius: float
+    ) -> List[List[Tuple["KDTreePoint", float]]]:
+        """`within_radius` for each of the locations"""
+        return [self.within_radius(location, radius) for location in locations]
+
+    def rows_within_radius(self, x: np.ndarray, y: np.ndarray, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        `many_within_radius` by row, for the locations in `x` and `y`. Returns the number of beasts found per location,
+        and the rows of the beasts found for all locations, by location and nearest first.
+        """
+        counts = [np.zeros(0, dtype=np.int64)]
+        rows = [np.zeros(0, dtype=np.int64)]
+        for start in range(0, len(x), ROWS_QUERY_BATCH):
+            batch = slice(start, start + ROWS_QUERY_BATCH)
+            found = self.many_within_radius(list(zip(x[batch].tolist(), y[batch].tolist())), radius)
+            counts.append(np.array([len(points) for points in found], dtype=np.int64))
+            rows.append(np.array([point.obj._row for points in found for point, _ in points], dtype=np.int64))
+        return np.concatenate(counts), np.concatenate(rows)
+
+    def within_rect(self, rect: Rect) -> List["KDTreePoint"]:
+        """Find all points inside `rect`, in no particular order"""
+        return [point for point in self.points() if rect.collidepoint(point.x, point.y)]
+
+    def points(self) -> List["KDTreePoint"]:
+        raise NotImplementedError
+
+    def num_points(self) -> int:
+        raise NotImplementedError
+
+    def __contains__(self, obj: Any) -> bool:
+        raise NotImplementedError
+
+    def insert(self, obj: Any, x: int, y: int):
+        raise NotImplementedError
+
+    def remove(self, obj: Any):
+        raise NotImplementedError
+
+    def update(self, obj: Any, x: int, y: int):
+        """Move the point of `obj` to a new location"""
+        raise NotImplementedError
+
+    def outline(self) -> IndexOutline:
+        """Copy of the lines and rects that show how the index splits the world"""
+        raise NotImplementedError
@@ -0,0 +1,351 @@
+import math
+import multiprocessing
+import os
+from multiprocessing.pool import Pool
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from pygame.rect import Rect
+
+from evolution.datastructures.array_kdtree import ArrayKDTree
+from evolution.datastructures.kdtree import KDTreePoint
+from evolution.datastructures.spatial_index import SPLIT_LINE, TILE_LINE, IndexOutline, SpatialIndex
+
+if TYPE_CHECKING:
+    from evolution.beast.population import Population
+
+DEFAULT_NUM_WORKERS = os.cpu_count() or 1
+# Below this many points per tile, sending the tiles to the workers costs more than searching them here
+MIN_POINTS_PER_WORKER = 500
+
+_pools: Dict[int, Pool] = {}
+
+
+def _get_pool(num_workers: int) -> Pool:
+    """Pool with the given number of worker processes, shared by all indices so it is only started once"""
+    if num_workers not in _pools:
+        _pools[num_workers] = multiprocessing.Pool(num_workers)
+    return _pools[num_workers]
+
+
+def close_pools():
+    for pool in _pools.values():
+        pool.terminate()
+    _pools.clear()
+
+
+def _tile_grid(num_tiles: int) -> Tuple[int, int]:
+    """Number of columns and rows of the grid closest to square with `num_tiles` tiles"""
+    rows = int(math.sqrt(num_tiles))
+    while num_tiles % rows != 0:
+        rows -= 1
+    return num_tiles // rows, rows
+
+
+def _nearest_in_tile(
+    area: Tuple[int, int, int, int], x: np.ndarray, y: np.ndarray, num_owned: int, max_distance: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the nearest neighbour of the first `num_owned` points of a tile, the others being the halo of the tile. Runs
+    in a worker process. Returns the index of the neighbour within the tile (-1 if none) and the distance per point.
+    """
+    points = _tile_points(x, y)
+    tree = ArrayKDTree(Rect(area), points)
+
+    neighbours = np.full(num_owned, -1, dtype=np.int64)
+    distances = np.full(num_owned, math.inf)
+    for index in range(num_owned):
+        point = points[index]
+        neighbour, distance = tree.find_nearest_neighbour((point.x, point.y), point.obj, max_distance)
+        if neighbour is not None:
+            neighbours[index] = neighbour.obj
+            distances[index] = distance
+    return neighbours, distances
+
+
+def _within_radius_in_tile(
+    area: Tuple[int, int, int, int],
+    x: np.ndarray,
+    y: np.ndarray,
+    location_x: np.ndarray,
+    location_y: np.ndarray,
+    radius: float,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Find the points of a tile and its halo within `radius` of each of the locations in the tile. Runs in a worker
+    process. Returns the number of points found per location, and the index within the tile and the distance of the
+    points found for all locations, by location and nearest first.
+    """
+    tree = ArrayKDTree(Rect(area), _tile_points(x, y))
+    counts = np.zeros(len(location_x), dtype=np.int64)
+    found: List[int] = []
+    distances: List[float] = []
+    for query, location in enumerate(zip(location_x.tolist(), location_y.tolist())):
+        points = tree.within_radius(location, radius)
+        counts[query] = len(points)
+        found += [point.obj for point, _ in points]
+        distances += [distance for _, distance in points]
+    return counts, np.array(found, dtype=np.int64), np.array(distances, dtype=float)
+
+
+def _tile_points(x: np.ndarray, y: np.ndarray) -> List[KDTreePoint]:
+    """Points of a tile, carrying their index within the tile"""
+    return [
+        KDTreePoint(point_x, point_y, index) for index, (point_x, point_y) in enumerate(zip(x.tolist(), y.tolist()))
+    ]
+
+
+class TiledIndex(SpatialIndex):
+    """
+    Index over the beasts in `rows` of a population, that splits the world into one tile per worker process to answer
+    bulk queries in parallel. Each worker searches the beasts of its tile, together with a halo of the beasts of the
+    neighbouring tiles that are closer to the tile than the maximum search distance, so the results are the same as for
+    a search over the whole world.
+
+    The index holds the rows of its beasts instead of a point per beast, and reads their positions from the population
+    at every query. Building it costs next to nothing, and it stays valid while the beasts move during a step, as long
+    as the rows do not change. The tiles are found again at every query, and only the bulk queries with a limited
+    distance are parallel. The other queries are answered by an `ArrayKDTree` over all beasts.
+
+    Only these queries are parallel: the workers hold no state between queries. Every query sends the positions of
+    each tile to a worker, which builds a tree over them again. Stepping the beasts, births, deaths and fights stay in
+    the main process. So the speed-up is bounded by the serial part of a step and does not grow linearly with the
+    number of workers.
+    """
+
+    incremental = False
+    live_positions = True
+
+    def __init__(
+        self,
+        area: Rect,
+        population: "Population",
+        rows: np.ndarray,
+        num_workers: int = DEFAULT_NUM_WORKERS,
+        min_points_per_worker: int = MIN_POINTS_PER_WORKER,
+    ):
+        self.area = area
+        self.population = population
+        self.beast_rows = rows
+        self.num_workers = max(num_workers, 1)
+        self.min_points_per_worker = min_points_per_worker
+        self.columns, self.rows = _tile_grid(self.num_workers)
+        self._tree: Optional[ArrayKDTree] = None
+        self._tree_coordinates: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    @property
+    def tree(self) -> ArrayKDTree:
+        """Tree over all beasts, built on first use and again once they moved"""
+        x, y = self._coordinates()
+        if (
+            self._tree is None
+            or self._tree_coordinates is None
+            or not np.array_equal(self._tree_coordinates[0], x)
+            or not np.array_equal(self._tree_coordinates[1], y)
+        ):
+            self._tree = ArrayKDTree(self.area, self.points())
+            self._tree_coordinates = (x, y)
+        return self._tree
+
+    def points(self) -> List[KDTreePoint]:
+        x, y = self._coordinates()
+        return [
+            KDTreePoint(point_x, point_y, self.population[row])
+            for row, point_x, point_y in zip(self.beast_rows.tolist(), x.tolist(), y.tolist())
+        ]
+
+    def num_points(self) -> int:
+        return len(self.beast_rows)
+
+    def __contains__(self, obj: Any) -> bool:
+        return obj in self.population and bool(np.any(self.beast_rows == obj._row))
+
+    def find_nearest_neighbour(
+        self, location: Tuple[int, int], obj: Any, max_distance: float = math.inf
+    ) -> Tuple[Optional[KDTreePoint], float]:
+        return self.tree.find_nearest_neighbour(location, obj, max_distance)
+
+    def within_radius(self, location: Tuple[int, int], radius: float) -> List[Tuple[KDTreePoint, float]]:
+        return self.tree.within_radius(location, radius)
+
+    def within_rect(self, rect: Rect) -> List[KDTreePoint]:
+        x, y = self._coordinates()
+        inside = np.flatnonzero((x >= rect.left) & (x < rect.right) & (y >= rect.top) & (y < rect.bottom))
+        return [
+            KDTreePoint(point_x, point_y, self.population[row])
+            for row, point_x, point_y in zip(self.beast_rows[inside].tolist(), x[inside].tolist(), y[inside].tolist())
+        ]
+
+    def _parallel(self, num_queries: int, max_distance: float) -> bool:
+        """Whether splitting the queries over the workers is worth it"""
+        return (
+            self.num_workers > 1
+            and not math.isinf(max_distance)
+            and min(num_queries, len(self.beast_rows)) >= self.min_points_per_worker * self.num_workers
+        )
+
+    def all_nearest_neighbours(
+        self, max_distance: float = math.inf
+    ) -> List[Tuple[KDTreePoint, Optional[KDTreePoint], float]]:
+        indices, neighbours, distances = self._nearest(max_distance)
+        points = self.points()
+        return [
+            (points[index], points[neighbour] if neighbour >= 0 else None, distance)
+            for index, neighbour, distance in zip(indices.tolist(), neighbours.tolist(), distances.tolist())
+        ]
+
+    def nearest_neighbour_rows(self, max_distance: float = math.inf) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        indices, neighbours, distances = self._nearest(max_distance)
+        return self.beast_rows[indices], np.where(neighbours >= 0, self.beast_rows[neighbours], -1), distances
+
+    def _nearest(self, max_distance: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Nearest neighbour of every beast, as the index into `beast_rows` of the beasts, of their neighbour (-1 if none) and
+        the distance to it
+        """
+        x, y = self._coordinates()
+        if not self._parallel(len(self.beast_rows), max_distance):
+            area = (self.area.left, self.area.top, self.area.width, self.area.height)
+            neighbours, distances = _nearest_in_tile(area, x, y, len(self.beast_rows), max_distance)
+            return np.arange(len(self.beast_rows)), neighbours, distances
+
+        tiles = self._tile_index(x, y)
+        tasks = []
+        tile_indices = []
+        for tile, rect in enumerate(self._tile_rects()):
+            owned = tiles == tile
+            halo = self._near(x, y, rect, max_distance) & ~owned
+            indices = np.concatenate([np.flatnonzero(owned), np.flatnonzero(halo)])
+            num_owned = int(np.count_nonzero(owned))
+            tile_indices.append((indices, num_owned))
+            tasks.append((self._halo_area(rect, max_distance), x[indices], y[indices], num_owned, max_distance))
+        tile_results = _get_pool(self.num_workers).starmap(_nearest_in_tile, tasks, chunksize=1)
+
+        # The indices within a tile translate to indices into `beast_rows` through the indices of the tile
+        return (
+            np.concatenate([indices[:num_owned] for indices, num_owned in tile_indices]),
+            np.concatenate(
+                [
+                    np.where(tile_neighbours >= 0, indices[tile_neighbours], -1)
+                    for (indices, _), (tile_neighbours, _) in zip(tile_indices, tile_results)
+                ]
+            ),
+            np.concatenate([tile_distances for _, tile_distances in tile_results]),
+        )
+
+    def many_within_radius(
+        self, locations: List[Tuple[int, int]], radius: float
+    ) -> List[List[Tuple[KDTreePoint, float]]]:
+        location_x = np.array([location[0] for location in locations], dtype=np.int64)
+        location_y = np.array([location[1] for location in locations], dtype=np.int64)
+        counts, found, distances = self._within_radius(location_x, location_y, radius)
+        points = self.points()
+        ends = np.cumsum(counts).tolist()
+        return [
+            [
+                (points[index], distance)
+                for index, distance in zip(found[end - count : end], distances[end - count : end])
+            ]
+            for count, end in zip(counts.tolist(), ends)
+        ]
+
+    def rows_within_radius(self, x: np.ndarray, y: np.ndarray, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        counts, found, _ = self._within_radius(x, y, radius)
+        return counts, self.beast_rows[found]
+
+    def _within_radius(
+        self, location_x: np.ndarray, location_y: np.ndarray, radius: float
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Beasts within `radius` of every location, as the number found per location, and the indices into `beast_rows` and
+        distances of the beasts found for all locations, by location and nearest first
+        """
+        x, y = self._coordinates()
+        if not self._parallel(len(location_x), radius):
+            area = (self.area.left, self.area.top, self.area.width, self.area.height)
+            return _within_radius_in_tile(area, x, y, location_x, location_y, radius)
+
+        location_tiles = self._tile_index(location_x, location_y)
+        tasks = []
+        tile_indices = []
+        for tile, rect in enumerate(self._tile_rects()):
+            queries = np.flatnonzero(location_tiles == tile)
+            indices = np.flatnonzero(self._near(x, y, rect, radius))
+            tile_indices.append((queries, indices))
+            tasks.append(
+                (
+                    self._halo_area(rect, radius),
+                    x[indices],
+                    y[indices],
+                    location_x[queries],
+                    location_y[queries],
+                    radius,
+                )
+            )
+        tile_results = _get_pool(self.num_workers).starmap(_within_radius_in_tile, tasks, chunksize=1)
+
+        # The results come by tile, a stable sort by location keeps them nearest first per location
+        counts = np.zeros(len(location_x), dtype=np.int64)
+        found_queries = []
+        found = []
+        distances = []
+        for (queries, indices), (tile_counts, tile_found, tile_distances) in zip(tile_indices, tile_results):
+            counts[queries] = tile_counts
+            found_queries.append(np.repeat(queries, tile_counts))
+            found.append(indices[tile_found])
+            distances.append(tile_distances)
+        order = np.argsort(np.concatenate(found_queries), kind="stable")
+        return counts, np.concatenate(found)[order], np.concatenate(distances)[order]
+
+    def _coordinates(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.population.x[self.beast_rows], self.population.y[self.beast_rows]
+
+    def _tile_rects(self) -> List[Tuple[float, float, float, float]]:
+        """Left, top, right and bottom of every tile, row by row"""
+        tile_width = self.area.width / self.columns
+        tile_height = self.area.height / self.rows
+        return [
+            (
+                self.area.left + column * tile_width,
+                self.area.top + row * tile_height,
+                self.area.left + (column + 1) * tile_width,
+                self.area.top + (row + 1) * tile_height,
+            )
+            for row in range(self.rows)
+            for column in range(self.columns)
+        ]
+
+    def _tile_index(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Index into `_tile_rects` of the tile of every location, locations outside of the area go to the edge tiles"""
+        column = np.clip(
+            ((x - self.area.left) // (self.area.width / self.columns)).astype(np.int64), 0, self.columns - 1
+        )
+        row = np.clip(((y - self.area.top) // (self.area.height / self.rows)).astype(np.int64), 0, self.rows - 1)
+        return row * self.columns + column
+
+    @staticmethod
+    def _near(x: np.ndarray, y: np.ndarray, rect: Tuple[float, float, float, float], halo: float) -> np.ndarray:
+        """Mask of the points that can be closer than `halo` to a location in the tile"""
+        left, top, right, bottom = rect
+        return (x > left - halo) & (x < right + halo) & (y > top - halo) & (y < bottom + halo)
+
+    @staticmethod
+    def _halo_area(rect: Tuple[float, float, float, float], halo: float) -> Tuple[int, int, int, int]:
+        left, top, right, bottom = rect
+        return (
+            math.floor(left - halo),
+            math.floor(top - halo),
+            math.ceil(right - left + 2 * halo),
+            math.ceil(bottom - top + 2 * halo),
+        )
+
+    def outline(self) -> IndexOutline:
+        area = self.area
+        tile_lines = [
+            (x, area.top, x, area.bottom)
+            for x in (area.left + tile_column * area.width / self.columns for tile_column in range(1, self.columns))
+        ] + [
+            (area.left, y, area.right, y)
+            for y in (area.top + tile_row * area.height / self.rows for tile_row in range(1, self.rows))
+        ]
+        return IndexOutline.create([(tile_lines, TILE_LINE), (self.tree.outline().lines, SPLIT_LINE)])
@@ -0,0 +1,137 @@
+import argparse
+import os
+import random
+from time import time
+from typing import List, Optional
+
+import numpy as np
+
+# The simulation model only imports pygame for its rectangles and the debug drawing of the spatial indices, which is
+# never called here. pygame is never initialised, so no display, font or audio subsystem is touched.
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from evolution.beast.beast import Beast  # noqa: E402
+from evolution.beast.simulate import simulate_beasts  # noqa: E402
+from evolution.datastructures.spatial_index import SpatialIndexType  # noqa: E402
+from evolution.datastructures.tiled_index import close_pools  # noqa: E402
+from evolution.util.profiling import step_timers  # noqa: E402
+from evolution.world.metrics import population_metrics  # noqa: E402
+from evolution.world.snapshot import load_snapshot, save_snapshot  # noqa: E402
+from evolution.world.state import state  # noqa: E402
+from evolution.world.world import world  # noqa: E402
+
+DEFAULT_NUM_BEASTS = 50
+DEFAULT_REPORT_INTERVAL = 1000
+
+
+def setup_world(num_beasts: int):
+    state.beasts += [Beast() for _ in range(num_beasts)]
+
+
+def run(num_steps: int, report_interval: int = DEFAULT_REPORT_INTERVAL) -> int:
+    """
+    Run the simulation for at most `num_steps` steps, mirroring the stepping done by `Scheduler.simulation_loop` but
+    without pausing, pacing or rendering. Returns the number of steps performed.
+    """
+    start = time()
+    last_report = start
+    last_report_step = 0
+    steps = 0
+
+    while state.active and steps < num_steps:
+        simulate_beasts()
+        steps += 1
+
+        if len(state.beasts) == 0:
+            state.active = False
+
+        if report_interval > 0 and steps % report_interval == 0:
+            now = time()
+            _report(steps, (steps - last_report_step) / max(now - last_report, 1e-9))
+            last_report = now
+            last_report_step = steps
+
+    duration = time() - start
+    print(f"Finished after {steps} steps in {duration:.2f}s")
+    _report(steps, steps / max(duration, 1e-9))
+    return steps
+
+
+def _report(step: int, steps_per_second: float):
+    alive = int(np.count_nonzero(state.beasts.column("dead") == 0))
+    dead = len(state.beasts) - alive
+    print(f"step {step}: {steps_per_second:.1f} SPS, {alive} alive, {dead} dead")
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the evolution simulation without a display")
+    parser.add_argument("--beasts", type=int, default=DEFAULT_NUM_BEASTS, help="number of beasts to start with")
+    parser.add_argument("--steps", type=int, required=True, help="maximum number of simulation steps")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the random number generator")
+    parser.add_argument(
+        "--index",
+        choices=[index_type.name.lower() for index_type in SpatialIndexType],
+        default=state.spatial_index_type.name.lower(),
+        help="spatial index used to find the nearest mates",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=state.num_workers,
+        help="number of worker processes, and so of tiles, of the tiled spatial index",
+    )
+    parser.add_argument(
+        "--world-size",
+        type=lambda size: tuple(int(length) for length in size.split("x")),
+        default=world.size,
+        help="width and height of a new world as WIDTHxHEIGHT, a loaded world keeps the size it was saved with",
+    )
+    parser.add_argument("--load", default=None, help="resume from this snapshot instead of starting with new beasts")
+    parser.add_argument("--save", default=None, help="write a snapshot to this file when the run ends")
+    parser.add_argument(
+        "--timings", default=None, help="append the duration of every phase of every step to this JSON lines file"
+    )
+    parser.add_argument("--metrics", default=None, help="stream the population metrics of every step to this CSV file")
+    parser.add_argument(
+        "--report-interval",
+        type=int,
+        default=DEFAULT_REPORT_INTERVAL,
+        help="print throughput and population every this many steps (0 to disable)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = _parse_args(argv)
+    if args.seed is not None:
+        random.seed(args.seed)
+        np.random.seed(args.seed)
+
+    state.spatial_index_type = SpatialIndexType[args.index.upper()]
+    state.num_workers = args.workers
+    world.resize(*args.world_size)
+    # Nothing is drawn
+    state.publish_frames = False
+    if args.load is not None:
+        load_snapshot(args.load)
+        print(f"Loaded {len(state.beasts)} beasts from {args.load}")
+    else:
+        setup_world(args.beasts)
+    step_timers.export_to(args.timings)
+    population_metrics.export_to(args.metrics)
+    try:
+        run(args.steps, args.report_interval)
+    finally:
+        close_pools()
+        step_timers.export_to(None)
+        population_metrics.export_to(None)
+    if args.timings is not None:
+        print(step_timers.summary())
+
+    if args.save is not None:
+        save_snapshot(args.save)
+        print(f"Saved {len(state.beasts)} beasts to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,17 @@
 from threading import Thread, current_thread
-from time import sleep, time
 
 import pygame
 
 from evolution.beast.beast import Beast
-from evolution.beast.simulate import simulate_beasts
+from evolution.beast.simulate import publish_frame
 from evolution.simulation.events import EventLoop
 from evolution.simulation.render import Render
+from evolution.simulation.scheduler import Scheduler
 from evolution.simulation.ui.ui import UI
 from evolution.util.profiling import profileit
 from evolution.world.state import state
 
 NUM_BEASTS = 50
-SIMULATION_STEP_TIME = 0.01
 
 pygame.init()
 pygame.font.init()
@@ -20,47 +19,29 @@ pygame.font.init()
 ui = UI(state)
 render = Render(state, ui)
 eventLoop = EventLoop(state, ui)
-
-time_for_step: float = 0.1
+scheduler = Scheduler(state, render, eventLoop)
 
 
 def setup_world():
     print("Setting up world")
     state.beasts += [Beast() for _ in range(NUM_BEASTS)]
+    publish_frame()
 
 
 @profileit("profile_for_game_loop")
 def _game_loop():
-    global time_for_step
-    last_simulation_iteration = 0
-
-    while state.active:
-        if not state.simulation_paused or state.perform_step:
-            if time() - last_simulation_iteration > SIMULATION_STEP_TIME:
-                simulate_beasts()
-
-                if len(state.beasts) == 0:
-                    state.active = False
-
-                time_for_step = time() - last_simulation_iteration
-                last_simulation_iteration = time()
-
-            state.perform_step = False
-        else:
-            sleep(0.1)
+    scheduler.simulation_loop()
 
 
 @profileit("profile_for_render_loop")
 def _render_loop():
     print("Starting render loop")
-    while state.active:
-        render.draw(time_for_step)
+    scheduler.render_loop()
 
 
 def _event_loop():
     print("Starting event loop")
-    while state.active:
-        eventLoop.check_events()
+    scheduler.handle_events()
 
 
 def run_simulation():
@@ -0,0 +1,74 @@
+import math
+from typing import Tuple
+
+import numpy as np
+from pygame.rect import Rect
+
+MAX_ZOOM = 8.0
+# Zoom factor of a step of the mouse wheel
+ZOOM_STEP = 1.25
+# Screen pixels moved per press of an arrow key
+PAN_STEP = 100
+
+
+class Camera:
+    """
+    The part of the world shown on the screen: the world location at the top left corner of the screen, and the zoom as
+    the number of screen pixels per unit of the world. It can zoom out until the whole world fits on the screen, and
+    never shows more than the world along an axis where the world is larger than the screen. Along an axis where the
+    world is smaller, the world is centered.
+    """
+
+    def __init__(self, screen_size: Tuple[int, int], world_size: Tuple[int, int]):
+        self.screen_size = screen_size
+        self.world_size = world_size
+        self.min_zoom = min(screen_size[0] / world_size[0], screen_size[1] / world_size[1])
+        self.zoom = self.min_zoom
+        self.x = 0.0
+        self.y = 0.0
+        self._clamp()
+
+    @property
+    def offset(self) -> Tuple[float, float]:
+        return (self.x, self.y)
+
+    def viewport(self) -> Rect:
+        """Area of the world on the screen"""
+        left, top = math.floor(self.x), math.floor(self.y)
+        right = math.ceil(self.x + self.screen_size[0] / self.zoom)
+        bottom = math.ceil(self.y + self.screen_size[1] / self.zoom)
+        return Rect(left, top, right - left, bottom - top)
+
+    def to_screen(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Screen positions of world locations"""
+        return (x - self.x) * self.zoom, (y - self.y) * self.zoom
+
+    def to_world(self, position: Tuple[float, float]) -> Tuple[float, float]:
+        """World location of a screen position"""
+        return (self.x + position[0] / self.zoom, self.y + position[1] / self.zoom)
+
+    def pan(self, dx: float, dy: float):
+        """Move the view by a number of screen pixels"""
+        self.x += dx / self.zoom
+        self.y += dy / self.zoom
+        self._clamp()
+
+    def zoom_at(self, position: Tuple[float, float], factor: float):
+        """Zoom by `factor`, keeping the world location under the screen `position` in place"""
+        world_x, world_y = self.to_world(position)
+        self.zoom = min(max(self.zoom * factor, self.min_zoom), MAX_ZOOM)
+        self.x = world_x - position[0] / self.zoom
+        self.y = world_y - position[1] / self.zoom
+        self._clamp()
+
+    def _clamp(self):
+        visible_width = self.screen_size[0] / self.zoom
+        visible_height = self.screen_size[1] / self.zoom
+        self.x = _clamp_axis(self.x, visible_width, self.world_size[0])
+        self.y = _clamp_axis(self.y, visible_height, self.world_size[1])
+
+
+def _clamp_axis(start: float, visible: float, world: float) -> float:
+    if visible >= world:
+        return (world - visible) / 2
+    return min(max(start, 0.0), world - visible)
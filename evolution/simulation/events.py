@@ -1,25 +1,50 @@
 import pygame
 
+from evolution.simulation.camera import PAN_STEP, ZOOM_STEP
 from evolution.simulation.keyevents import handle_key_press
 from evolution.simulation.ui.ui import UI
 from evolution.world.state import State
 
+# Direction the view moves in for every arrow key
+PAN_KEYS = {
+    pygame.K_LEFT: (-1, 0),
+    pygame.K_RIGHT: (1, 0),
+    pygame.K_UP: (0, -1),
+    pygame.K_DOWN: (0, 1),
+}
+
 
 class EventLoop:
     def __init__(self, state: State, ui: UI):
         self.state = state
         self.ui = ui
 
-    def check_events(self):
-        events = pygame.event.get()
+    def wait_for_events(self, timeout: int) -> bool:
+        """
+        Block until there are events or `timeout` milliseconds passed, and handle all pending events. Returns whether
+        there were any.
+        """
+        event = pygame.event.wait(timeout)
+        if event.type == pygame.NOEVENT:
+            return False
 
-        for event in events:
+        self._handle_event(event)
+        for event in pygame.event.get():
             self._handle_event(event)
+        return True
 
     def _handle_event(self, event):
         if event.type == pygame.QUIT:
             self.state.active = False
-        elif event.type == pygame.MOUSEBUTTONUP:
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == pygame.BUTTON_LEFT:
             self.ui.handle_mouse_click(pygame.mouse.get_pos())
+        elif event.type == pygame.MOUSEWHEEL:
+            self.ui.camera.zoom_at(pygame.mouse.get_pos(), ZOOM_STEP**event.y)
+        elif event.type == pygame.MOUSEMOTION and event.buttons[2]:
+            # Drag the world along with the right mouse button
+            self.ui.camera.pan(-event.rel[0], -event.rel[1])
+        elif event.type == pygame.KEYDOWN and event.key in PAN_KEYS:
+            dx, dy = PAN_KEYS[event.key]
+            self.ui.camera.pan(dx * PAN_STEP, dy * PAN_STEP)
         elif event.type == pygame.KEYUP:
             handle_key_press(event.key, self.state, self.ui)
@@ -1,3 +1,7 @@
+from enum import Enum
+from typing import Any, Callable, Dict, List, Tuple
+
+from evolution.simulation.ui.interactions import change_speed
 from evolution.simulation.ui.ui import UI
 from evolution.world.state import State
 
@@ -23,17 +27,33 @@ def _set_state_true(state: State, ui: UI, property: str):
         setattr(state, property, True)
 
 
+def _cycle_state(state: State, ui: UI, property: str):
+    value = getattr(state, property, None)
+    if isinstance(value, Enum):
+        options = list(type(value))
+        setattr(state, property, options[(options.index(value) + 1) % len(options)])
+
+
+def _change_speed(state: State, ui: UI, factor: float):
+    change_speed(state, factor)
+
+
 def _call_UI_function(state: State, ui: UI, function: str):
     if hasattr(ui, function) and callable(getattr(ui, function)):
         func = getattr(ui, function)
         func()
 
 
-keymap = {
+keymap: Dict[int, Tuple[Callable[..., None], List[Any]]] = {
     27: (_call_UI_function, ["handle_escape"]),
     32: (_toggle_state, ["simulation_paused"]),
+    45: (_change_speed, [1 / 2]),
+    61: (_change_speed, [2]),
+    102: (_toggle_state, ["turbo"]),
     109: (_toggle_state, ["render_nearest_mate"]),
+    105: (_cycle_state, ["spatial_index_type"]),
     110: (_toggle_state, ["render_beast_name"]),
+    112: (_toggle_state, ["render_timings"]),
     115: (_set_state_true, ["perform_step"]),
     116: (_toggle_state, ["render_kdtree"]),
 }
@@ -1,12 +1,18 @@
 from time import time
 
+import numpy as np
 import pygame
 
+from evolution.datastructures.spatial_index import GRID_LINE, SPLIT_LINE
+from evolution.simulation.camera import Camera
+from evolution.simulation.render_helpers import draw_dashed_line, name_glyphs
+from evolution.simulation.sprites import sprite_cache
 from evolution.simulation.ui.ui import UI
+from evolution.simulation.ui_constants import XSIZE, YSIZE
+from evolution.util.profiling import frame_timers
+from evolution.world.frame import Frame
 from evolution.world.state import State
-from evolution.world.world import XSIZE, YSIZE
-
-FRAME_LIMIT = 1 / 1000
+from evolution.world.world import world
 
 
 class Render:
@@ -18,26 +24,80 @@ class Render:
         self.screen = pygame.display.set_mode([XSIZE, YSIZE])
         self.state = state
         self.ui = ui
+        self.camera = Camera((XSIZE, YSIZE), world.size)
         ui.set_screen(self.screen)
         ui.set_font(self.font)
+        ui.set_camera(self.camera)
 
     def draw(self, time_for_step: float):
-        if time() - self.last_frame > FRAME_LIMIT:
-            self._draw_world()
-            self._draw_beasts()
-            self._draw_kdtree()
-            self.ui.draw(time() - self.last_frame, time_for_step)
+        """Draw the latest frame and the UI, the caller limits how often (see `Scheduler.render_loop`)"""
+        # The simulation publishes a new frame by replacing it, so everything drawn here is from the same step
+        frame = self.state.frame
+        # The next frame only holds the beasts in view
+        self.state.viewport = self.camera.viewport()
+        frame_timers.start()
+        self._draw_world()
+        frame_timers.lap("world")
+        if frame is not None:
+            self._draw_beasts(frame)
+            frame_timers.lap("beasts")
+            self._draw_kdtree(frame)
+            frame_timers.lap("kdtree")
+        self.ui.draw(frame, time() - self.last_frame, time_for_step)
+        frame_timers.lap("ui")
 
-            pygame.display.flip()
-            self.last_frame = time()
+        pygame.display.flip()
+        frame_timers.lap("flip")
+        frame_timers.end()
+        self.last_frame = time()
 
     def _draw_world(self):
         self.screen.fill((255, 255, 255))
 
-    def _draw_beasts(self):
-        for beast in self.state.beasts:
-            beast.draw(self.screen, self.state.render_nearest_mate, self.state.render_beast_name)
+    def _draw_beasts(self, frame: Frame):
+        self.screen.blits(sprite_cache.frame_sprites(frame, self.camera), doreturn=False)
+        alive = np.flatnonzero(frame.dead == 0)
+        if self.state.render_nearest_mate:
+            self._draw_to_nearest_mates(frame, alive)
+        if self.state.render_beast_name:
+            self._draw_names(frame, alive)
+
+    def _draw_to_nearest_mates(self, frame: Frame, rows: np.ndarray):
+        rows = rows[frame.nearest_x[rows] >= 0]
+        start_x, start_y = self.camera.to_screen(frame.x[rows], frame.y[rows])
+        end_x, end_y = self.camera.to_screen(frame.nearest_x[rows], frame.nearest_y[rows])
+        for color, start, end in zip(
+            frame.color[rows].tolist(),
+            zip(start_x.tolist(), start_y.tolist()),
+            zip(end_x.tolist(), end_y.tolist()),
+        ):
+            draw_dashed_line(self.screen, color, start, end, 1)
+
+    def _draw_names(self, frame: Frame, rows: np.ndarray):
+        x, y = self.camera.to_screen(frame.x[rows], frame.y[rows])
+        blits = []
+        for beast_id, position in zip(frame.ids[rows].tolist(), zip(x.tolist(), y.tolist())):
+            blits += name_glyphs.label_blits(str(beast_id), position)
+        self.screen.blits(blits, doreturn=False)
+
+    def _draw_kdtree(self, frame: Frame):
+        outline = frame.index_outline
+        if not self.state.render_kdtree or outline is None:
+            return
+
+        start_x, start_y = self.camera.to_screen(outline.lines[:, 0], outline.lines[:, 1])
+        end_x, end_y = self.camera.to_screen(outline.lines[:, 2], outline.lines[:, 3])
+        for kind, start, end in zip(
+            outline.kinds.tolist(), zip(start_x.tolist(), start_y.tolist()), zip(end_x.tolist(), end_y.tolist())
+        ):
+            if kind == SPLIT_LINE:
+                pygame.draw.aaline(self.screen, "green" if start[0] == end[0] else "orange", start, end)
+            elif kind == GRID_LINE:
+                pygame.draw.line(self.screen, (220, 220, 220), start, end)
+            else:
+                pygame.draw.line(self.screen, "purple", start, end, 2)
 
-    def _draw_kdtree(self):
-        if self.state.render_kdtree and self.state.tree is not None:
-            self.state.tree.draw(self.screen)
+        left, top = self.camera.to_screen(outline.rects[:, 0], outline.rects[:, 1])
+        sizes = outline.rects[:, 2:] * self.camera.zoom
+        for rect in zip(left.tolist(), top.tolist(), sizes[:, 0].tolist(), sizes[:, 1].tolist()):
+            pygame.draw.rect(self.screen, "orange", rect, width=1)
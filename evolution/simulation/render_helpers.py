@@ -1,10 +1,52 @@
 import math
-from typing import Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
 import pygame
 
 from evolution.util.math_helpers import get_direction, translate_non_rounded
 
+_name_font: Optional[pygame.font.Font] = None
+
+
+def get_name_font() -> pygame.font.Font:
+    """Font of the id labels of beasts, created on first use so simulating without a display never needs it"""
+    global _name_font
+    if _name_font is None:
+        _name_font = pygame.font.SysFont("Calibri", 10)
+    return _name_font
+
+
+class GlyphCache:
+    """
+    Rendered characters of a font, to compose labels from instead of rendering a surface per label. The glyphs are
+    rendered on first use and shared by all labels, so memory does not grow with the number of labels ever drawn.
+    """
+
+    def __init__(self, get_font: Callable[[], pygame.font.Font], color: Tuple[int, int, int] = (0, 0, 0)):
+        self._get_font = get_font
+        self.color = color
+        self._glyphs: Dict[str, pygame.surface.Surface] = {}
+
+    def glyph(self, character: str) -> pygame.surface.Surface:
+        glyph = self._glyphs.get(character)
+        if glyph is None:
+            glyph = self._get_font().render(character, True, self.color)
+            self._glyphs[character] = glyph
+        return glyph
+
+    def label_blits(
+        self, text: str, center: Tuple[float, float]
+    ) -> List[Tuple[pygame.surface.Surface, Tuple[float, float]]]:
+        """Glyphs of `text` and where to blit them to center the text on `center`, for `Surface.blits`"""
+        glyphs = [self.glyph(character) for character in text]
+        x = center[0] - sum(glyph.get_width() for glyph in glyphs) / 2
+        y = center[1] - glyphs[0].get_height() / 2 if glyphs else center[1]
+        blits = []
+        for glyph in glyphs:
+            blits.append((glyph, (x, y)))
+            x += glyph.get_width()
+        return blits
+
 
 def draw_multiline_text(screen: pygame.surface.Surface, text: str, location: Tuple[int, int], font: pygame.font.Font):
     lines = [font.render(line, True, (0, 0, 0)) for line in text.split("\n")]
@@ -31,3 +73,6 @@ def draw_dashed_line(
 
 def _round_point(point: Tuple[float, float]) -> Tuple[int, int]:
     return (round(point[0]), round(point[1]))
+
+
+name_glyphs = GlyphCache(get_name_font)
@@ -0,0 +1,141 @@
+import threading
+import time
+from typing import Optional, Protocol
+
+import pygame
+
+from evolution.beast.simulate import publish_frame, simulate_beasts
+from evolution.simulation.events import EventLoop
+from evolution.simulation.render import Render
+from evolution.world.state import State
+
+# Time between steps at normal speed
+SIMULATION_STEP_TIME = 0.01
+# Used when the display does not tell its refresh rate
+DEFAULT_FRAME_RATE = 60
+# Longest the event loop blocks before checking whether the simulation is still active, in milliseconds
+EVENT_TIMEOUT = 100
+# A simulation that falls further behind than this many steps skips them, instead of taking ever longer to catch up
+MAX_CATCH_UP_STEPS = 5
+
+
+def display_refresh_rate() -> int:
+    """Refresh rate of the display, if pygame can tell it"""
+    get_refresh_rate = getattr(pygame.display, "get_current_refresh_rate", None)
+    refresh_rate = get_refresh_rate() if get_refresh_rate is not None else 0
+    return refresh_rate if refresh_rate > 0 else DEFAULT_FRAME_RATE
+
+
+class Clock(Protocol):
+    """Time and waiting as the scheduler sees them"""
+
+    def perf_counter(self) -> float:
+        ...
+
+    def wait(self, event: threading.Event, seconds: float):
+        """Block until `event` is set or `seconds` passed"""
+
+
+class SystemClock:
+    def perf_counter(self) -> float:
+        return time.perf_counter()
+
+    def wait(self, event: threading.Event, seconds: float):
+        event.wait(seconds)
+
+
+class Scheduler:
+    """
+    Paces the simulation, render and event threads without busy waiting. The simulation steps on a fixed timestep of
+    SIMULATION_STEP_TIME divided by the speed, or `turbo_steps_per_frame` steps per frame in turbo, and sleeps until
+    the next step is due. Frames are published at most once per frame drawn, rendering is capped to the refresh rate of
+    the display and events are waited for. Every thread is woken up early by `wake` when events change the state.
+    """
+
+    def __init__(
+        self,
+        state: State,
+        render: Render,
+        event_loop: EventLoop,
+        frame_rate: int = 0,
+        clock: Optional[Clock] = None,
+    ):
+        self.state = state
+        self.render = render
+        self.event_loop = event_loop
+        self.frame_rate = frame_rate if frame_rate > 0 else display_refresh_rate()
+        self.time_for_step = 0.1
+        self.clock: Clock = clock if clock is not None else SystemClock()
+        self._wake = threading.Event()
+        # A step was simulated since the last frame was published
+        self._unpublished = False
+
+    def wake(self):
+        self._wake.set()
+
+    def step_time(self) -> float:
+        if self.state.turbo:
+            return 1 / (self.frame_rate * self.state.turbo_steps_per_frame)
+        return SIMULATION_STEP_TIME / self.state.speed
+
+    def simulation_loop(self):
+        next_step = self.clock.perf_counter()
+        last_step = next_step
+        last_publish = next_step
+        while self.state.active:
+            if self.state.simulation_paused and not self.state.perform_step:
+                self._publish_while_paused()
+                self._sleep(1 / self.frame_rate)
+                next_step = self.clock.perf_counter()
+                continue
+
+            now = self.clock.perf_counter()
+            if now < next_step and not self.state.perform_step:
+                self._sleep(next_step - now)
+                continue
+
+            # Frames are only drawn at the frame rate, so publishing more often is wasted
+            publish = self.state.perform_step or now - last_publish >= 1 / self.frame_rate
+            simulate_beasts(publish)
+            if publish:
+                last_publish = now
+            self._unpublished = not publish
+            self.state.perform_step = False
+            if len(self.state.beasts) == 0:
+                self.state.active = False
+
+            self.time_for_step = now - last_step
+            last_step = now
+            step_time = self.step_time()
+            next_step = max(next_step + step_time, self.clock.perf_counter() - MAX_CATCH_UP_STEPS * step_time)
+
+    def _publish_while_paused(self):
+        frame = self.state.frame
+        if (
+            self._unpublished
+            or frame is None
+            or frame.selected_id != self.state.selected_beast_id
+            or frame.viewport != self.state.viewport
+            or (self.state.render_kdtree and frame.index_outline is None)
+            or (self.state.capture_tree_nodes and frame.tree_nodes is None)
+        ):
+            # Show the last step, a beast selected, the part of the world moved into view, or the index while paused
+            publish_frame()
+            self._unpublished = False
+
+    def _sleep(self, seconds: float):
+        self.clock.wait(self._wake, seconds)
+        self._wake.clear()
+
+    def render_loop(self):
+        clock = pygame.time.Clock()
+        while self.state.active:
+            self.render.draw(self.time_for_step)
+            # Sleeps for the rest of the frame
+            clock.tick(self.frame_rate)
+
+    def handle_events(self):
+        while self.state.active:
+            if self.event_loop.wait_for_events(EVENT_TIMEOUT):
+                self.wake()
+        self.wake()
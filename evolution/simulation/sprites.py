@@ -0,0 +1,153 @@
+from collections import OrderedDict
+from functools import partial
+from typing import Callable, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pygame
+
+from evolution.beast.beast import Beast
+from evolution.beast.population import DESPAWN_TIME
+from evolution.simulation.camera import Camera
+from evolution.util.math_helpers import translate
+from evolution.world.frame import Frame
+
+# Beasts are drawn with their rotation rounded to this many degrees, so beasts facing about the same way share a sprite
+ROTATION_BUCKET = 5
+MAX_SPRITES = 16384
+
+# A pre-rendered image and the position of the beast within it
+Sprite = Tuple[pygame.surface.Surface, Tuple[int, int]]
+
+
+class SpriteCache:
+    """
+    Pre-rendered images of beasts, so drawing a beast is a single blit instead of several draw calls. Sprites are
+    rendered on first use, and the least recently used sprite is dropped once there are more than `max_sprites`.
+    """
+
+    def __init__(self, max_sprites: int = MAX_SPRITES):
+        self.max_sprites = max_sprites
+        self._sprites: OrderedDict[Hashable, Sprite] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sprites)
+
+    def beast(self, size: int, color: Tuple[int, int, int], rotation: int, selected: bool) -> Sprite:
+        bucket = round(rotation / ROTATION_BUCKET) % (360 // ROTATION_BUCKET)
+        return self._get(
+            ("beast", size, color, bucket, selected),
+            partial(_render_beast, size, color, bucket * ROTATION_BUCKET, selected),
+        )
+
+    def dead(self, dead: int, killed: bool) -> Sprite:
+        return self._get(("dead", dead, killed), partial(_render_dead, dead, killed))
+
+    def beast_sprite(self, beast: Beast, selected: bool = False) -> Sprite:
+        """Pre-rendered image of the beast and where to blit it"""
+        if beast.dead > 0:
+            image, (offset_x, offset_y) = self.dead(beast.dead, beast.killed)
+        else:
+            image, (offset_x, offset_y) = self.beast(beast.size, beast.color, beast.rotation, selected)
+        return image, (beast.x - offset_x, beast.y - offset_y)
+
+    def frame_sprites(self, frame: Frame, camera: Optional[Camera] = None) -> List[Sprite]:
+        """
+        Sprites of all beasts of a frame and where to blit them on the screen as seen by `camera`. Living beasts are
+        scaled by its zoom. Without a camera, the sprites and positions are those `beast_sprite` gives.
+        """
+        x, y, sizes = frame.x, frame.y, frame.size
+        if camera is not None:
+            x, y = camera.to_screen(x, y)
+            x, y = np.round(x).astype(np.int64), np.round(y).astype(np.int64)
+            sizes = np.maximum(np.round(sizes * camera.zoom).astype(np.int64), 1)
+        buckets = (np.round(frame.rotation / ROTATION_BUCKET) % (360 // ROTATION_BUCKET)).astype(np.int64)
+        selected = np.zeros(len(frame), dtype=bool)
+        if frame.selected_row >= 0:
+            selected[frame.selected_row] = True
+
+        # The lookup of `_get`, inlined as this runs for every beast in every frame
+        cached = self._sprites.get
+        move_to_end = self._sprites.move_to_end
+        sprites: List[Sprite] = []
+        for x, y, size, color, bucket, dead, killed, is_selected in zip(
+            x.tolist(),
+            y.tolist(),
+            sizes.tolist(),
+            frame.color.tolist(),
+            buckets.tolist(),
+            frame.dead.tolist(),
+            frame.killed.tolist(),
+            selected.tolist(),
+        ):
+            if dead > 0:
+                sprite = self.dead(dead, killed)
+            else:
+                key = ("beast", size, (color[0], color[1], color[2]), bucket, is_selected)
+                cached_sprite = cached(key)
+                if cached_sprite is None:
+                    sprite = self._get(key, partial(_render_beast, size, key[2], bucket * ROTATION_BUCKET, is_selected))
+                else:
+                    move_to_end(key)
+                    sprite = cached_sprite
+            image, (offset_x, offset_y) = sprite
+            sprites.append((image, (x - offset_x, y - offset_y)))
+        return sprites
+
+    def clear(self):
+        self._sprites.clear()
+
+    def _get(self, key: Hashable, render: Callable[[], Sprite]) -> Sprite:
+        sprite = self._sprites.get(key)
+        if sprite is None:
+            sprite = render()
+            self._sprites[key] = sprite
+            if len(self._sprites) > self.max_sprites:
+                self._sprites.popitem(last=False)
+        else:
+            self._sprites.move_to_end(key)
+        return sprite
+
+
+def _render_beast(size: int, color: Tuple[int, int, int], rotation: int, selected: bool) -> Sprite:
+    if selected:
+        edge_color = (255, 0, 0)
+        edge_width = 3
+    else:
+        edge_color = (0, 0, 0)
+        edge_width = 1
+    radius = size + edge_width
+    tail_x, tail_y = translate((0, 0), rotation - 180, 3 * size)
+    surface, origin = _blank(min(-radius, tail_x), min(-radius, tail_y), max(radius, tail_x), max(radius, tail_y))
+
+    pygame.draw.line(surface, (0, 0, 0), origin, (origin[0] + tail_x, origin[1] + tail_y), 3)
+    pygame.draw.circle(surface, edge_color, origin, radius)
+    pygame.draw.circle(surface, color, origin, size)
+    return _optimized(surface), origin
+
+
+def _render_dead(dead: int, killed: bool) -> Sprite:
+    c_val = int((255 / DESPAWN_TIME) * (dead - 1))
+    color = (255, c_val, c_val) if killed else (c_val, c_val, c_val)
+    tail_x, tail_y = translate((0, 0), 180, 10)
+    surface, (x, y) = _blank(min(-3, tail_x), min(0, tail_y), max(3, tail_x), max(3, tail_y))
+
+    pygame.draw.line(surface, color, (x, y), (x + tail_x, y + tail_y), 3)
+    pygame.draw.line(surface, color, (x - 3, y + 3), (x + 3, y + 3), 3)
+    return _optimized(surface), (x, y)
+
+
+def _blank(left: int, top: int, right: int, bottom: int) -> Sprite:
+    """Transparent surface covering the given area around the beast, with room for lines of width 3"""
+    margin = 2
+    surface = pygame.Surface((right - left + 2 * margin + 1, bottom - top + 2 * margin + 1), pygame.SRCALPHA)
+    return surface, (margin - left, margin - top)
+
+
+def _optimized(surface: pygame.surface.Surface) -> pygame.surface.Surface:
+    """Surface in the pixel format of the display for fast blitting, once there is a display"""
+    if pygame.display.get_init() and pygame.display.get_surface() is not None:
+        return surface.convert_alpha()
+    return surface
+
+
+sprite_cache = SpriteCache()
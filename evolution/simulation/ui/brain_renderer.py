@@ -0,0 +1,174 @@
+import math
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import networkx as nx
+import pygame
+
+from evolution.beast.brain.brain import Brain
+from evolution.beast.brain.neuron import InputNeuron, InternalNeuron, Neuron, OutputNeuron
+from evolution.util.math_helpers import get_direction, translate
+
+
+def brain_graph(brain: Brain) -> nx.DiGraph:
+    G = nx.DiGraph()
+
+    for n in brain.neuron_connections:
+        G.add_edge(n.neuron_1, n.neuron_2, strength=n.strength)
+
+    return G
+
+
+# Neuron classes and types of both ends and the strength as shown, for every connection of a brain
+BrainTopology = Tuple[Tuple[str, str, str, str, str], ...]
+
+
+def brain_topology(brain: Brain) -> BrainTopology:
+    """
+    Everything a drawing of the brain depends on. Output neurons of the same type are merged and every connection has
+    an input neuron of its own, so the connections in order determine the graph.
+    """
+    return tuple(
+        (
+            type(connection.neuron_1).__name__,
+            str(connection.neuron_1.neuron_type),
+            type(connection.neuron_2).__name__,
+            str(connection.neuron_2.neuron_type),
+            f"{connection.strength:.2f}",
+        )
+        for connection in brain.neuron_connections
+    )
+
+
+class BrainRenderer:
+    """
+    Draws brains as graphs. Drawings are cached by the topology of the brain, as many related beasts share one, and
+    can be made in a background thread so the layout of the graph does not hold up the thread that asks for it.
+    """
+
+    NODE_SIZE = 10
+    NEURON_COLORS = {InputNeuron: "red", InternalNeuron: "blue", OutputNeuron: "green"}
+    IMGSIZE = 300
+    MARGIN = 50
+    FIGSIZE = (3, 3)
+    DPI = 100
+    MAX_CACHED = 128
+
+    def __init__(self):
+        self.font = pygame.font.SysFont("Calibri", 8)
+        self._surfaces: OrderedDict[BrainTopology, pygame.surface.Surface] = OrderedDict()
+        self._pending: Dict[BrainTopology, Future] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="brain_rendering")
+
+    def draw_brain(self, brain: Brain) -> pygame.surface.Surface:
+        topology = brain_topology(brain)
+        surface = self._cached(topology)
+        if surface is None:
+            surface = self._render(topology, brain)
+        return surface
+
+    def draw_brain_in_background(self, brain: Brain) -> Optional[pygame.surface.Surface]:
+        """The drawing of the brain if it is ready, otherwise start drawing it in the background and return None"""
+        topology = brain_topology(brain)
+        surface = self._cached(topology)
+        if surface is None:
+            with self._lock:
+                if topology not in self._pending:
+                    self._pending[topology] = self._executor.submit(self._render, topology, brain)
+        return surface
+
+    def _cached(self, topology: BrainTopology) -> Optional[pygame.surface.Surface]:
+        with self._lock:
+            surface = self._surfaces.get(topology)
+            if surface is not None:
+                self._surfaces.move_to_end(topology)
+            return surface
+
+    def _render(self, topology: BrainTopology, brain: Brain) -> pygame.surface.Surface:
+        surface = self._draw_graph(brain)
+        with self._lock:
+            self._surfaces[topology] = surface
+            if len(self._surfaces) > self.MAX_CACHED:
+                self._surfaces.popitem(last=False)
+            self._pending.pop(topology, None)
+        return surface
+
+    def _draw_graph(self, brain: Brain) -> pygame.surface.Surface:
+        graph = brain_graph(brain)
+
+        colors = {node: self.NEURON_COLORS[type(node)] for node in graph.nodes()}
+        labels = {node: node.neuron_type.name for node in graph.nodes()}
+        edge_labels = {(n1, n2): f"{graph[n1][n2]['strength']:.2f}" for n1, n2 in graph.edges()}
+        pos = nx.planar_layout(
+            graph, scale=(self.IMGSIZE / 2) - self.MARGIN, center=(self.IMGSIZE / 2, self.IMGSIZE / 2)
+        )
+
+        surface = pygame.Surface((self.IMGSIZE, self.IMGSIZE))
+        surface.fill("white")
+        self._draw_nodes(surface, graph.nodes(), pos, colors)
+        self._draw_node_labels(surface, graph.nodes(), pos, labels)
+        self._draw_edges(surface, graph.edges(), pos)
+        self._draw_edge_labels(surface, graph.edges(), pos, edge_labels)
+        return surface
+
+    def _draw_nodes(
+        self,
+        surface: pygame.surface.Surface,
+        nodes: Iterable[Neuron],
+        pos: Dict[Neuron, Tuple[int, int]],
+        colors: Dict[Any, str],
+    ):
+        for node in nodes:
+            pygame.draw.circle(
+                surface,
+                colors[node],
+                pos[node],
+                self.NODE_SIZE,
+            )
+
+    def _draw_node_labels(
+        self,
+        surface: pygame.surface.Surface,
+        nodes: Iterable[Any],
+        pos: Dict[Any, Tuple[int, int]],
+        labels: Dict[Any, str],
+    ):
+        for node in nodes:
+            position = pos[node]
+            label = self.font.render(labels[node], True, (0, 0, 0))
+            surface.blit(label, (position[0] - label.get_width() / 2, position[1] + self.font.get_linesize()))
+
+    def _draw_edges(
+        self, surface: pygame.surface.Surface, edges: Iterable[Tuple[Any, Any]], pos: Dict[Any, Tuple[int, int]]
+    ):
+        for node1, node2 in edges:
+            direction = get_direction(pos[node1], pos[node2])
+            begin = translate(pos[node1], direction, self.NODE_SIZE + 1)
+            end = translate(pos[node2], direction, -self.NODE_SIZE + 1)
+            pygame.draw.aaline(surface, "black", begin, end)
+            pygame.draw.polygon(
+                surface,
+                "black",
+                (
+                    (end),
+                    (translate(end, direction + 135, 5)),
+                    (translate(end, direction - 135, 5)),
+                ),
+            )
+
+    def _draw_edge_labels(
+        self,
+        surface: pygame.surface.Surface,
+        edges: Iterable[Tuple[Any, Any]],
+        pos: Dict[Any, Tuple[int, int]],
+        labels: Dict[Tuple[Any, Any], str],
+    ):
+        for node1, node2 in edges:
+            direction = get_direction(pos[node1], pos[node2])
+            distance = math.dist(pos[node1], pos[node2])
+            position = translate(pos[node1], direction, int(distance / 2))
+            label = self.font.render(labels[(node1, node2)], True, (0, 0, 0))
+            surface.blit(label, (position[0] - label.get_width() / 2, position[1] + self.font.get_linesize()))
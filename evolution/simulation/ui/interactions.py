@@ -1,5 +1,8 @@
 from evolution.world.state import State
 
+MIN_SPEED = 1 / 8
+MAX_SPEED = 64
+
 
 def toggle_pause(state: State):
     state.simulation_paused = not state.simulation_paused
@@ -7,3 +10,7 @@ def toggle_pause(state: State):
 
 def step(state: State):
     state.perform_step = True
+
+
+def change_speed(state: State, factor: float):
+    state.speed = min(max(state.speed * factor, MIN_SPEED), MAX_SPEED)
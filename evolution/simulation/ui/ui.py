@@ -1,16 +1,19 @@
-import math
 import threading
 from typing import Dict, List, Optional, Tuple, cast
 
 import pygame
 
-from evolution.beast.beast import Beast
-from evolution.beast.brain.brain import BrainRenderer
+from evolution.beast.brain.brain import Brain
+from evolution.datastructures.spatial_index import SpatialIndexType
+from evolution.simulation.camera import Camera
 from evolution.simulation.render_helpers import draw_multiline_text
+from evolution.simulation.ui.brain_renderer import BrainRenderer
 from evolution.simulation.ui.interactions import step, toggle_pause
 from evolution.simulation.ui.ui_elements import BeastPopup, Button, Element, Popup, PushButton, ToggleButton, TreePopup
 from evolution.simulation.ui_constants import YSIZE
-from evolution.util.render_kdtree import render_tree
+from evolution.util.profiling import frame_timers, step_timers
+from evolution.util.render_kdtree import TreeRenderer
+from evolution.world.frame import Frame, TreeNodes
 from evolution.world.state import State
 
 IMAGE_BASE_PATH = "assets/images/ui"
@@ -18,10 +21,12 @@ IMAGE_BASE_PATH = "assets/images/ui"
 
 class UI:
     screen: pygame.surface.Surface
+    camera: Camera
 
     def __init__(self, state: State):
         self.state = state
-        self.selected_beast: Optional[Beast] = None
+        # Brain shown in the beast popup, so it is only drawn again once another beast is selected
+        self._shown_brain: Optional[Brain] = None
 
         self.buttons: List[Button] = [
             ToggleButton(
@@ -53,6 +58,8 @@ class UI:
             "tree": TreePopup(),
         }
         self.brain_renderer = BrainRenderer()
+        self.timings_font = pygame.font.SysFont("Calibri", 14)
+        self.tree_renderer = TreeRenderer(self.static_elements["tree"].size)
 
     def set_screen(self, screen: pygame.surface.Surface):
         self.screen = screen
@@ -60,24 +67,61 @@ class UI:
     def set_font(self, font: pygame.font.Font):
         self.font = font
 
-    def draw(self, time_for_frame: float, time_for_step: float):
-        self._draw_stats()
+    def set_camera(self, camera: Camera):
+        self.camera = camera
+
+    def draw(self, frame: Optional[Frame], time_for_frame: float, time_for_step: float):
+        self._update_beast_popup(frame)
+        self._update_tree_popup(frame)
+        self._draw_stats(frame)
         self._draw_framerate(time_for_frame, time_for_step)
+        if self.state.render_timings:
+            self._draw_timings()
         self._draw_buttons()
         self._draw_static_elements()
 
-    def _draw_stats(self):
-        stats = self.font.render(f"Number of beasts: {len(self.state.beasts)}", True, (0, 0, 0))
+    def _update_beast_popup(self, frame: Optional[Frame]):
+        if frame is None or frame.selected_id != self.state.selected_beast_id:
+            return
+        popup: BeastPopup = cast(BeastPopup, self.static_elements["beast_stats"])
+        if frame.selected_stats is not None:
+            popup.set_text(frame.selected_stats)
+        if frame.selected_brain is not None and frame.selected_brain is not self._shown_brain:
+            # Drawn in the background, until it is ready the popup has no image
+            image = self.brain_renderer.draw_brain_in_background(frame.selected_brain)
+            if image is not None:
+                popup.set_image(image)
+                self._shown_brain = frame.selected_brain
+
+    def _update_tree_popup(self, frame: Optional[Frame]):
+        if not self.state.capture_tree_nodes or frame is None or frame.tree_nodes is None:
+            return
+        self.state.capture_tree_nodes = False
+        thread = threading.Thread(target=self._tree_thread, args=(frame.tree_nodes,), name="tree_rendering")
+        thread.start()
+
+    def _draw_stats(self, frame: Optional[Frame]):
+        stats = self.font.render(f"Number of beasts: {frame.num_beasts if frame is not None else 0}", True, (0, 0, 0))
         self.screen.blit(stats, (10, 10))
 
     def _draw_framerate(self, time_for_frame: float, time_for_step: float):
         draw_multiline_text(
             self.screen,
-            f"{round(1 / time_for_frame)} FPS\n{round(1 / time_for_step)} SPS",
+            f"{round(1 / time_for_frame)} FPS\n{round(1 / time_for_step)} SPS\n{self._speed()}",
             (YSIZE - 100, 10),
             self.font,
         )
 
+    def _speed(self) -> str:
+        if self.state.turbo:
+            return f"turbo x{self.state.turbo_steps_per_frame}"
+        return f"speed x{self.state.speed:g}"
+
+    def _draw_timings(self):
+        draw_multiline_text(
+            self.screen, f"{step_timers.summary()}\n\n{frame_timers.summary()}", (YSIZE - 260, 70), self.timings_font
+        )
+
     def _draw_buttons(self):
         for button in self.buttons:
             if button.name == "step":
@@ -96,13 +140,11 @@ class UI:
                 button.on_click()
                 return
 
-        for beast in self.state.beasts:
-            if math.dist(beast.position.tuple(), pos) <= beast.size:
-                self._display_beast_stats(beast)
-                self._unselect_beast()
-                self.selected_beast = beast
-                beast.selected = True
-                return
+        frame = self.state.frame
+        beast_id = frame.beast_at(self.camera.to_world(pos)) if frame is not None else None
+        if beast_id is not None:
+            self._display_beast_stats(beast_id)
+            return
 
         # Clicked on nothing
         self._unselect_all()
@@ -112,10 +154,14 @@ class UI:
         if not item_closed:
             self.state.active = False
 
-    def _display_beast_stats(self, beast: Beast):
+    def _display_beast_stats(self, beast_id: int):
+        """Select the beast, its details are filled in from the first frame the simulation publishes with them"""
         popup: BeastPopup = cast(BeastPopup, self.static_elements["beast_stats"])
-        popup.set_text_dynamic(beast.stats_string)
-        popup.set_image(self.brain_renderer.draw_brain(beast.brain))
+        if beast_id != self.state.selected_beast_id:
+            popup.set_text(f"Beast {beast_id}")
+            popup.image = None
+            self._shown_brain = None
+        self.state.selected_beast_id = beast_id
         popup.shown = True
 
     def _unselect_all(self) -> bool:
@@ -130,19 +176,21 @@ class UI:
         return closed
 
     def _unselect_beast(self):
-        if self.selected_beast is not None:
-            self.selected_beast.selected = False
-            self.selected_beast = None
+        self.state.selected_beast_id = None
 
-    def _tree_thread(self):
+    def _tree_thread(self, nodes: TreeNodes):
         tree_popup = cast(TreePopup, self.static_elements["tree"])
-        tree_popup.set_image(render_tree(self.state.tree))
+        tree_popup.set_image(self.tree_renderer.render(nodes))
         tree_popup.shown = True
 
     def _show_tree(self):
-        if any([t.name == "tree_rendering" for t in threading.enumerate()]):
+        if self.state.spatial_index_type != SpatialIndexType.KDTREE:
+            print("Active spatial index is not a tree - skipping")
+            return
+
+        if self.state.capture_tree_nodes or any([t.name == "tree_rendering" for t in threading.enumerate()]):
             print("Tree already being rendered - skipping")
             return
 
-        thread = threading.Thread(target=self._tree_thread, name="tree_rendering")
-        thread.start()
+        # The simulation copies the nodes of the tree into the next frame, which is drawn once it is published
+        self.state.capture_tree_nodes = True
@@ -2,6 +2,8 @@ import math
 import random
 from typing import Tuple
 
+import numpy as np
+
 
 def get_direction(from_point: Tuple[int, int], to_point: Tuple[int, int]) -> int:
     """
@@ -13,6 +15,13 @@ def get_direction(from_point: Tuple[int, int], to_point: Tuple[int, int]) -> int
     return round(math.degrees(math.atan2((to_point[0] - from_point[0]), -(to_point[1] - from_point[1]))))
 
 
+def get_directions(from_x: np.ndarray, from_y: np.ndarray, to_x: np.ndarray, to_y: np.ndarray) -> np.ndarray:
+    """
+    Vectorized version of `get_direction`, for many pairs of points at once.
+    """
+    return np.round(np.degrees(np.arctan2(to_x - from_x, -(to_y - from_y)))).astype(np.int64)
+
+
 def translate(start: Tuple[int, int], direction: int, distance: int) -> Tuple[int, int]:
     """
     Determine coordinates at a certain distance and in a certain direction (in degrees) from the given coordinate.
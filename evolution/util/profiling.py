@@ -1,4 +1,13 @@
 import cProfile
+import json
+from time import perf_counter
+from typing import Dict, List, Optional, Sequence, TextIO
+
+import numpy as np
+
+# Number of cycles the percentiles of the phase timings are taken over
+RING_SIZE = 512
+PERCENTILES = (50, 95, 99)
 
 
 def profileit(name):
@@ -13,3 +22,75 @@ def profileit(name):
         return wrapper
 
     return inner
+
+
+class PhaseTimers:
+    """
+    Timings of the phases of a repeating cycle, like a simulation step or the drawing of a frame. `start` marks the
+    start of a cycle, every `lap` ends a phase (laps of the same phase in a cycle add up) and `end` completes the cycle.
+
+    The timings of the last `size` cycles are kept per phase in a ring buffer for rolling percentiles, and every cycle
+    can be written as a line of JSON to a file set with `export_to`.
+    """
+
+    def __init__(self, name: str, size: int = RING_SIZE):
+        self.name = name
+        self.size = size
+        self.cycles = 0
+        self._rings: Dict[str, np.ndarray] = {}
+        self._cycle: Dict[str, float] = {}
+        self._last = perf_counter()
+        self._export: Optional[TextIO] = None
+
+    def start(self):
+        self._cycle = {}
+        self._last = perf_counter()
+
+    def lap(self, phase: str):
+        now = perf_counter()
+        self._cycle[phase] = self._cycle.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def end(self):
+        index = self.cycles % self.size
+        for phase, duration in self._cycle.items():
+            ring = self._rings.get(phase)
+            if ring is None:
+                # Cycles before the first lap of the phase took no time for it
+                ring = self._rings[phase] = np.zeros(self.size)
+            ring[index] = duration
+        for phase in self._rings.keys() - self._cycle.keys():
+            self._rings[phase][index] = 0.0
+        self.cycles += 1
+
+        if self._export is not None:
+            milliseconds = {phase: round(duration * 1000, 4) for phase, duration in self._cycle.items()}
+            self._export.write(json.dumps({"timers": self.name, "cycle": self.cycles, "ms": milliseconds}) + "\n")
+
+    def percentiles(self, percentiles: Sequence[float] = PERCENTILES) -> Dict[str, List[float]]:
+        """Percentiles of the duration of every phase over the last cycles, in seconds"""
+        num_cycles = min(self.cycles, self.size)
+        if num_cycles == 0:
+            return {}
+        return {phase: np.percentile(ring[:num_cycles], percentiles).tolist() for phase, ring in self._rings.items()}
+
+    def summary(self) -> str:
+        """Percentiles of every phase in milliseconds, a line per phase"""
+        lines = [f"{self.name} (ms): " + " / ".join(f"p{percentile}" for percentile in PERCENTILES)]
+        for phase, values in self.percentiles().items():
+            lines.append(f"{phase}: " + " / ".join(f"{value * 1000:.2f}" for value in values))
+        return "\n".join(lines)
+
+    def export_to(self, path: Optional[str]):
+        """Append the timings of every cycle to the JSON lines file at `path`, or stop exporting if it is None"""
+        if self._export is not None:
+            self._export.close()
+            self._export = None
+        if path is not None:
+            self._export = open(path, "a")
+
+
+# Simulation steps, see `simulate_beasts`
+step_timers = PhaseTimers("step")
+# Frames drawn, see `Render.draw`
+frame_timers = PhaseTimers("frame")
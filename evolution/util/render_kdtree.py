@@ -1,130 +1,114 @@
 import math
-import random
-from typing import Tuple
+from typing import List, Optional, Tuple
 
-import matplotlib as mpl
-import matplotlib.pyplot as plt
-import networkx as nx
 import pygame
 
-from evolution.beast.beast import Beast
-from evolution.datastructures.kdtree import KDTree
+from evolution.simulation.render_helpers import name_glyphs
+from evolution.world.frame import TreeNodes
 
-mpl.use("Agg")
+# Subtrees from this depth down are drawn on layers of their own
+LAYER_DEPTH = 3
+NODE_RADIUS = 5
+MARGIN = 20
+# The rings of the layout are spaced for a multiple of this many levels, so the layout rarely changes as the tree grows
+LEVEL_STEP = 4
+DELETED_COLOR = (180, 180, 180)
+EDGE_COLOR = (120, 120, 120)
 
+# Depth, position within the level, id, color, whether it is deleted and whether it has a left and a right child
+NodeRecord = Tuple[int, int, str, Tuple[int, int, int], bool, bool, bool]
 
-def render_tree(tree: KDTree):
-    G = nx.DiGraph()
-    _add_to_graph(tree, G)
-    pos = hierarchy_pos(G, width=2 * math.pi, xcenter=0)
-    pos = {u: (r * math.cos(theta), r * math.sin(theta)) for u, (theta, r) in pos.items()}
-    fig = plt.figure(0, (4, 4), dpi=200)
-    fig.clear()
-    nx.draw(
-        G,
-        pos,
-        node_color=[_get_node_color(node) for node in G.nodes()],
-        node_size=50,
-        width=1,
-    )
-    nx.draw_networkx_labels(
-        G,
-        pos,
-        labels={node: node.point.obj.id for node in G.nodes()},
-        font_size=6,
-    )
-    nx.draw_networkx_edge_labels(
-        G,
-        pos,
-        edge_labels={(n1, n2): G[n1][n2]["section"] for n1, n2 in G.edges()},
-        font_size=6,
-    )
-    fig.canvas.draw()
-    surface = pygame.surface.Surface(fig.canvas.get_width_height())
-    surface.blit(pygame.image.fromstring(fig.canvas.tostring_rgb(), fig.canvas.get_width_height(), "RGB"), (0, 0))
-    return surface
 
-
-def _add_to_graph(tree: KDTree, G: nx.DiGraph):
-    G.add_node(tree)
-    if tree.left is not None:
-        G.add_edge(tree, tree.left, section="L")
-        _add_to_graph(tree.left, G)
-    if tree.right is not None:
-        G.add_edge(tree, tree.right, section="R")
-        _add_to_graph(tree.right, G)
-
-
-def _get_node_color(node: KDTree) -> Tuple[float, float, float]:
-    assert isinstance(node.point.obj, Beast)
-    c = node.point.obj.color
-    return (c[0] / 255.0, c[1] / 255.0, c[2] / 255.0)
-
-
-def hierarchy_pos(G, root=None, width=1.0, vert_gap=0.2, vert_loc=0, xcenter=0.5):
+class TreeRenderer:
     """
-    From Joel's answer at https://stackoverflow.com/a/29597209/2966723.
-    Licensed under Creative Commons Attribution-Share Alike
-
-    If the graph is a tree this will return the positions to plot this in a
-    hierarchical layout.
-
-    G: the graph (must be a tree)
+    Draws the nodes of a `KDTree`, as copied into a frame, as a radial tree. Each level of the tree is a ring and every
+    node owns an equal share of the wedge of its parent, so the position of a node follows from its path from the root
+    alone and the layout is a single pass over the nodes.
 
-    root: the root node of current branch
-    - if the tree is directed and this is not given,
-      the root will be found and used
-    - if the tree is directed and this is given, then
-      the positions will be just for the descendants of this node.
-    - if the tree is undirected and not given,
-      then a random choice will be used.
-
-    width: horizontal space allocated for this branch - avoids overlap with other branches
-
-    vert_gap: gap between levels of hierarchy
-
-    vert_loc: vertical location of root
-
-    xcenter: horizontal location of root
+    The subtrees at LAYER_DEPTH, and the levels above them, are drawn onto layers of their own. A layer is only drawn
+    again when any of its nodes changed since the previous call, otherwise the previous drawing is reused.
     """
-    if not nx.is_tree(G):
-        raise TypeError("cannot use hierarchy_pos on a graph that is not a tree")
-
-    if root is None:
-        if isinstance(G, nx.DiGraph):
-            root = next(iter(nx.topological_sort(G)))  # allows back compatibility with nx version 1.11
-        else:
-            root = random.choice(list(G.nodes))
-
-    def _hierarchy_pos(G, root, width=1.0, vert_gap=0.2, vert_loc=0, xcenter=0.5, pos=None, parent=None):
-        """
-        see hierarchy_pos docstring for most arguments
-
-        pos: a dict saying where all nodes go if they have been assigned
-        parent: parent of this branch. - only affects it if non-directed
-        """
-        if pos is None:
-            pos = {root: (xcenter, vert_loc)}
-        else:
-            pos[root] = (xcenter, vert_loc)
-        children = list(G.neighbors(root))
-        if not isinstance(G, nx.DiGraph) and parent is not None:
-            children.remove(parent)
-        if len(children) != 0:
-            dx = width / len(children)
-            nextx = xcenter - width / 2 - dx / 2
-            for child in children:
-                nextx += dx
-                pos = _hierarchy_pos(
-                    G,
-                    child,
-                    width=dx,
-                    vert_gap=vert_gap,
-                    vert_loc=vert_loc - vert_gap,
-                    xcenter=nextx,
-                    pos=pos,
-                    parent=root,
-                )
-        return pos
 
-    return _hierarchy_pos(G, root, width, vert_gap, vert_loc, xcenter)
+    def __init__(self, size: Tuple[int, int]):
+        self.size = size
+        self._levels = 0
+        num_layers = 2**LAYER_DEPTH + 1
+        self._records: List[Optional[List[NodeRecord]]] = [None] * num_layers
+        self._layers: List[Optional[pygame.surface.Surface]] = [None] * num_layers
+        # Number of layers drawn by the last call, the others were reused
+        self.layers_drawn = 0
+
+    def render(self, nodes: TreeNodes) -> pygame.surface.Surface:
+        layer_records, max_depth = self._collect(nodes)
+        levels = max(LEVEL_STEP, math.ceil(max_depth / LEVEL_STEP) * LEVEL_STEP)
+        if levels != self._levels:
+            # Every node moves
+            self._levels = levels
+            self._records = [None] * len(self._records)
+
+        self.layers_drawn = 0
+        for layer, records in enumerate(layer_records):
+            if records != self._records[layer]:
+                self._layers[layer] = self._draw_layer(records)
+                self._records[layer] = records
+                self.layers_drawn += 1
+
+        surface = pygame.Surface(self.size)
+        surface.fill("white")
+        # The top levels last, they connect the subtrees
+        for layer_surface in self._layers[1:] + self._layers[:1]:
+            if layer_surface is not None:
+                surface.blit(layer_surface, (0, 0))
+        return surface
+
+    def _collect(self, nodes: TreeNodes) -> Tuple[List[List[NodeRecord]], int]:
+        """Record of every node of the tree per layer, the first layer holding the levels above LAYER_DEPTH"""
+        layer_records: List[List[NodeRecord]] = [[] for _ in self._layers]
+        for depth, index, beast_id, color, deleted, has_left, has_right in zip(
+            nodes.depth.tolist(),
+            nodes.index.tolist(),
+            nodes.ids.tolist(),
+            nodes.color.tolist(),
+            nodes.deleted.tolist(),
+            nodes.has_left.tolist(),
+            nodes.has_right.tolist(),
+        ):
+            record = (
+                depth,
+                index,
+                str(beast_id) if beast_id >= 0 else "",
+                DELETED_COLOR if deleted else tuple(color),
+                deleted,
+                has_left,
+                has_right,
+            )
+            layer = 0 if depth < LAYER_DEPTH else 1 + (index >> (depth - LAYER_DEPTH))
+            layer_records[layer].append(record)
+        return layer_records, int(nodes.depth.max()) if len(nodes) > 0 else 0
+
+    def _position(self, depth: int, index: int) -> Tuple[float, float]:
+        ring_gap = (min(self.size) / 2 - MARGIN) / self._levels
+        angle = 2 * math.pi * (index + 0.5) / 2**depth
+        return (
+            self.size[0] / 2 + depth * ring_gap * math.cos(angle),
+            self.size[1] / 2 + depth * ring_gap * math.sin(angle),
+        )
+
+    def _draw_layer(self, records: List[NodeRecord]) -> pygame.surface.Surface:
+        layer = pygame.Surface(self.size, pygame.SRCALPHA)
+        for depth, index, _, _, _, has_left, has_right in records:
+            position = self._position(depth, index)
+            for has_child, child_index, section in ((has_left, 2 * index, "L"), (has_right, 2 * index + 1, "R")):
+                if has_child:
+                    child_position = self._position(depth + 1, child_index)
+                    pygame.draw.aaline(layer, EDGE_COLOR, position, child_position)
+                    middle = ((position[0] + child_position[0]) / 2, (position[1] + child_position[1]) / 2)
+                    layer.blits(name_glyphs.label_blits(section, middle), doreturn=False)
+
+        for depth, index, label, color, _, _, _ in records:
+            position = self._position(depth, index)
+            pygame.draw.circle(layer, (0, 0, 0), position, NODE_RADIUS + 1)
+            pygame.draw.circle(layer, color, position, NODE_RADIUS)
+            label_position = (position[0], position[1] + NODE_RADIUS + name_glyphs.glyph("0").get_height() / 2)
+            layer.blits(name_glyphs.label_blits(label, label_position), doreturn=False)
+        return layer
@@ -0,0 +1,189 @@
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+from pygame.rect import Rect
+
+from evolution.beast.brain.brain import Brain
+from evolution.beast.dna.phenotype import decoder
+from evolution.beast.population import Population
+from evolution.datastructures.kdtree import KDTree
+from evolution.datastructures.spatial_index import IndexOutline, SpatialIndex
+
+# Beasts this far outside the viewport can still reach into it with their tail
+VIEWPORT_MARGIN = 40
+
+
+@dataclass(frozen=True)
+class TreeNodes:
+    """
+    Read-only copy of the nodes of a `KDTree` with a point, for the tree popup. The arrays have a row per node, which is
+    at `index` within the nodes of its level at `depth` (the children of a node are at 2 * index and 2 * index + 1).
+    `ids` is -1 for a node without an id, and the color of a deleted node is not set.
+    """
+
+    depth: np.ndarray
+    index: np.ndarray
+    ids: np.ndarray
+    color: np.ndarray
+    deleted: np.ndarray
+    has_left: np.ndarray
+    has_right: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.depth)
+
+
+@dataclass(frozen=True)
+class Frame:
+    """
+    Read-only copy of everything that is drawn of the world, published by the simulation at the end of every step.
+    Rendering and the UI only read the latest frame, so they never touch the population while it is being simulated.
+    Every array has a row per beast in the `viewport` the frame was captured for, or per beast if it has none.
+    `nearest_x` and `nearest_y` hold the location of the nearest mate, which may be outside the viewport (-1 if none).
+    """
+
+    ids: np.ndarray
+    x: np.ndarray
+    y: np.ndarray
+    rotation: np.ndarray
+    size: np.ndarray
+    color: np.ndarray
+    dead: np.ndarray
+    killed: np.ndarray
+    nearest_x: np.ndarray
+    nearest_y: np.ndarray
+    # Size of the whole population, not only of the beasts in the frame
+    num_beasts: int = 0
+    viewport: Optional[Rect] = None
+    # Copies of the spatial index, only captured when asked for
+    index_outline: Optional[IndexOutline] = None
+    tree_nodes: Optional[TreeNodes] = None
+    selected_id: Optional[int] = None
+    selected_row: int = -1
+    selected_stats: Optional[str] = None
+    selected_brain: Optional[Brain] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def beast_at(self, position: Tuple[float, float]) -> Optional[int]:
+        """Id of the first beast that covers `position`, if any"""
+        hit = np.flatnonzero(np.hypot(self.x - position[0], self.y - position[1]) <= self.size)
+        return int(self.ids[hit[0]]) if len(hit) > 0 else None
+
+
+def capture_frame(
+    population: Population,
+    tree: Optional[SpatialIndex] = None,
+    selected_id: Optional[int] = None,
+    viewport: Optional[Rect] = None,
+    outline: bool = False,
+    nodes: bool = False,
+) -> Frame:
+    """
+    Copy what is drawn of the beasts in `viewport` into a new frame, including the details of the selected beast. The
+    beasts in view are looked up in the spatial index, so the cost of a frame depends on the beasts in view instead of
+    on the size of the population. With `outline` the frame holds the outline of the index, and with `nodes` the nodes
+    of the index if it is a `KDTree`.
+    """
+    rows = _rows_in_view(population, tree, viewport)
+    nearest = population.column("nearest")[rows]
+    has_nearest = nearest >= 0
+    arrays = {
+        "ids": population.column("id")[rows],
+        "x": population.column("x")[rows],
+        "y": population.column("y")[rows],
+        "rotation": population.column("rotation")[rows],
+        "size": population.column("size")[rows],
+        "color": decoder.decode_gene(population.column("dna")[rows], "color").astype(np.uint8),
+        "dead": population.column("dead")[rows],
+        "killed": population.column("killed")[rows],
+        "nearest_x": np.where(has_nearest, population.column("x")[nearest], -1),
+        "nearest_y": np.where(has_nearest, population.column("y")[nearest], -1),
+    }
+    for array in arrays.values():
+        array.flags.writeable = False
+
+    selected_row = -1
+    selected_stats = None
+    selected_brain = None
+    if selected_id is not None:
+        # The selected beast keeps its details when it is out of view
+        population_rows = np.flatnonzero(population.column("id") == selected_id)
+        if len(population_rows) > 0:
+            beast = population[int(population_rows[0])]
+            selected_stats = beast.stats_string()
+            selected_brain = beast.brain
+            in_view = np.flatnonzero(arrays["ids"] == selected_id)
+            selected_row = int(in_view[0]) if len(in_view) > 0 else -1
+
+    return Frame(
+        **arrays,
+        num_beasts=len(population),
+        viewport=viewport,
+        index_outline=tree.outline() if outline and tree is not None else None,
+        tree_nodes=_capture_tree_nodes(population, tree) if nodes and isinstance(tree, KDTree) else None,
+        selected_id=selected_id,
+        selected_row=selected_row,
+        selected_stats=selected_stats,
+        selected_brain=selected_brain,
+    )
+
+
+def _rows_in_view(population: Population, tree: Optional[SpatialIndex], viewport: Optional[Rect]) -> np.ndarray:
+    """
+    Rows of the beasts in the viewport, widened by VIEWPORT_MARGIN, in order. The living beasts are found with the
+    spatial index if it holds all of them, dead beasts are not in the index and are found by their position.
+    """
+    if viewport is None:
+        return np.arange(len(population))
+
+    area = viewport.inflate(2 * VIEWPORT_MARGIN, 2 * VIEWPORT_MARGIN)
+    x = population.column("x")
+    y = population.column("y")
+    if tree is None or tree.num_points() != len(population.alive_rows()):
+        # Beasts were born or died since the index was built
+        return np.flatnonzero((x >= area.left) & (x < area.right) & (y >= area.top) & (y < area.bottom))
+
+    alive = np.array([point.obj._row for point in tree.within_rect(area)], dtype=np.int64)
+    dead = np.flatnonzero(population.column("dead") > 0)
+    dead = dead[(x[dead] >= area.left) & (x[dead] < area.right) & (y[dead] >= area.top) & (y[dead] < area.bottom)]
+    return np.sort(np.concatenate([alive, dead]))
+
+
+def _capture_tree_nodes(population: Population, tree: KDTree) -> TreeNodes:
+    records = []
+    stack: List[Tuple[KDTree, int, int]] = [(tree, 0, 0)]
+    while stack:
+        node, depth, index = stack.pop()
+        if node.point is None:
+            continue
+        obj = node.point.obj
+        records.append(
+            (depth, index, getattr(obj, "id", -1), node.deleted, node.left is not None, node.right is not None, obj)
+        )
+        if node.right is not None:
+            stack.append((node.right, depth + 1, 2 * index + 1))
+        if node.left is not None:
+            stack.append((node.left, depth + 1, 2 * index))
+
+    columns: List[Tuple[Any, ...]] = list(zip(*records)) or [()] * 7
+    depths, indices, ids, deleted, has_left, has_right, objects = columns
+    deleted_array = np.array(deleted, dtype=bool)
+    # Deleted nodes may hold beasts that are no longer in the population
+    live_rows = [obj._row for obj, is_deleted in zip(objects, deleted) if not is_deleted]
+    color = np.zeros((len(records), 3), dtype=np.uint8)
+    color[~deleted_array] = decoder.decode_gene(population.column("dna")[live_rows], "color")
+    tree_nodes = TreeNodes(
+        np.array(depths, dtype=np.int64),
+        np.array(indices, dtype=np.int64),
+        np.array(ids, dtype=np.int64),
+        color,
+        deleted_array,
+        np.array(has_left, dtype=bool),
+        np.array(has_right, dtype=bool),
+    )
+    for array in vars(tree_nodes).values():
+        array.flags.writeable = False
+    return tree_nodes
@@ -0,0 +1,179 @@
+import csv
+import threading
+from queue import SimpleQueue
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from evolution.beast.dna.gene import DNA_LENGTH, dna_structure
+from evolution.beast.dna.phenotype import decoder
+from evolution.beast.population import Population
+
+# Samples kept at every resolution
+HISTORY_SIZE = 1024
+# Every level of the history averages this many samples of the level before
+DOWNSAMPLE_FACTOR = 10
+# With the defaults, the history has a sample per step for the last 1024 steps and one per 1000 steps for a million
+NUM_LEVELS = 4
+
+COUNT_COLUMNS = ["step", "alive", "dead", "births", "deaths", "kills", "fights", "mean_energy"]
+
+
+class MetricsHistory:
+    """
+    Time series of a fixed set of columns, in preallocated ring buffers of decreasing resolution. The first level keeps
+    the last `size` samples as they were added, and every next level keeps `size` samples that are each the mean of
+    `factor` samples of the level before, so the older the data the coarser it is kept.
+    """
+
+    def __init__(
+        self,
+        columns: Iterable[str],
+        size: int = HISTORY_SIZE,
+        factor: int = DOWNSAMPLE_FACTOR,
+        levels: int = NUM_LEVELS,
+    ):
+        self.columns = list(columns)
+        self.size = size
+        self.factor = factor
+        self._rings = np.zeros((levels, size, len(self.columns)))
+        # Number of samples ever added to every level
+        self._counts = np.zeros(levels, dtype=np.int64)
+        # Sum of the samples of every level that are not yet part of a sample of the next level
+        self._pending = np.zeros((levels, len(self.columns)))
+
+    def __len__(self) -> int:
+        return int(self._counts[0])
+
+    def append(self, sample: np.ndarray):
+        for level in range(len(self._counts)):
+            self._rings[level, self._counts[level] % self.size] = sample
+            self._counts[level] += 1
+            if level + 1 == len(self._counts):
+                return
+
+            self._pending[level] += sample
+            if self._counts[level] % self.factor != 0:
+                return
+            sample = self._pending[level] / self.factor
+            self._pending[level] = 0
+
+    def series(self, level: int = 0) -> Dict[str, np.ndarray]:
+        """Every column at the resolution of `level`, oldest sample first"""
+        count = int(self._counts[level])
+        order = np.arange(max(count - self.size, 0), count) % self.size
+        samples = self._rings[level, order]
+        return {column: samples[:, index] for index, column in enumerate(self.columns)}
+
+
+class CsvWriter:
+    """Appends rows to a CSV file from a background thread, so the simulation never waits for the disk"""
+
+    def __init__(self, path: str, columns: List[str]):
+        self._queue: SimpleQueue[Optional[np.ndarray]] = SimpleQueue()
+        self._thread = threading.Thread(target=self._write, args=(path, columns), name="metrics_writer", daemon=True)
+        self._thread.start()
+
+    def write(self, row: np.ndarray):
+        self._queue.put(row)
+
+    def close(self):
+        """Write the remaining rows and close the file"""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _write(self, path: str, columns: List[str]):
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(columns)
+            done = False
+            while not done:
+                # Write whatever queued up since the last write at once
+                rows = [self._queue.get()]
+                while not self._queue.empty():
+                    rows.append(self._queue.get())
+                if rows[-1] is None:
+                    done = True
+                    rows.pop()
+                writer.writerows(row.tolist() for row in rows if row is not None)
+                file.flush()
+
+
+def gene_columns() -> List[str]:
+    """Name of every value of every gene the mean and variance are recorded of, see `gene_values`"""
+    return list(gene_values(np.zeros((0, DNA_LENGTH // 2), dtype=np.uint8)))
+
+
+def gene_values(packed: np.ndarray) -> Dict[str, np.ndarray]:
+    """Decoded genes of packed genomes, with genes of more than one value split into a column per value"""
+    values: Dict[str, np.ndarray] = {}
+    for name in dna_structure:
+        decoded = decoder.decode_gene(packed, name)
+        if decoded.dtype.names is not None:
+            for field in decoded.dtype.names:
+                values[f"{name}_{field}"] = decoded[field]
+        elif decoded.ndim > 1:
+            for index in range(decoded.shape[1]):
+                values[f"{name}_{index}"] = decoded[:, index]
+        else:
+            values[name] = decoded
+    return values
+
+
+class PopulationMetrics:
+    """
+    Population metrics recorded once per simulation step: the number of living and dead beasts, the births, deaths,
+    kills and fights of the step, the mean energy, and the mean and variance of every gene of the living beasts. The
+    metrics are kept in a `MetricsHistory`, and every step can be streamed to a CSV file set with `export_to`.
+    """
+
+    def __init__(self, size: int = HISTORY_SIZE, factor: int = DOWNSAMPLE_FACTOR, levels: int = NUM_LEVELS):
+        genes = gene_columns()
+        self.columns = COUNT_COLUMNS + [f"{gene}_{statistic}" for gene in genes for statistic in ("mean", "var")]
+        self.history = MetricsHistory(self.columns, size, factor, levels)
+        self._writer: Optional[CsvWriter] = None
+
+    def record(self, step: int, population: Population, births: int, fights: int):
+        """
+        Record `step` of the simulation, that was just simulated, in which `births` beasts were born and `fights` fights
+        fought. Steps in which the metrics were not recorded are missing from the history.
+        """
+        dead = population.column("dead")
+        alive = dead == 0
+        # Beasts that died this step, starved or killed, are dead for a single step
+        died = dead == 1
+        num_alive = int(np.count_nonzero(alive))
+
+        counts = [
+            step,
+            num_alive,
+            len(population) - num_alive,
+            births,
+            np.count_nonzero(died),
+            np.count_nonzero(died & population.column("killed")),
+            fights,
+        ]
+        sample = np.full(len(self.columns), np.nan)
+        sample[: len(counts)] = counts
+        if num_alive > 0:
+            sample[len(counts)] = population.column("energy")[alive].mean()
+            genes = gene_values(population.column("dna")[alive])
+            for index, values in enumerate(genes.values()):
+                sample[len(COUNT_COLUMNS) + 2 * index] = values.mean()
+                sample[len(COUNT_COLUMNS) + 2 * index + 1] = values.var()
+
+        self.history.append(sample)
+        if self._writer is not None:
+            self._writer.write(sample)
+
+    def export_to(self, path: Optional[str]):
+        """Stream the metrics of every step to the CSV file at `path`, or stop streaming if it is None"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if path is not None:
+            self._writer = CsvWriter(path, self.columns)
+
+
+# Recorded by `simulate_beasts`
+population_metrics = PopulationMetrics()
@@ -0,0 +1,104 @@
+import mmap
+import struct
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from evolution.beast import beast as beast_module
+from evolution.beast.lineage import lineage
+from evolution.beast.population import COLUMNS, Population
+from evolution.world.state import State, state
+from evolution.world.world import world
+
+MAGIC = b"EVOSNAP\0"
+VERSION = 3
+# Magic, version, number of beasts, next beast id, number of columns, and width and height of the world
+HEADER = struct.Struct("<8sIQQIII")
+# Name, dtype, number of values per beast and offset of the data of a column
+COLUMN_ENTRY = struct.Struct("<32s8sIQ")
+ALIGNMENT = 64
+
+
+def save_snapshot(path: str, world_state: State = state):
+    """
+    Write the beasts of the world to `path`. The file starts with a header, with the size of the world, and a table of
+    the population columns in it, followed by the raw data of every column, so it can be loaded without any parsing.
+    """
+    population = world_state.beasts
+    length = len(population)
+
+    table: List[Tuple[str, np.ndarray, int]] = []
+    offset = HEADER.size + COLUMN_ENTRY.size * len(COLUMNS)
+    for name in COLUMNS:
+        data = np.ascontiguousarray(population.column(name))
+        offset = _align(offset)
+        table.append((name, data, offset))
+        offset += data.nbytes
+
+    with open(path, "wb") as file:
+        file.write(
+            HEADER.pack(MAGIC, VERSION, length, beast_module.beast_counter, len(table), world.width, world.height)
+        )
+        for name, data, offset in table:
+            values_per_beast = int(np.prod(data.shape[1:], dtype=np.int64))
+            file.write(COLUMN_ENTRY.pack(name.encode(), data.dtype.str.encode(), values_per_beast, offset))
+        for name, data, offset in table:
+            file.write(b"\0" * (offset - file.tell()))
+            file.write(data.tobytes())
+
+
+def load_snapshot(path: str, world_state: State = state):
+    """
+    Replace the beasts of the world by those in the snapshot at `path`, and give the world the size it had. The file is
+    memory-mapped and every column is copied into the population at once, the `Beast` objects are only created when a
+    beast is first accessed.
+    """
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        length, next_id, size, columns = _read_columns(path, buffer)
+        population = Population.from_columns(length, columns)
+        # The columns are views on the mapping, which can only be closed once they are gone
+        columns.clear()
+
+    world.resize(*size)
+    world_state.beasts = population
+    world_state.tree = None
+    # The history of the beasts before the snapshot is not part of it, they are recorded as born now
+    lineage.record_births(population.column("id"), population.column("parent_ids"))
+    beast_module.beast_counter = max(beast_module.beast_counter, next_id)
+
+
+def _read_columns(path: str, buffer: mmap.mmap) -> Tuple[int, int, Tuple[int, int], Dict[str, np.ndarray]]:
+    """
+    Read the header of a snapshot. Returns the number of beasts, the next beast id, the size of the world and a view on
+    every column.
+    """
+    if len(buffer) < HEADER.size:
+        raise ValueError(f"{path} is not a snapshot")
+    magic, version = struct.unpack_from("<8sI", buffer, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a snapshot")
+    if version != VERSION:
+        raise ValueError(f"Unsupported snapshot version {version}, expected {VERSION}")
+    _, _, length, next_id, num_columns, width, height = HEADER.unpack_from(buffer, 0)
+
+    columns: Dict[str, np.ndarray] = {}
+    for index in range(num_columns):
+        raw_name, raw_dtype, values_per_beast, offset = COLUMN_ENTRY.unpack_from(
+            buffer, HEADER.size + index * COLUMN_ENTRY.size
+        )
+        name = raw_name.rstrip(b"\0").decode()
+        if name not in COLUMNS:
+            # Written by a newer version, the column has no meaning here
+            continue
+        shape = COLUMNS[name].shape
+        if int(np.prod(shape, dtype=np.int64)) != values_per_beast:
+            raise ValueError(f"Column {name} has {values_per_beast} values per beast, expected shape {shape}")
+
+        dtype = np.dtype(raw_dtype.rstrip(b"\0").decode())
+        data = np.frombuffer(buffer, dtype=dtype, count=length * values_per_beast, offset=offset)
+        columns[name] = data.reshape((length,) + shape)
+    return length, next_id, (width, height), columns
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
@@ -1,8 +1,12 @@
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Optional
 
-from evolution.beast.beast import Beast
-from evolution.datastructures.kdtree import KDTree
+from pygame.rect import Rect
+
+from evolution.beast.population import Population
+from evolution.datastructures.spatial_index import SpatialIndex, SpatialIndexType
+from evolution.datastructures.tiled_index import DEFAULT_NUM_WORKERS
+from evolution.world.frame import Frame
 
 
 @dataclass
@@ -10,12 +14,31 @@ class State:
     simulation_paused = False
     active: bool = True
     perform_step: bool = False
-    beasts: List["Beast"] = field(default_factory=list)
-    tree: Optional[KDTree] = None
+    # Multiple of the normal number of steps per second
+    speed: float = 1.0
+    # Simulate as many steps per drawn frame as `turbo_steps_per_frame`, regardless of the speed
+    turbo: bool = False
+    turbo_steps_per_frame: int = 10
+    beasts: Population = field(default_factory=Population)
+    tree: Optional[SpatialIndex] = None
+    spatial_index_type: SpatialIndexType = SpatialIndexType.KDTREE
+    # Worker processes used by the tiled spatial index
+    num_workers: int = DEFAULT_NUM_WORKERS
+    # Latest frame published by the simulation, the only state the render and UI read of the world
+    frame: Optional[Frame] = None
+    publish_frames: bool = True
+    # Record the metrics of every step, see `population_metrics`
+    record_metrics: bool = True
+    selected_beast_id: Optional[int] = None
+    # Area of the world on the screen, frames only hold the beasts in it. None for the whole world
+    viewport: Optional[Rect] = None
 
     render_nearest_mate: bool = False
     render_kdtree: bool = False
     render_beast_name: bool = False
+    render_timings: bool = False
+    # Copy the nodes of the tree into the next frame, for the tree popup
+    capture_tree_nodes: bool = False
 
 
 state = State()
@@ -3,23 +3,54 @@ import random
 from dataclasses import dataclass
 from typing import Tuple
 
-from evolution.simulation.ui_constants import XSIZE, YSIZE
+from pygame.rect import Rect
+
 from evolution.util.math_helpers import translate
 
 BORDER_BUFFER = 10
-XLIMIT = XSIZE - BORDER_BUFFER
-YLIMIT = YSIZE - BORDER_BUFFER
+DEFAULT_WIDTH = 900
+DEFAULT_HEIGHT = 900
 
 
 @dataclass
+class World:
+    """Size of the world the beasts live in, which is independent of the size of the window it is shown in"""
+
+    width: int = DEFAULT_WIDTH
+    height: int = DEFAULT_HEIGHT
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return (self.width, self.height)
+
+    @property
+    def x_limit(self) -> int:
+        return self.width - BORDER_BUFFER
+
+    @property
+    def y_limit(self) -> int:
+        return self.height - BORDER_BUFFER
+
+    def area(self) -> Rect:
+        return Rect(0, 0, self.width, self.height)
+
+    def resize(self, width: int, height: int):
+        self.width = width
+        self.height = height
+
+
+world = World()
+
+
+@dataclass(slots=True)
 class Position:
     x: int = 0
     y: int = 0
 
     def move(self, direction: int, distance: int):
         new_x, new_y = translate(self.tuple(), direction, distance)
-        self.x = max(min(new_x, XLIMIT), BORDER_BUFFER)
-        self.y = max(min(new_y, YLIMIT), BORDER_BUFFER)
+        self.x = max(min(new_x, world.x_limit), BORDER_BUFFER)
+        self.y = max(min(new_y, world.y_limit), BORDER_BUFFER)
 
     def tuple(self) -> Tuple[int, int]:
         return (self.x, self.y)
@@ -32,7 +63,7 @@ class Position:
 
     @staticmethod
     def random() -> "Position":
-        return Position(random.randint(0, XSIZE), random.randint(0, YSIZE))
+        return Position(random.randint(0, world.width), random.randint(0, world.height))
 
 
 def distance(a: Position, b: Position) -> float:
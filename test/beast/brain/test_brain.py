@@ -0,0 +1,82 @@
+import random
+
+import numpy as np
+import pytest
+
+from evolution.beast.brain import brain
+from evolution.beast.brain.brain import Brain, brain_values, compile_brains, get_input_matrix, step_brains
+from evolution.beast.dna.dna import DNA
+from evolution.beast.dna.phenotype import decoder
+from evolution.beast.brain.neuron import InputType
+from evolution.beast.interact import InputSet, MoveForward, Turn
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_step_brains_matches_brain_step(seed, monkeypatch):
+    monkeypatch.setattr(brain.random, "randint", lambda a, b: 3)
+    monkeypatch.setattr(brain.np.random, "randint", lambda a, b, size: np.full(size, 3))
+    rng = random.Random(seed)
+
+    brains = [Brain(DNA(f"{rng.randrange(16**128):0128x}")) for _ in range(500)]
+    distance = np.array([rng.choice([np.nan, 0.0, rng.uniform(0, 900)]) for _ in brains])
+    direction = np.array([rng.randint(-180, 180) for _ in brains])
+    compiled = [b.compile() for b in brains]
+
+    inputs = get_input_matrix(distance, direction)
+    move, turn, degrees = step_brains(inputs, *[np.array(arrays) for arrays in list(zip(*compiled))[:3]])
+
+    for i, b in enumerate(brains):
+        has_mate = not np.isnan(distance[i])
+        actions = b.step(
+            InputSet(
+                distance_to_nearest_mate=distance[i] if has_mate else None,
+                direction_of_nearest_mate=int(direction[i]),
+            )
+        )
+        assert move[i] == any(isinstance(action, MoveForward) for action in actions)
+        turns = [action.degrees for action in actions if isinstance(action, Turn)]
+        assert turn[i] == (len(turns) > 0)
+        if turns:
+            assert degrees[i] == turns[0]
+        assert compiled[i][3] == isinstance(actions[0], Turn)
+
+
+def test_compile_brains_matches_brain_compile():
+    rng = random.Random(5)
+    dnas = [DNA(f"{rng.randrange(16**128):0128x}") for _ in range(300)]
+    *arrays, turn_first = compile_brains(
+        decoder.decode_genomes(np.array([list(dna.to_bytes()) for dna in dnas], dtype=np.uint8))
+    )
+
+    for i, dna in enumerate(dnas):
+        *expected_arrays, expected_turn_first = Brain(dna).compile()
+        for array, expected in zip(arrays, expected_arrays):
+            np.testing.assert_array_equal(array[i], expected)
+        assert turn_first[i] == expected_turn_first
+
+
+def test_brain_values_equal_brain_step_to_the_last_bit(monkeypatch):
+    monkeypatch.setattr(brain.random, "randint", lambda a, b: 7)
+    rng = random.Random(11)
+    brains = []
+    while len(brains) < 200:
+        candidate = Brain(DNA(f"{rng.randrange(16**128):0128x}"))
+        pairs = [(source, target) for source, target in zip(*[array.tolist() for array in candidate.compile()[:2]])]
+        # A connection repeated, and the connections of the outputs interleaved instead of one output after the other
+        if len(set(pairs)) < len(pairs) and [target for _, target in pairs] != sorted(target for _, target in pairs):
+            brains.append(candidate)
+
+    distance = np.array([rng.uniform(0, 900) for _ in brains])
+    direction = np.array([rng.choice([-1, 1]) * rng.randint(1, 180) for _ in brains])
+    inputs = get_input_matrix(distance, direction)
+    inputs[:, InputType.RANDOM_INPUT.value] = 7
+    values = brain_values(inputs, *[np.array(arrays) for arrays in list(zip(*[b.compile() for b in brains]))[:3]])
+
+    for i, b in enumerate(brains):
+        stepped = {}
+        monkeypatch.setattr(
+            b, "_get_action_for_output_neuron", lambda neuron, value: stepped.update({neuron.neuron_type: value})
+        )
+        b.step(InputSet(distance_to_nearest_mate=float(distance[i]), direction_of_nearest_mate=int(direction[i])))
+        for output_type, value in stepped.items():
+            assert values[i, output_type.value] == value
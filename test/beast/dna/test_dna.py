@@ -0,0 +1,73 @@
+import random
+
+import numpy as np
+import pytest
+
+from evolution.beast.dna import dna as dna_module
+from evolution.beast.dna.dna import DNA, merge_genomes, mutate_genomes
+from evolution.beast.dna.gene import DNA_LENGTH, GENE_SIZE, dna_structure
+
+
+def test_hex_round_trip():
+    dna_str = f"{random.Random(0).randrange(16**DNA_LENGTH):0{DNA_LENGTH}x}"
+    dna = DNA(dna_str)
+    assert dna.dna == dna_str
+    assert DNA.from_bytes(dna.to_bytes()).dna == dna_str
+    assert dna.to_bytes().hex() == dna_str
+
+
+@pytest.mark.parametrize("description", list(dna_structure))
+def test_get_gene_matches_hex_substring(description):
+    dna = DNA()
+    location = dna_structure[description].location
+    assert dna.get_gene(description).value == int(dna.dna[location : location + GENE_SIZE], base=16)
+
+
+def test_merge_takes_every_character_from_a_parent():
+    random.seed(1)
+    first = DNA("0" * DNA_LENGTH)
+    second = DNA("f" * DNA_LENGTH)
+    children = [first.merge(second).dna for _ in range(100)]
+
+    assert all(len(child) == DNA_LENGTH and set(child) <= {"0", "f"} for child in children)
+    from_second = sum(child.count("f") for child in children) / (100 * DNA_LENGTH)
+    assert 0.45 < from_second < 0.55
+
+
+def test_mutate_changes_characters_with_the_mutation_probability(monkeypatch):
+    random.seed(2)
+    monkeypatch.setattr(dna_module, "MUTATION_PROBABILITY", 0.1)
+    dna = DNA("0" * DNA_LENGTH)
+    changed = 0
+    for _ in range(200):
+        mutated = DNA(dna.dna)
+        mutated.mutate()
+        assert len(mutated.dna) == DNA_LENGTH
+        changed += sum(char != "0" for char in mutated.dna)
+
+    # A mutated character is random, so it keeps its value one time in 16
+    expected = 200 * DNA_LENGTH * 0.1 * 15 / 16
+    assert 0.9 * expected < changed < 1.1 * expected
+
+
+def test_merge_genomes_takes_every_character_from_a_parent():
+    np.random.seed(3)
+    first = np.zeros((100, DNA_LENGTH // 2), dtype=np.uint8)
+    second = np.full((100, DNA_LENGTH // 2), 0xFF, dtype=np.uint8)
+    children = [DNA.from_bytes(row.tobytes()).dna for row in merge_genomes(first, second)]
+
+    assert all(set(child) <= {"0", "f"} for child in children)
+    from_second = sum(child.count("f") for child in children) / (100 * DNA_LENGTH)
+    assert 0.45 < from_second < 0.55
+
+
+def test_mutate_genomes_changes_characters_with_the_mutation_probability(monkeypatch):
+    np.random.seed(4)
+    monkeypatch.setattr(dna_module, "MUTATION_PROBABILITY", 0.1)
+    packed = np.zeros((200, DNA_LENGTH // 2), dtype=np.uint8)
+    mutated = mutate_genomes(packed)
+
+    changed = sum(char != "0" for row in mutated for char in DNA.from_bytes(row.tobytes()).dna)
+    expected = 200 * DNA_LENGTH * 0.1 * 15 / 16
+    assert 0.9 * expected < changed < 1.1 * expected
+    assert not packed.any()
@@ -0,0 +1,50 @@
+import random
+
+import numpy as np
+import pytest
+
+from evolution.beast.dna.dna import DNA
+from evolution.beast.dna.gene import dna_structure
+from evolution.beast.dna.phenotype import decoder
+
+
+def _random_dnas(seed: int, num_dnas: int):
+    rng = random.Random(seed)
+    return [DNA(genome=rng.getrandbits(512)) for _ in range(num_dnas)] + [DNA("0" * 128), DNA("f" * 128)]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_decode_matches_genes(seed):
+    for dna in _random_dnas(seed, 50):
+        phenotype = decoder.decode(dna.genome)
+        for description in dna_structure:
+            assert getattr(phenotype, description) == dna.get_gene(description).get_value(), description
+
+
+def test_decode_genomes_matches_decode():
+    dnas = _random_dnas(3, 200)
+    packed = np.array([np.frombuffer(dna.to_bytes(), dtype=np.uint8) for dna in dnas])
+    columns = decoder.decode_genomes(packed)
+
+    for row, dna in enumerate(dnas):
+        phenotype = dna.phenotype
+        for description in dna_structure:
+            value = columns[description][row]
+            expected = getattr(phenotype, description)
+            if isinstance(expected, dict):
+                assert {name: value[name].item() for name in expected} == expected, description
+            elif isinstance(expected, tuple):
+                assert tuple(value.tolist()) == expected, description
+            else:
+                assert value.item() == expected, description
+
+
+def test_phenotype_is_cached_until_mutation(monkeypatch):
+    dna = DNA("0" * 128)
+    phenotype = dna.phenotype
+    assert dna.phenotype is phenotype
+
+    monkeypatch.setattr("evolution.beast.dna.dna.MUTATION_PROBABILITY", 0.99)
+    dna.mutate()
+    assert dna.phenotype is not phenotype
+    assert dna.phenotype.base_energy == dna.get_gene("base_energy").get_value()
@@ -0,0 +1,97 @@
+import gc
+import random
+import tracemalloc
+
+import numpy as np
+
+from evolution.beast import beast as beast_module
+from evolution.beast import population as population_module
+from evolution.beast import simulate
+from evolution.beast.beast import Beast
+from evolution.beast.lineage import Lineage
+from evolution.beast.population import Population
+from evolution.world.state import State
+from evolution.world.world import Position, world
+
+
+def test_lineage_looks_up_parents_children_and_steps():
+    lineage = Lineage()
+    lineage.record_births(np.array([1, 2]), np.full((2, 2), -1))
+    lineage.advance()
+    lineage.record_births(np.array([3, 4]), np.array([[1, 2], [2, 1]]))
+    lineage.advance()
+    lineage.record_deaths(np.array([1, 3]))
+    lineage.advance()
+    lineage.record_deaths(np.array([1]))
+
+    assert len(lineage) == 4
+    assert lineage.parents(1) is None
+    assert lineage.parents(3) == (1, 2)
+    assert lineage.parents(5) is None
+    assert lineage.children(2) == [3, 4]
+    assert lineage.children(3) == []
+    assert lineage.birth_step(4) == 1
+    assert lineage.death_step(1) == 2
+    assert lineage.death_step(4) is None
+    assert lineage.birth_step(5) is None
+
+
+def test_lineage_keeps_the_first_record_of_an_id():
+    lineage = Lineage()
+    lineage.record_births(np.array([7, 3, 5]), np.array([[1, 2], [-1, -1], [3, 4]]))
+    lineage.advance()
+    lineage.record_births(np.array([5, 4]), np.full((2, 2), 9))
+
+    assert len(lineage) == 4
+    assert lineage.parents(5) == (3, 4)
+    assert lineage.parents(4) == (9, 9)
+    assert lineage.parents(7) == (1, 2)
+    assert lineage.birth_step(3) == 0
+
+
+def test_lineage_forgets_the_oldest_dead_beasts():
+    lineage = Lineage(max_records=100)
+    for step in range(20):
+        ids = np.arange(10 * step, 10 * step + 10)
+        lineage.record_births(ids, np.full((10, 2), -1))
+        lineage.record_deaths(ids[ids % 10 != 0])
+        lineage.advance()
+
+    assert len(lineage) <= 100
+    assert lineage.birth_step(1) is None
+    # Beasts that are alive are never forgotten
+    assert lineage.birth_step(0) == 0
+    assert lineage.death_step(199) == 19
+
+
+def test_simulated_lineage_stays_bounded(monkeypatch):
+    random.seed(1)
+    np.random.seed(1)
+    lineage = Lineage(max_records=150)
+    for module in (beast_module, population_module, simulate):
+        monkeypatch.setattr(module, "lineage", lineage)
+    monkeypatch.setattr(world, "width", 150)
+    monkeypatch.setattr(world, "height", 150)
+    state = State(record_metrics=False, publish_frames=False)
+    monkeypatch.setattr(simulate, "state", state)
+    first_id = beast_module.beast_counter
+    state.beasts = Population(
+        [Beast(position=Position(random.randint(10, 140), random.randint(10, 140))) for _ in range(100)]
+    )
+    nbytes = lineage.nbytes
+    memory = []
+    try:
+        for step in range(280):
+            if step == 200:
+                tracemalloc.start()
+            simulate.simulate_beasts()
+            if step in (219, 279):
+                gc.collect()
+                memory.append(tracemalloc.get_traced_memory()[0])
+    finally:
+        tracemalloc.stop()
+
+    # More beasts came into the world than are recorded, so the oldest dead ones were forgotten
+    assert beast_module.beast_counter - first_id > lineage.max_records >= len(lineage)
+    assert lineage.nbytes == nbytes
+    assert memory[1] - memory[0] < 50_000
@@ -0,0 +1,205 @@
+import random
+
+import numpy as np
+import pytest
+
+from evolution.beast import beast as beast_module
+from evolution.beast.beast import Beast
+from evolution.beast.brain import brain
+from evolution.beast.dna.dna import DNA
+from evolution.beast.population import COLUMNS, Population
+from evolution.beast.simulate import _build_spatial_index, _simulate_fights, _simulate_reproduction
+from evolution.world.state import state
+from evolution.world.world import Position
+
+
+def _make_population(seed: int, num_beasts: int) -> Population:
+    rng = random.Random(seed)
+    beasts = []
+    for _ in range(num_beasts):
+        dna = DNA(f"{rng.randrange(16**128):0128x}")
+        beast = Beast(dna, Position(rng.randint(0, 900), rng.randint(0, 900)))
+        beast.rotation = rng.randint(0, 359)
+        beast.energy = rng.uniform(-5, 50)
+        beast.fight_cooldown = rng.randint(0, 2)
+        beast.dead = rng.choice([0, 0, 0, 1, 50])
+        beasts.append(beast)
+    return Population(beasts)
+
+
+def _reference_step(population: Population, tree, monkeypatch):
+    """Beast.step and Beast.validate for every beast, with all beasts sensing before any of them moves"""
+    input_sets = {beast.id: beast._get_inputs(tree) for beast in population if beast.dead == 0}
+    monkeypatch.setattr(Beast, "_get_inputs", lambda beast, _: input_sets[beast.id])
+    for beast in population:
+        beast.step(tree)
+        beast.validate()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_step_matches_beast_step(seed, monkeypatch):
+    # Brain.step draws the random input per connection, the population once per beast
+    monkeypatch.setattr(brain.random, "randint", lambda a, b: 7)
+    monkeypatch.setattr(brain.np.random, "randint", lambda a, b, size: np.full(size, 7))
+    expected = _make_population(seed, 200)
+    actual = _make_population(seed, 200)
+
+    monkeypatch.setattr(state, "beasts", expected)
+    expected_tree = _build_spatial_index()
+    monkeypatch.setattr(state, "beasts", actual)
+    actual_tree = _build_spatial_index()
+
+    _reference_step(expected, expected_tree, monkeypatch)
+    actual.step(actual_tree)
+
+    columns = ["x", "y", "rotation", "energy", "dead", "not_moved", "fight_cooldown", "nearest", "nearest_direction"]
+    for column in columns:
+        np.testing.assert_array_equal(actual.column(column), expected.column(column), err_msg=column)
+
+
+def test_remove_rows_keeps_views_valid():
+    population = _make_population(0, 10)
+    beasts = list(population)
+    for row, beast in enumerate(beasts):
+        beast.nearest_mate = beasts[(row + 1) % len(beasts)]
+
+    remove = np.zeros(len(population), dtype=bool)
+    remove[[0, 4]] = True
+    positions = [beast.position for beast in beasts]
+    population.remove_rows(remove)
+
+    assert list(population) == [beast for row, beast in enumerate(beasts) if row not in (0, 4)]
+    for beast, position in zip(beasts, positions):
+        assert beast.position == position
+    assert beasts[3].nearest_mate is None
+    assert beasts[5].nearest_mate is beasts[6]
+    assert beasts[4] not in population
+
+
+def test_spawn_matches_beast():
+    rng = random.Random(6)
+    dnas = [DNA(f"{rng.randrange(16**128):0128x}") for _ in range(50)]
+    expected = Population([Beast(dna, Position(10 * i, 20 * i)) for i, dna in enumerate(dnas)])
+    actual = _make_population(7, 5)
+
+    packed = np.array([list(dna.to_bytes()) for dna in dnas], dtype=np.uint8)
+    rows = actual.spawn(packed, 10 * np.arange(50), 20 * np.arange(50), np.arange(1000, 1050), np.full((50, 2), 3))
+
+    np.testing.assert_array_equal(rows, np.arange(5, 55))
+    for column in [
+        "x",
+        "y",
+        "energy",
+        "size",
+        "energy_consumption",
+        "base_reproduction_cooldown",
+        "fertility",
+        "mate_detection_range",
+        "speed",
+        "max_turning_rate",
+        "brain_sources",
+        "brain_targets",
+        "brain_strengths",
+        "turn_first",
+        "dna",
+        "dead",
+        "reproduction_cooldown",
+        "stats_children",
+    ]:
+        np.testing.assert_array_equal(actual.column(column)[rows], expected.column(column), err_msg=column)
+    assert [beast.dna.dna for beast in actual][5:] == [dna.dna for dna in dnas]
+    assert actual[5].id == 1000 and actual[5].parent_ids == (3, 3)
+
+
+def test_reproduction_uses_every_beast_once(monkeypatch):
+    np.random.seed(8)
+    population = _make_population(8, 100)
+    columns = population.column
+    # Everyone is fertile and close together, so each beast should have exactly one child with a partner
+    columns("x")[:] = 100 + np.arange(100) % 5
+    columns("y")[:] = 100 + np.arange(100) // 20
+    columns("dead")[:] = 0
+    columns("fertility")[:] = 0
+    columns("reproduction_cooldown")[:] = 0
+    columns("base_reproduction_cooldown")[:] = 10
+    monkeypatch.setattr(state, "beasts", population)
+
+    children, _ = _simulate_reproduction(_build_spatial_index())
+
+    assert len(children) == 50
+    row_of_id = {beast_id: row for row, beast_id in enumerate(columns("id")[:100].tolist())}
+    mothers = [row_of_id[mother] for mother, _ in population.parent_ids[children].tolist()]
+    fathers = [row_of_id[father] for _, father in population.parent_ids[children].tolist()]
+    assert sorted(mothers + fathers) == list(range(100))
+    np.testing.assert_array_equal(population.x[children], population.x[mothers])
+    np.testing.assert_array_equal(columns("reproduction_cooldown")[:100], 10)
+    np.testing.assert_array_equal(columns("stats_children")[mothers], 1)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_apply_fights_matches_beast_fight(seed, monkeypatch):
+    expected = _make_population(seed, 60)
+    actual = _make_population(seed, 60)
+    for population in (expected, actual):
+        population.dead[:60] = 0
+        population.fight_cooldown[:60] = 0
+    first = np.arange(0, 60, 2)
+    second = first + 1
+
+    # Every third fight is not concluded unless one beast is far stronger, the others go to the stronger beast
+    chances = iter([13 if fight % 3 == 0 else 0 for fight in range(len(first)) for _ in range(2)])
+    monkeypatch.setattr(beast_module, "rand_int_lower_range", lambda a, b, strength: next(chances))
+    outcomes = []
+    for row, other in zip(first.tolist(), second.tolist()):
+        expected[row].fight(expected[other])
+        outcomes.append(1 if expected.dead[other] else -1 if expected.dead[row] else 0)
+    assert set(outcomes) == {-1, 0, 1}
+
+    killed = actual.apply_fights(first, second, np.array(outcomes))
+
+    assert sorted(killed.tolist()) == np.flatnonzero(expected.column("dead")).tolist()
+    for column in ["energy", "dead", "killed", "fight_cooldown", "stats_fights", "stats_fights_won"]:
+        np.testing.assert_array_equal(actual.column(column), expected.column(column), err_msg=column)
+
+
+def test_beasts_killed_in_a_fight_are_skipped_as_partners(monkeypatch):
+    population = _make_population(2, 4)
+    population.dead[:4] = 0
+    population.fight_cooldown[:4] = 0
+    # The first beast is sure to win against the second
+    population.size[:4] = [20, 0, 5, 5]
+    monkeypatch.setattr(state, "beasts", population)
+    tree = _build_spatial_index()
+
+    rows = np.arange(3)
+    fights = _simulate_fights(tree, rows, np.array([0, 1, 2, 2]), np.array([1, 0, 1, 3]), set())
+
+    assert fights == 2
+    assert population.column("dead").tolist()[:2] == [0, 1]
+    assert population.column("stats_fights").tolist() == [1, 0, 1, 0]
+    assert population.column("fight_cooldown").tolist() == [100] * 4
+    assert population[1] not in tree
+
+
+def test_fathers_do_not_fight_in_the_step_they_reproduced(monkeypatch):
+    population = _make_population(3, 3)
+    columns = population.column
+    # The first beast has a child with the second, the third is next to the second and can fight but not reproduce
+    columns("x")[:3] = [100, 103, 106]
+    columns("y")[:3] = 100
+    columns("dead")[:3] = 0
+    columns("fertility")[:3] = 0
+    columns("reproduction_cooldown")[:3] = [0, 0, 5]
+    columns("fight_cooldown")[:3] = 0
+    monkeypatch.setattr(state, "beasts", population)
+
+    children, fights = _simulate_reproduction(_build_spatial_index())
+
+    assert population.parent_ids[children].tolist() == [[population[0].id, population[1].id]]
+    # Only the third beast starts a fight, with the father
+    assert fights == 1
+    assert columns("stats_fights")[:3].tolist() == [0, 0, 1]
+
+
+def test_every_column_is_declared():
+    assert {name: Population.__annotations__.get(name) for name in COLUMNS} == {name: np.ndarray for name in COLUMNS}
@@ -0,0 +1,150 @@
+import random
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from evolution.beast.beast import Beast, next_ids
+from evolution.beast.brain.brain import Brain
+from evolution.beast.dna.dna import DNA
+from evolution.beast.dna.gene import DNA_LENGTH, dna_structure
+from evolution.beast.interact import InputSet
+from evolution.beast.population import Population
+from evolution.beast.simulate import simulate_beasts
+from evolution.datastructures.kdtree import KDTree, KDTreePoint
+from evolution.datastructures.spatial_index import SpatialIndexType
+from evolution.world.state import state
+from evolution.world.world import world
+
+SIZES = (50, 1000, 10000, 100000)
+SEED = 1
+
+# Sets up a benchmark for a number of beasts, and returns the function that is timed
+Benchmark = Callable[[int], Callable[[], object]]
+# Memory benchmarks are set up the same, the memory allocated while the function runs is measured
+MemoryBenchmark = Benchmark
+
+
+def _points(size: int) -> List[KDTreePoint]:
+    return [
+        KDTreePoint(random.randint(0, world.width - 1), random.randint(0, world.height - 1), index)
+        for index in range(size)
+    ]
+
+
+def kdtree_build(size: int) -> Callable[[], object]:
+    points = _points(size)
+    return lambda: KDTree(world.area(), insert_objects=points)
+
+
+def kdtree_find_nearest_neighbour(size: int) -> Callable[[], object]:
+    points = _points(size)
+    tree = KDTree(world.area(), insert_objects=points)
+
+    def run():
+        for point in points:
+            tree.find_nearest_neighbour((point.x, point.y), point.obj)
+
+    return run
+
+
+def brain_step(size: int) -> Callable[[], object]:
+    brains = [Brain(DNA()) for _ in range(size)]
+    inputs = [
+        InputSet(distance_to_nearest_mate=random.uniform(0, 100), direction_of_nearest_mate=random.randint(-180, 180))
+        for _ in range(size)
+    ]
+
+    def run():
+        for brain, brain_inputs in zip(brains, inputs):
+            brain.step(brain_inputs)
+
+    return run
+
+
+def dna_merge(size: int) -> Callable[[], object]:
+    pairs = [(DNA(), DNA()) for _ in range(size)]
+    return lambda: [first.merge(second) for first, second in pairs]
+
+
+def dna_mutate(size: int) -> Callable[[], object]:
+    dnas = [DNA() for _ in range(size)]
+
+    def run():
+        for dna in dnas:
+            dna.mutate()
+
+    return run
+
+
+def dna_get_gene(size: int) -> Callable[[], object]:
+    dnas = [DNA() for _ in range(size)]
+    return lambda: [dna.get_gene(description) for dna in dnas for description in dna_structure]
+
+
+def beast_construction(size: int) -> Callable[[], object]:
+    dnas = [DNA() for _ in range(size)]
+    return lambda: [Beast(dna) for dna in dnas]
+
+
+def _spawn_population(size: int) -> Population:
+    population = Population()
+    packed = np.random.randint(0, 256, size=(size, DNA_LENGTH // 2), dtype=np.uint8)
+    x = np.random.randint(0, world.width, size)
+    y = np.random.randint(0, world.height, size)
+    population.spawn(packed, x, y, next_ids(size))
+    return population
+
+
+def simulate_step(size: int) -> Callable[[], object]:
+    """A single `simulate_beasts` call on a population of `size` random beasts, after a first step to warm up"""
+    population = _spawn_population(size)
+
+    state.beasts = population
+    state.tree = None
+    state.active = True
+    state.publish_frames = False
+    state.spatial_index_type = SpatialIndexType.KDTREE
+    simulate_beasts()
+    return simulate_beasts
+
+
+BENCHMARKS: Dict[str, Benchmark] = {
+    "kdtree_build": kdtree_build,
+    "kdtree_find_nearest_neighbour": kdtree_find_nearest_neighbour,
+    "brain_step": brain_step,
+    "dna_merge": dna_merge,
+    "dna_mutate": dna_mutate,
+    "dna_get_gene": dna_get_gene,
+    "beast_construction": beast_construction,
+    "simulate_step": simulate_step,
+}
+
+
+def memory_per_beast(size: int) -> Callable[[], object]:
+    """Beasts constructed one by one and gathered in a population, with their DNA, brain and lineage"""
+    dnas = [DNA() for _ in range(size)]
+    return lambda: Population(Beast(dna) for dna in dnas)
+
+
+def memory_per_beast_view(size: int) -> Callable[[], object]:
+    """Views created for every row of a population of beasts that were born in the simulation"""
+    population = _spawn_population(size)
+    return lambda: list(population)
+
+
+def memory_per_kdtree_node(size: int) -> Callable[[], object]:
+    points = _points(size)
+    return lambda: KDTree(world.area(), insert_objects=points)
+
+
+def memory_per_simulated_beast(size: int) -> Callable[[], object]:
+    """Memory a `simulate_beasts` call allocates on top of the population, see `simulate_step`"""
+    return simulate_step(size)
+
+
+MEMORY_BENCHMARKS: Dict[str, MemoryBenchmark] = {
+    "memory_per_beast": memory_per_beast,
+    "memory_per_beast_view": memory_per_beast_view,
+    "memory_per_kdtree_node": memory_per_kdtree_node,
+    "memory_per_simulated_beast": memory_per_simulated_beast,
+}
@@ -0,0 +1,151 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tracemalloc
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Run as a script from anywhere, so the repository root is not on the path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from benchmarks import BENCHMARKS, MEMORY_BENCHMARKS, SEED, SIZES  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+# A benchmark regressed if it takes this much longer than in the baseline
+DEFAULT_THRESHOLD = 0.2
+# Repeat a benchmark until it ran for this long in total, and keep the fastest run
+MIN_TOTAL_TIME = 0.5
+MAX_REPEATS = 5
+
+
+def run_benchmark(name: str, size: int) -> float:
+    """Seconds taken by the fastest of the runs of the benchmark for `size` beasts"""
+    random.seed(SEED)
+    np.random.seed(SEED)
+    function = BENCHMARKS[name](size)
+
+    times: List[float] = []
+    while len(times) < MAX_REPEATS and sum(times) < MIN_TOTAL_TIME:
+        start = perf_counter()
+        function()
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+def run_memory_benchmark(name: str, size: int) -> float:
+    """
+    Peak number of bytes per beast, or per node, allocated while the benchmark for `size` beasts runs. Only memory
+    allocated by Python is traced, which includes numpy arrays.
+    """
+    random.seed(SEED)
+    np.random.seed(SEED)
+    function = MEMORY_BENCHMARKS[name](size)
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        result = function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    del result
+    return (peak - before) / size
+
+
+def result_key(name: str, size: int) -> str:
+    return f"{name}[{size}]"
+
+
+def format_result(name: str, value: float) -> str:
+    return f"{value:.0f} bytes" if name in MEMORY_BENCHMARKS else f"{value:.4f}s"
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[Tuple[str, float, float]]:
+    """
+    Benchmarks that took more than `threshold` longer, or more memory, than in the baseline, with their baseline and new
+    result
+    """
+    return [
+        (key, baseline[key], seconds)
+        for key, seconds in results.items()
+        if key in baseline and seconds > baseline[key] * (1 + threshold)
+    ]
+
+
+def _load_baseline(path: Path) -> Dict[str, float]:
+    if not path.exists():
+        return {}
+    with open(path) as file:
+        return json.load(file)["results"]
+
+
+def _save(path: Path, results: Dict[str, float]):
+    report = {
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "results": results,
+    }
+    with open(path, "w") as file:
+        json.dump(report, file, indent=2, sort_keys=True)
+
+
+def _parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Time the simulation, measure its memory use and compare against the previous run"
+    )
+    parser.add_argument(
+        "--sizes",
+        type=lambda sizes: [int(size) for size in sizes.split(",")],
+        default=list(SIZES),
+        help="comma separated numbers of beasts to run every benchmark for",
+    )
+    names = list(BENCHMARKS) + list(MEMORY_BENCHMARKS)
+    parser.add_argument("--only", nargs="*", choices=names, default=names)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="JSON file with the previous results")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="fraction a benchmark may be slower or use more memory than the baseline before it counts as a regression",
+    )
+    parser.add_argument("--no-save", action="store_true", help="do not replace the baseline by the results of this run")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = _parse_args(argv)
+    baseline = _load_baseline(args.baseline)
+
+    results: Dict[str, float] = {}
+    for name in args.only:
+        run = run_memory_benchmark if name in MEMORY_BENCHMARKS else run_benchmark
+        for size in args.sizes:
+            key = result_key(name, size)
+            results[key] = run(name, size)
+            previous = f" (baseline {format_result(name, baseline[key])})" if key in baseline else ""
+            print(f"{key}: {format_result(name, results[key])}{previous}")
+
+    regressions = compare(results, baseline, args.threshold)
+    for key, baseline_value, value in regressions:
+        name = key.split("[")[0]
+        change = f"{format_result(name, baseline_value)} -> {format_result(name, value)}"
+        print(f"REGRESSION {key}: {change} ({value / baseline_value - 1:+.0%})")
+
+    if not args.no_save:
+        # Keep the results of benchmarks that were not run this time
+        _save(args.baseline, {**baseline, **results})
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
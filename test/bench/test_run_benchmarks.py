@@ -0,0 +1,43 @@
+import json
+
+import pytest
+from benchmarks import BENCHMARKS, MEMORY_BENCHMARKS
+from run_benchmarks import compare, main
+
+from evolution.beast import beast as beast_module
+from evolution.beast import population as population_module
+from evolution.beast import simulate
+from evolution.beast.lineage import Lineage
+from evolution.util.profiling import PhaseTimers
+from evolution.world.metrics import PopulationMetrics
+from evolution.world.state import state
+
+
+@pytest.fixture
+def fresh_world(monkeypatch):
+    """Run the benchmarks on fresh world-level globals, so they do not leak into later tests"""
+    for attribute in ("beasts", "tree", "active", "publish_frames", "spatial_index_type"):
+        monkeypatch.setattr(state, attribute, getattr(state, attribute))
+    monkeypatch.setattr(beast_module, "beast_counter", beast_module.beast_counter)
+    lineage = Lineage()
+    for module in (beast_module, population_module, simulate):
+        monkeypatch.setattr(module, "lineage", lineage)
+    monkeypatch.setattr(simulate, "population_metrics", PopulationMetrics())
+    step_timers = PhaseTimers("step")
+    for module in (population_module, simulate):
+        monkeypatch.setattr(module, "step_timers", step_timers)
+
+
+def test_compare_reports_benchmarks_beyond_the_threshold():
+    baseline = {"a[50]": 1.0, "b[50]": 1.0, "c[50]": 1.0}
+    results = {"a[50]": 1.1, "b[50]": 1.3, "c[50]": 0.5, "d[50]": 9.0}
+
+    assert compare(results, baseline, 0.2) == [("b[50]", 1.0, 1.3)]
+
+
+@pytest.mark.parametrize("name", list(BENCHMARKS) + list(MEMORY_BENCHMARKS))
+def test_benchmarks_run(name, fresh_world, tmp_path):
+    baseline = tmp_path / "baseline.json"
+
+    assert main(["--sizes", "50", "--only", name, "--baseline", str(baseline)]) == 0
+    assert list(json.loads(baseline.read_text())["results"]) == [f"{name}[50]"]
@@ -0,0 +1,103 @@
+import math
+import random
+
+import pytest
+from pygame.rect import Rect
+
+from evolution.datastructures.kdtree import KDTree, KDTreePoint
+
+AREA = Rect(0, 0, 900, 900)
+
+
+def _brute_force_distance(positions, location, obj):
+    distances = [math.dist(position, location) for other, position in positions.items() if other != obj]
+    return min(distances, default=math.inf)
+
+
+def _assert_consistent(tree: KDTree, positions):
+    assert tree.num_points() == len(positions)
+    assert sorted(point.obj for point in tree.points()) == sorted(positions)
+    for obj, location in positions.items():
+        point, distance = tree.find_nearest_neighbour(location, obj)
+        assert distance == _brute_force_distance(positions, location, obj)
+        if point is not None:
+            assert (point.x, point.y) == positions[point.obj]
+
+    all_nearest = tree.all_nearest_neighbours()
+    assert sorted(point.obj for point, _, _ in all_nearest) == sorted(positions)
+    for point, neighbour, distance in all_nearest:
+        assert distance == _brute_force_distance(positions, positions[point.obj], point.obj)
+        if neighbour is not None:
+            assert math.dist((neighbour.x, neighbour.y), positions[point.obj]) == distance
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_updates(seed):
+    rng = random.Random(seed)
+    positions = {i: (rng.randint(0, 900), rng.randint(0, 900)) for i in range(100)}
+    tree = KDTree(AREA, insert_objects=[KDTreePoint(x, y, obj) for obj, (x, y) in positions.items()])
+    next_obj = len(positions)
+
+    for _ in range(20):
+        for obj in list(positions):
+            x, y = positions[obj]
+            positions[obj] = (max(0, min(900, x + rng.randint(-5, 5))), max(0, min(900, y + rng.randint(-5, 5))))
+            tree.update(obj, *positions[obj])
+        for obj in rng.sample(sorted(positions), 10):
+            tree.remove(obj)
+            del positions[obj]
+        for _ in range(rng.randint(0, 20)):
+            positions[next_obj] = (rng.randint(0, 900), rng.randint(0, 900))
+            tree.insert(next_obj, *positions[next_obj])
+            next_obj += 1
+
+        _assert_consistent(tree, positions)
+
+
+def test_remove_all_and_insert_again():
+    tree = KDTree(AREA, insert_objects=[KDTreePoint(i * 10, i * 10, i) for i in range(10)])
+    for obj in range(10):
+        tree.remove(obj)
+    assert tree.num_points() == 0
+    assert tree.find_nearest_neighbour((0, 0), None) == (None, math.inf)
+
+    tree.insert("a", 5, 5)
+    tree.insert("b", 8, 9)
+    _assert_consistent(tree, {"a": (5, 5), "b": (8, 9)})
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_k_nearest_and_within_radius(seed):
+    rng = random.Random(seed)
+    positions = {i: (rng.randint(0, 900), rng.randint(0, 900)) for i in range(200)}
+    tree = KDTree(AREA, insert_objects=[KDTreePoint(x, y, obj) for obj, (x, y) in positions.items()])
+    # Leave deleted nodes in the tree
+    for obj in rng.sample(sorted(positions), 50):
+        tree.remove(obj)
+        del positions[obj]
+
+    for _ in range(20):
+        location = (rng.randint(0, 900), rng.randint(0, 900))
+        exclude = rng.choice(sorted(positions))
+        distances = sorted(math.dist(position, location) for obj, position in positions.items() if obj != exclude)
+
+        nearest = tree.k_nearest(location, 5, exclude)
+        assert [distance for _, distance in nearest] == distances[:5]
+        assert all(point.obj != exclude for point, _ in nearest)
+
+        in_range = tree.k_nearest(location, 5, exclude, max_distance=100)
+        assert [distance for _, distance in in_range] == [distance for distance in distances[:5] if distance < 100]
+
+        within = tree.within_radius(location, 100)
+        expected = sorted(math.dist(position, location) for position in positions.values())
+        assert [distance for _, distance in within] == [distance for distance in expected if distance < 100]
+        for point, distance in within:
+            assert math.dist(positions[point.obj], location) == distance
+
+
+def test_find_nearest_neighbour_in_range():
+    tree = KDTree(AREA, insert_objects=[KDTreePoint(0, 0, "a"), KDTreePoint(100, 0, "b")])
+    assert tree.find_nearest_neighbour((0, 0), "a", max_distance=100) == (None, math.inf)
+    point, distance = tree.find_nearest_neighbour((0, 0), "a", max_distance=101)
+    assert (point.obj, distance) == ("b", 100)
+    assert [distance for _, _, distance in tree.all_nearest_neighbours(50)] == [math.inf, math.inf]
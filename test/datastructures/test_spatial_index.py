@@ -0,0 +1,152 @@
+import math
+import random
+
+import numpy as np
+import pytest
+from pygame.rect import Rect
+
+from evolution.datastructures.array_kdtree import ArrayKDTree
+from evolution.datastructures.hashgrid import HashGrid
+from evolution.datastructures.kdtree import KDTree, KDTreePoint
+from evolution.datastructures.spatial_index import GRID_LINE, SPLIT_LINE
+
+AREA = Rect(0, 0, 900, 900)
+
+
+def _random_points(seed: int, num_points: int):
+    rng = random.Random(seed)
+    return [KDTreePoint(rng.randint(0, 900), rng.randint(0, 900), i) for i in range(num_points)]
+
+
+@pytest.mark.parametrize("num_points", [1, 2, 10, 500])
+@pytest.mark.parametrize("cell_size", [15, 100])
+def test_hash_grid_matches_kdtree(num_points, cell_size):
+    points = _random_points(num_points, num_points)
+    tree = KDTree(AREA, insert_objects=points)
+    grid = HashGrid(AREA, cell_size, points)
+
+    for point in points:
+        tree_point, tree_distance = tree.find_nearest_neighbour((point.x, point.y), point.obj)
+        grid_point, grid_distance = grid.find_nearest_neighbour((point.x, point.y), point.obj)
+        assert grid_distance == tree_distance
+        assert (grid_point is None) == (tree_point is None)
+        if grid_point is not None:
+            assert grid_point.obj != point.obj
+            assert math.dist((grid_point.x, grid_point.y), (point.x, point.y)) == grid_distance
+
+
+def _cell_contents(grid: HashGrid):
+    return {cell: sorted((point.obj, point.x, point.y) for point in points) for cell, points in grid.cells.items()}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_hash_grid_updates_match_a_rebuilt_grid(seed):
+    rng = random.Random(seed)
+    positions = {point.obj: (point.x, point.y) for point in _random_points(seed, 200)}
+    grid = HashGrid(AREA, 30, [KDTreePoint(x, y, obj) for obj, (x, y) in positions.items()])
+    next_obj = len(positions)
+
+    for _ in range(10):
+        for obj in list(positions):
+            x, y = positions[obj]
+            # Most moves stay within a cell, some cross into a neighbouring one
+            positions[obj] = (max(0, min(900, x + rng.randint(-20, 20))), max(0, min(900, y + rng.randint(-20, 20))))
+            grid.update(obj, *positions[obj])
+        for obj in rng.sample(sorted(positions), 20):
+            grid.remove(obj)
+            del positions[obj]
+        for _ in range(rng.randint(0, 30)):
+            positions[next_obj] = (rng.randint(0, 900), rng.randint(0, 900))
+            grid.insert(next_obj, *positions[next_obj])
+            next_obj += 1
+
+        rebuilt = HashGrid(AREA, 30, [KDTreePoint(x, y, obj) for obj, (x, y) in positions.items()])
+        assert _cell_contents(grid) == _cell_contents(rebuilt)
+        assert grid.num_points() == rebuilt.num_points() == len(positions)
+        assert all(obj in grid for obj in positions)
+        for obj, location in positions.items():
+            assert grid.find_nearest_neighbour(location, obj)[1] == rebuilt.find_nearest_neighbour(location, obj)[1]
+
+
+@pytest.mark.parametrize("num_points", [0, 1, 2, 4, 5, 17, 500])
+def test_array_kdtree_matches_kdtree(num_points):
+    points = _random_points(num_points, num_points)
+    tree = KDTree(AREA, insert_objects=points) if points else None
+    array_tree = ArrayKDTree(AREA, points)
+    assert array_tree.num_points() == num_points
+
+    for point in points:
+        tree_point, tree_distance = tree.find_nearest_neighbour((point.x, point.y), point.obj)
+        array_point, array_distance = array_tree.find_nearest_neighbour((point.x, point.y), point.obj)
+        assert array_distance == tree_distance
+        assert (array_point is None) == (tree_point is None)
+
+    assert array_tree.find_nearest_neighbour((10, 10), None)[1] == (
+        tree.find_nearest_neighbour((10, 10), None)[1] if tree else math.inf
+    )
+
+
+@pytest.mark.parametrize("index_class", [KDTree, HashGrid, ArrayKDTree])
+def test_within_radius_matches_brute_force(index_class):
+    points = _random_points(1, 300)
+    if index_class is HashGrid:
+        index = HashGrid(AREA, 30, points)
+    elif index_class is ArrayKDTree:
+        index = ArrayKDTree(AREA, points)
+    else:
+        index = KDTree(AREA, insert_objects=points)
+
+    rng = random.Random(2)
+    for radius in [0, 15, 100, 2000]:
+        location = (rng.randint(0, 900), rng.randint(0, 900))
+        expected = sorted(math.dist((point.x, point.y), location) for point in points)
+        within = index.within_radius(location, radius)
+        assert [distance for _, distance in within] == [distance for distance in expected if distance < radius]
+
+        nearest, distance = index.find_nearest_neighbour(location, None, max_distance=radius)
+        assert distance == (expected[0] if expected[0] < radius else math.inf)
+
+
+@pytest.mark.parametrize("index_class", [KDTree, HashGrid, ArrayKDTree])
+def test_within_rect_matches_brute_force(index_class):
+    points = _random_points(3, 300)
+    if index_class is HashGrid:
+        index = HashGrid(AREA, 30, points)
+    elif index_class is KDTree:
+        index = KDTree(AREA, insert_objects=points)
+        for point in points[::3]:
+            index.remove(point.obj)
+        points = [point for point in points if point.obj % 3 != 0]
+    else:
+        index = index_class(AREA, points)
+
+    for rect in [Rect(0, 0, 900, 900), Rect(100, 200, 300, 150), Rect(450, 450, 1, 1), Rect(-50, 800, 2000, 2000)]:
+        expected = sorted(point.obj for point in points if rect.collidepoint(point.x, point.y))
+        assert sorted(point.obj for point in index.within_rect(rect)) == expected
+
+
+@pytest.mark.parametrize("index_class", [KDTree, ArrayKDTree])
+def test_tree_outline_has_a_split_line_per_split(index_class):
+    points = _random_points(4, 300)
+    index = KDTree(AREA, insert_objects=points) if index_class is KDTree else ArrayKDTree(AREA, points)
+    outline = index.outline()
+
+    num_splits = len(index.nodes) if index_class is KDTree else int((index.used & ~index.leaf).sum())
+    assert outline.lines.shape == (num_splits, 4) and outline.rects.shape == (0, 4)
+    assert np.all(outline.kinds == SPLIT_LINE)
+    # Every line splits an area of the tree along an axis
+    left, top, right, bottom = outline.lines.T
+    assert np.all((left == right) | (top == bottom))
+    assert np.all((outline.lines >= 0) & (outline.lines <= 900))
+    with pytest.raises(ValueError):
+        outline.lines[0, 0] = 5
+
+
+def test_hash_grid_outline_has_the_grid_and_the_occupied_cells():
+    grid = HashGrid(AREA, 30, _random_points(5, 100))
+    outline = grid.outline()
+
+    assert len(outline.lines) == 2 * 900 // 30 and np.all(outline.kinds == GRID_LINE)
+    assert sorted(map(tuple, outline.rects.tolist())) == sorted(
+        (30.0 * cell_x, 30.0 * cell_y, 30.0, 30.0) for cell_x, cell_y in grid.cells
+    )
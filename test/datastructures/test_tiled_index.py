@@ -0,0 +1,134 @@
+import math
+
+import numpy as np
+import pytest
+from pygame.rect import Rect
+
+from evolution.beast.dna.gene import DNA_LENGTH
+from evolution.beast.population import Population
+from evolution.datastructures.kdtree import KDTree, KDTreePoint
+from evolution.datastructures.spatial_index import SPLIT_LINE, TILE_LINE
+from evolution.datastructures.tiled_index import TiledIndex, close_pools
+
+AREA = Rect(0, 0, 900, 900)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _close_pools():
+    yield
+    close_pools()
+
+
+def _random_population(seed: int, num_beasts: int) -> Population:
+    rng = np.random.default_rng(seed)
+    population = Population()
+    population.spawn(
+        np.zeros((num_beasts, DNA_LENGTH // 2), dtype=np.uint8),
+        rng.integers(0, 901, num_beasts),
+        rng.integers(0, 901, num_beasts),
+        np.arange(num_beasts),
+    )
+    return population
+
+
+def _row_tree(population: Population, rows: np.ndarray) -> KDTree:
+    """Tree over the beasts in `rows`, with the row as the object of every point"""
+    points = [KDTreePoint(x, y, row) for row, x, y in zip(rows.tolist(), population.x[rows], population.y[rows])]
+    return KDTree(AREA, insert_objects=points)
+
+
+@pytest.mark.parametrize("num_workers", [1, 2, 6])
+def test_all_nearest_neighbours_matches_kdtree(num_workers):
+    population = _random_population(num_workers, 1000)
+    rows = np.arange(0, 1000, 2)
+    tree = _row_tree(population, rows)
+    index = TiledIndex(AREA, population, rows, num_workers, min_points_per_worker=1)
+
+    expected = {point.obj: distance for point, _, distance in tree.all_nearest_neighbours(40)}
+    actual = index.all_nearest_neighbours(40)
+    assert sorted(point.obj._row for point, _, _ in actual) == sorted(expected)
+    for point, neighbour, distance in actual:
+        assert distance == expected[point.obj._row]
+        if neighbour is not None:
+            assert math.dist((point.x, point.y), (neighbour.x, neighbour.y)) == distance
+
+    index_rows, neighbours, distances = index.nearest_neighbour_rows(40)
+    assert sorted(index_rows.tolist()) == sorted(expected)
+    assert distances.tolist() == [expected[row] for row in index_rows.tolist()]
+    found = neighbours >= 0
+    np.testing.assert_array_equal(np.isfinite(distances), found)
+    np.testing.assert_array_equal(
+        np.hypot(
+            population.x[index_rows[found]] - population.x[neighbours[found]],
+            population.y[index_rows[found]] - population.y[neighbours[found]],
+        ),
+        distances[found],
+    )
+
+
+@pytest.mark.parametrize("num_workers", [1, 4])
+def test_many_within_radius_matches_kdtree(num_workers):
+    population = _random_population(0, 1000)
+    rows = np.arange(1000)
+    tree = _row_tree(population, rows)
+    index = TiledIndex(AREA, population, rows, num_workers, min_points_per_worker=1)
+
+    locations = list(zip(population.x[:300].tolist(), population.y[:300].tolist())) + [(0, 0), (450, 450), (900, 900)]
+    expected = [
+        sorted((point.obj, distance) for point, distance in tree.within_radius(location, 30)) for location in locations
+    ]
+    found = index.many_within_radius(locations, 30)
+    assert [sorted((point.obj._row, distance) for point, distance in points) for points in found] == expected
+
+    x = np.array([location[0] for location in locations])
+    y = np.array([location[1] for location in locations])
+    counts, found_rows = index.rows_within_radius(x, y, 30)
+    assert counts.tolist() == [len(points) for points in expected]
+    ends = np.cumsum(counts).tolist()
+    for query, (count, end, points) in enumerate(zip(counts.tolist(), ends, expected)):
+        location_rows = found_rows[end - count : end]
+        assert sorted(location_rows.tolist()) == sorted(row for row, _ in points)
+        distances = np.hypot(population.x[location_rows] - x[query], population.y[location_rows] - y[query])
+        assert np.all(np.diff(distances) >= 0)
+
+
+@pytest.mark.parametrize("num_workers", [1, 4])
+def test_index_follows_the_beasts_as_they_move(num_workers):
+    population = _random_population(5, 2000)
+    rows = np.flatnonzero(np.arange(2000) % 5 != 0)
+    index = TiledIndex(AREA, population, rows, num_workers, min_points_per_worker=1)
+    index.nearest_neighbour_rows(30)
+
+    rng = np.random.default_rng(6)
+    population.x[:2000] = np.clip(population.x[:2000] + rng.integers(-20, 21, 2000), 0, 900)
+    population.y[:2000] = np.clip(population.y[:2000] + rng.integers(-20, 21, 2000), 0, 900)
+    tree = _row_tree(population, rows)
+
+    expected = {point.obj: distance for point, _, distance in tree.all_nearest_neighbours(30)}
+    index_rows, _, distances = index.nearest_neighbour_rows(30)
+    assert dict(zip(index_rows.tolist(), distances.tolist())) == expected
+    counts, _ = index.rows_within_radius(population.x[rows], population.y[rows], 15)
+    assert counts.tolist() == [
+        len(tree.within_radius((int(population.x[row]), int(population.y[row])), 15)) for row in rows
+    ]
+
+
+def test_within_rect_matches_brute_force():
+    population = _random_population(3, 300)
+    rows = np.arange(1, 300, 3)
+    index = TiledIndex(AREA, population, rows)
+
+    for rect in [Rect(0, 0, 900, 900), Rect(100, 200, 300, 150), Rect(450, 450, 1, 1), Rect(-50, 800, 2000, 2000)]:
+        expected = [row for row in rows.tolist() if rect.collidepoint(population.x[row], population.y[row])]
+        assert sorted(point.obj._row for point in index.within_rect(rect)) == expected
+
+
+def test_outline_has_the_tiles_and_the_splits_of_the_tree():
+    population = _random_population(4, 300)
+    index = TiledIndex(AREA, population, np.arange(300), num_workers=6, min_points_per_worker=1)
+    outline = index.outline()
+
+    num_tile_lines = index.columns - 1 + index.rows - 1
+    assert np.all(outline.kinds[:num_tile_lines] == TILE_LINE)
+    np.testing.assert_array_equal(outline.lines[num_tile_lines:], index.tree.outline().lines)
+    assert np.all(outline.kinds[num_tile_lines:] == SPLIT_LINE)
@@ -0,0 +1,28 @@
+import pygame
+
+from evolution.beast.brain.brain import Brain
+from evolution.beast.dna.dna import DNA
+from evolution.simulation.ui.brain_renderer import BrainRenderer, brain_topology
+
+
+def test_brains_with_the_same_topology_share_a_drawing():
+    pygame.font.init()
+    renderer = BrainRenderer()
+    dna = DNA()
+    first = renderer.draw_brain(Brain(dna))
+
+    assert renderer.draw_brain(Brain(DNA(dna.dna))) is first
+    other = next(
+        brain for brain in (Brain(DNA()) for _ in range(10)) if brain_topology(brain) != brain_topology(Brain(dna))
+    )
+    assert renderer.draw_brain(other) is not first
+
+
+def test_background_drawing_is_cached_once_done():
+    pygame.font.init()
+    renderer = BrainRenderer()
+    brain = Brain(DNA())
+
+    assert renderer.draw_brain_in_background(brain) is None
+    renderer._executor.shutdown(wait=True)
+    assert renderer.draw_brain_in_background(brain) is renderer.draw_brain(brain)
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from pygame.rect import Rect
+
+from evolution.simulation.camera import MAX_ZOOM, Camera
+
+
+def test_camera_starts_with_the_whole_world_in_view():
+    camera = Camera((900, 900), (20000, 10000))
+
+    assert camera.zoom == camera.min_zoom == 0.045
+    # The world is centered vertically
+    assert camera.viewport().contains(Rect(0, 0, 20000, 10000))
+    assert camera.to_screen(np.array([20000]), np.array([5000])) == (pytest.approx([900]), pytest.approx([450]))
+
+
+def test_zoom_keeps_the_location_under_the_cursor():
+    camera = Camera((900, 900), (20000, 20000))
+    location = camera.to_world((300, 600))
+
+    camera.zoom_at((300, 600), 4)
+    assert camera.zoom == pytest.approx(4 * camera.min_zoom)
+    assert camera.to_world((300, 600)) == pytest.approx(location)
+
+    camera.zoom_at((300, 600), 1000)
+    assert camera.zoom == MAX_ZOOM
+    camera.zoom_at((300, 600), 1 / 1000)
+    assert camera.zoom == camera.min_zoom
+
+
+def test_pan_stays_within_the_world():
+    camera = Camera((900, 900), (3600, 3600))
+    camera.zoom_at((0, 0), 16)
+    assert camera.viewport() == Rect(0, 0, 225, 225)
+
+    camera.pan(450, 900)
+    assert camera.viewport() == Rect(112, 225, 226, 225)
+    camera.pan(-10000, 10**9)
+    assert camera.offset == (0, 3600 - 225)
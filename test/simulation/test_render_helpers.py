@@ -0,0 +1,28 @@
+import pygame
+import pytest
+
+from evolution.simulation.render_helpers import GlyphCache, get_name_font
+
+
+@pytest.fixture(scope="module", autouse=True)
+def fonts():
+    pygame.font.init()
+
+
+def test_labels_share_the_glyphs_of_their_characters():
+    glyphs = GlyphCache(get_name_font)
+    labels = [glyphs.label_blits(str(beast_id), (100, 100)) for beast_id in range(1000)]
+
+    assert len(glyphs._glyphs) == 10
+    assert labels[11][0][0] is labels[11][1][0] is labels[1][0][0]
+
+
+def test_label_is_centered_and_laid_out_left_to_right():
+    glyphs = GlyphCache(get_name_font)
+    blits = glyphs.label_blits("1234", (50, 40))
+
+    widths = [glyph.get_width() for glyph, _ in blits]
+    left, top = blits[0][1]
+    assert left == pytest.approx(50 - sum(widths) / 2)
+    assert top == pytest.approx(40 - blits[0][0].get_height() / 2)
+    assert [x for _, (x, _) in blits] == pytest.approx([left + sum(widths[:i]) for i in range(4)])
@@ -0,0 +1,92 @@
+import threading
+from typing import Tuple
+from unittest.mock import Mock
+
+import pytest
+
+from evolution.beast.beast import Beast
+from evolution.simulation import scheduler as scheduler_module
+from evolution.simulation.events import EventLoop
+from evolution.simulation.render import Render
+from evolution.simulation.scheduler import SIMULATION_STEP_TIME, Scheduler
+from evolution.simulation.ui.interactions import MAX_SPEED, MIN_SPEED, change_speed
+from evolution.world.state import State
+
+
+class FakeClock:
+    """Clock for the scheduler that only moves while it waits, so its timing does not depend on the machine"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def perf_counter(self) -> float:
+        return self.now
+
+    def wait(self, event: threading.Event, seconds: float):
+        self.now += seconds
+
+
+def _scheduler(monkeypatch, state: State, num_steps: int, frame_rate: int = 50) -> Tuple[Scheduler, list]:
+    """
+    Scheduler that stops after `num_steps` steps, which are recorded with whether they published a frame. Every step
+    takes a millisecond of the fake clock.
+    """
+    steps = []
+    clock = FakeClock()
+
+    def simulate_beasts(publish: bool = True):
+        steps.append((clock.now, publish))
+        clock.now += 0.001
+        if len(steps) == num_steps:
+            state.active = False
+
+    monkeypatch.setattr(scheduler_module, "simulate_beasts", simulate_beasts)
+    state.beasts += [Beast()]
+    return Scheduler(state, Mock(spec=Render), Mock(spec=EventLoop), frame_rate, clock), steps
+
+
+def test_step_time_follows_speed_and_turbo():
+    state = State()
+    scheduler = Scheduler(state, Mock(spec=Render), Mock(spec=EventLoop), 60)
+    assert scheduler.step_time() == SIMULATION_STEP_TIME
+
+    state.speed = 4
+    assert scheduler.step_time() == SIMULATION_STEP_TIME / 4
+    state.turbo = True
+    state.turbo_steps_per_frame = 5
+    assert scheduler.step_time() == pytest.approx(1 / 300)
+
+
+def test_simulation_steps_on_a_fixed_timestep(monkeypatch):
+    state = State()
+    state.speed = 0.5
+    scheduler, steps = _scheduler(monkeypatch, state, 6)
+
+    scheduler.simulation_loop()
+    intervals = [later[0] - earlier[0] for earlier, later in zip(steps, steps[1:])]
+    assert min(intervals) >= 2 * SIMULATION_STEP_TIME * 0.9
+    assert sum(intervals) < 5 * 2 * SIMULATION_STEP_TIME * 1.5
+
+
+def test_frames_are_published_at_most_once_per_frame(monkeypatch):
+    state = State()
+    state.turbo = True
+    state.turbo_steps_per_frame = 4
+    scheduler, steps = _scheduler(monkeypatch, state, 40, frame_rate=50)
+
+    scheduler.simulation_loop()
+    published = [time for time, publish in steps if publish]
+    duration = steps[-1][0] - steps[0][0]
+    assert len(published) <= duration * 50 + 1 and len(published) < len(steps) / 2
+    assert min(later - earlier for earlier, later in zip(published, published[1:])) >= 1 / 50 * 0.9
+
+
+def test_change_speed_is_limited():
+    state = State()
+    change_speed(state, 2)
+    assert state.speed == 2
+    for _ in range(20):
+        change_speed(state, 1 / 2)
+    assert state.speed == MIN_SPEED
+    change_speed(state, 10**6)
+    assert state.speed == MAX_SPEED
@@ -0,0 +1,80 @@
+import random
+
+import numpy as np
+import pygame
+import pytest
+
+from evolution.beast.beast import Beast
+from evolution.beast.population import Population
+from evolution.simulation.camera import Camera
+from evolution.simulation.sprites import SpriteCache
+from evolution.util.math_helpers import translate
+from evolution.world.frame import capture_frame
+from evolution.world.world import Position
+
+
+def _pixels(surface: pygame.surface.Surface) -> np.ndarray:
+    return pygame.surfarray.array3d(surface)
+
+
+@pytest.mark.parametrize("rotation", [0, 45, 90, 135, 180, 270, 355])
+@pytest.mark.parametrize("selected", [False, True])
+def test_beast_sprite_matches_direct_drawing(rotation, selected):
+    size, color, position = 7, (10, 200, 30), (50, 50)
+    expected = pygame.Surface((100, 100))
+    expected.fill((255, 255, 255))
+    pygame.draw.line(expected, (0, 0, 0), position, translate(position, rotation - 180, 3 * size), 3)
+    edge_color, edge_width = ((255, 0, 0), 3) if selected else ((0, 0, 0), 1)
+    pygame.draw.circle(expected, edge_color, position, size + edge_width)
+    pygame.draw.circle(expected, color, position, size)
+
+    actual = pygame.Surface((100, 100))
+    actual.fill((255, 255, 255))
+    image, (offset_x, offset_y) = SpriteCache().beast(size, color, rotation, selected)
+    actual.blit(image, (position[0] - offset_x, position[1] - offset_y))
+
+    np.testing.assert_array_equal(_pixels(actual), _pixels(expected))
+
+
+def test_least_recently_used_sprite_is_dropped():
+    sprites = SpriteCache(max_sprites=2)
+    first = sprites.dead(1, False)
+    sprites.dead(2, False)
+    assert sprites.dead(1, False) is first
+    sprites.dead(3, False)
+
+    assert len(sprites) == 2
+    assert sprites.dead(1, False) is first
+    assert sprites.dead(2, False) is not None and len(sprites) == 2
+
+
+def test_frame_sprites_match_beast_sprites():
+    rng = random.Random(9)
+    beasts = [Beast(position=Position(rng.randint(0, 900), rng.randint(0, 900))) for _ in range(50)]
+    for beast in beasts:
+        beast.rotation = rng.randint(0, 359)
+        beast.dead = rng.choice([0, 0, 3])
+        beast.killed = rng.random() < 0.5
+    beasts[0].dead = 0
+    population = Population(beasts)
+    sprites = SpriteCache()
+
+    frame = capture_frame(population, selected_id=beasts[0].id)
+    expected = [sprites.beast_sprite(beast, selected=beast is beasts[0]) for beast in population]
+    assert sprites.frame_sprites(frame) == expected
+
+
+def test_frame_sprites_are_placed_and_scaled_by_the_camera():
+    population = Population([Beast(position=Position(1000, 500)), Beast(position=Position(1100, 600))])
+    sprites = SpriteCache()
+    camera = Camera((900, 900), (1800, 1800))
+    camera.zoom_at((0, 0), 4)
+    camera.pan(1800, 900)
+
+    frame = capture_frame(population)
+    for beast, (image, position) in zip(population, sprites.frame_sprites(frame, camera)):
+        sprite_image, (sprite_x, sprite_y) = sprites.beast(
+            max(round(beast.size * 2), 1), tuple(beast.color), beast.rotation, False
+        )
+        assert image is sprite_image
+        assert position == (round((beast.x - 900) * 2) - sprite_x, round((beast.y - 450) * 2) - sprite_y)
@@ -0,0 +1,33 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from evolution import headless
+from evolution.beast.dna.gene import DNA_LENGTH
+from evolution.beast.population import Population
+from evolution.world.state import state
+
+
+def test_report_counts_without_creating_views(monkeypatch, capsys):
+    population = Population()
+    population.spawn(np.zeros((5, DNA_LENGTH // 2), dtype=np.uint8), np.arange(5), np.arange(5), np.arange(5))
+    population.dead[1] = 3
+    monkeypatch.setattr(state, "beasts", population)
+
+    headless._report(10, 100.0)
+
+    assert "step 10: 100.0 SPS, 4 alive, 1 dead" in capsys.readouterr().out
+    assert population.beasts == [None] * 5
+
+
+def test_headless_does_not_import_the_user_interface():
+    code = (
+        "import sys, evolution.headless; "
+        "print(sorted(m for m in sys.modules if m.startswith(('evolution.simulation', 'networkx'))))"
+    )
+    root = Path(__file__).resolve().parents[1]
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from evolution.util import profiling
+from evolution.util.profiling import PhaseTimers
+
+
+def _run_cycle(timers: PhaseTimers, monkeypatch, durations):
+    clock = iter([0.0] + [sum(list(durations.values())[: i + 1]) for i in range(len(durations))])
+    monkeypatch.setattr(profiling, "perf_counter", lambda: next(clock))
+    timers.start()
+    for phase in durations:
+        timers.lap(phase)
+    timers.end()
+
+
+def test_percentiles_cover_the_last_cycles_only(monkeypatch):
+    timers = PhaseTimers("test", size=10)
+    for duration in range(100):
+        _run_cycle(timers, monkeypatch, {"phase": float(duration)})
+
+    [p50, p95, p99] = timers.percentiles()["phase"]
+    assert p50 == pytest.approx(94.5)
+    assert 98 < p95 <= p99 <= 99
+
+
+def test_phase_missing_from_a_cycle_took_no_time(monkeypatch):
+    timers = PhaseTimers("test", size=4)
+    _run_cycle(timers, monkeypatch, {"first": 1.0})
+    _run_cycle(timers, monkeypatch, {"first": 1.0, "second": 2.0})
+
+    assert timers.percentiles([0, 100]) == {"first": [1.0, 1.0], "second": [0.0, 2.0]}
+
+
+def test_cycles_are_exported_as_json_lines(monkeypatch, tmp_path):
+    path = tmp_path / "timings.jsonl"
+    timers = PhaseTimers("test")
+    timers.export_to(str(path))
+    _run_cycle(timers, monkeypatch, {"tree": 0.001, "brains": 0.002})
+    _run_cycle(timers, monkeypatch, {"tree": 0.003})
+    timers.export_to(None)
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert lines == [
+        {"timers": "test", "cycle": 1, "ms": {"tree": 1.0, "brains": 2.0}},
+        {"timers": "test", "cycle": 2, "ms": {"tree": 3.0}},
+    ]
@@ -0,0 +1,59 @@
+import random
+from typing import Tuple
+
+import pygame
+import pytest
+from pygame.rect import Rect
+
+from evolution.beast.beast import Beast
+from evolution.beast.population import Population
+from evolution.datastructures.kdtree import KDTree, KDTreePoint
+from evolution.util.render_kdtree import TreeRenderer
+from evolution.world.frame import TreeNodes, capture_frame
+from evolution.world.world import Position
+
+
+@pytest.fixture(scope="module", autouse=True)
+def fonts():
+    pygame.font.init()
+
+
+def _tree(num_beasts: int) -> Tuple[Population, KDTree]:
+    rng = random.Random(10)
+    population = Population(
+        [Beast(position=Position(rng.randint(0, 899), rng.randint(0, 899))) for _ in range(num_beasts)]
+    )
+    points = [KDTreePoint(beast.x, beast.y, beast) for beast in population]
+    return population, KDTree(Rect(0, 0, 900, 900), insert_objects=points)
+
+
+def _nodes(population: Population, tree: KDTree) -> TreeNodes:
+    nodes = capture_frame(population, tree, nodes=True).tree_nodes
+    assert nodes is not None
+    return nodes
+
+
+def test_every_node_is_drawn_once_in_its_layer():
+    population, tree = _tree(300)
+    renderer = TreeRenderer((600, 600))
+    surface = renderer.render(_nodes(population, tree))
+
+    layer_records, _ = renderer._collect(_nodes(population, tree))
+    assert surface.get_size() == (600, 600)
+    assert sum(len(records) for records in layer_records) == tree.count
+    assert renderer.layers_drawn == len(layer_records)
+
+
+def test_only_changed_layers_are_drawn_again():
+    population, tree = _tree(300)
+    renderer = TreeRenderer((600, 600))
+    renderer.render(_nodes(population, tree))
+
+    renderer.render(_nodes(population, tree))
+    assert renderer.layers_drawn == 0
+
+    # Removing a leaf changes its own layer and at most the layer of its parent
+    leaf = next(node for node in tree.nodes.values() if node.left is None and node.right is None and node.depth > 4)
+    tree.remove(leaf.point.obj)
+    renderer.render(_nodes(population, tree))
+    assert 1 <= renderer.layers_drawn <= 2
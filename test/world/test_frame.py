@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+from pygame.rect import Rect
+
+from evolution.beast.beast import Beast
+from evolution.beast.population import Population
+from evolution.datastructures.hashgrid import HashGrid
+from evolution.datastructures.kdtree import KDTree, KDTreePoint
+from evolution.world.frame import capture_frame
+from evolution.world.world import Position
+
+
+def _population() -> Population:
+    return Population([Beast(position=Position(100 * i, 50)) for i in range(1, 6)])
+
+
+def test_frame_is_a_read_only_copy():
+    population = _population()
+    frame = capture_frame(population)
+
+    population[0].position = Position(1, 1)
+    population[1].dead = 1
+    assert frame.x[0] == 100 and frame.dead[1] == 0
+    with pytest.raises(ValueError):
+        frame.x[0] = 5
+    np.testing.assert_array_equal(frame.color, [beast.color for beast in population])
+
+
+def test_beast_at_finds_the_beast_covering_a_position():
+    population = _population()
+    frame = capture_frame(population)
+
+    assert frame.beast_at((300, 50 + population[2].size)) == population[2].id
+    assert frame.beast_at((250, 50)) is None
+
+
+def test_frame_has_the_details_of_the_selected_beast():
+    population = _population()
+    beast = population[3]
+    frame = capture_frame(population, selected_id=beast.id)
+
+    assert frame.selected_row == 3
+    assert frame.selected_stats == beast.stats_string()
+    assert frame.selected_brain is beast.brain
+    assert capture_frame(population, selected_id=-5).selected_stats is None
+
+
+def test_frame_only_holds_the_beasts_in_the_viewport():
+    population = _population()
+    population[3].dead = 1
+    alive = population.alive_rows()
+    tree = KDTree(
+        Rect(0, 0, 900, 900), insert_objects=[KDTreePoint(100 * (row + 1), 50, population[row]) for row in alive]
+    )
+    population.nearest[0] = 4
+    viewport = Rect(150, 0, 300, 100)
+
+    for index in (tree, None):
+        frame = capture_frame(population, index, viewport=viewport)
+        # Within the margin around the viewport, the dead beast is not in the index
+        assert frame.ids.tolist() == [population[row].id for row in (1, 2, 3)]
+        assert frame.num_beasts == 5 and frame.viewport == viewport
+
+    frame = capture_frame(population, tree, selected_id=population[0].id, viewport=Rect(0, 0, 100, 100))
+    assert frame.nearest_x.tolist() == [500] and frame.nearest_y.tolist() == [50]
+    assert frame.selected_row == 0
+    out_of_view = capture_frame(population, tree, selected_id=population[4].id, viewport=Rect(0, 0, 100, 100))
+    assert out_of_view.selected_row == -1 and out_of_view.selected_stats == population[4].stats_string()
+
+
+def test_frame_holds_a_copy_of_the_index_when_asked():
+    population = _population()
+    tree = KDTree(Rect(0, 0, 900, 900), insert_objects=[KDTreePoint(beast.x, beast.y, beast) for beast in population])
+
+    assert capture_frame(population, tree).index_outline is None
+    frame = capture_frame(population, tree, outline=True, nodes=True)
+    lines = frame.index_outline.lines.copy()
+    nodes = frame.tree_nodes
+    assert len(nodes) == tree.count == len(lines)
+    assert sorted(nodes.ids.tolist()) == [beast.id for beast in population]
+    for beast_id, color in zip(nodes.ids.tolist(), nodes.color.tolist()):
+        assert tuple(color) == tuple(next(beast for beast in population if beast.id == beast_id).color)
+    with pytest.raises(ValueError):
+        nodes.depth[0] = 5
+
+    # The simulation goes on changing the index
+    tree.remove(population[2])
+    tree.insert(population[2], 700, 700)
+    np.testing.assert_array_equal(frame.index_outline.lines, lines)
+    assert not nodes.deleted.any()
+    assert capture_frame(population, tree, nodes=True).tree_nodes.deleted.sum() == 1
+    assert capture_frame(population, HashGrid(Rect(0, 0, 900, 900), 30), nodes=True).tree_nodes is None
@@ -0,0 +1,55 @@
+import csv
+
+import numpy as np
+import pytest
+
+from evolution.beast.beast import Beast
+from evolution.beast.population import Population
+from evolution.world.metrics import COUNT_COLUMNS, MetricsHistory, PopulationMetrics, gene_values
+
+
+def test_history_keeps_older_samples_at_a_coarser_resolution():
+    history = MetricsHistory(["value"], size=5, factor=2, levels=3)
+    for value in range(20):
+        history.append(np.array([value]))
+
+    assert len(history) == 20
+    np.testing.assert_array_equal(history.series(0)["value"], [15, 16, 17, 18, 19])
+    np.testing.assert_array_equal(history.series(1)["value"], [10.5, 12.5, 14.5, 16.5, 18.5])
+    np.testing.assert_array_equal(history.series(2)["value"], [1.5, 5.5, 9.5, 13.5, 17.5])
+
+
+def test_record_counts_the_step():
+    beasts = [Beast() for _ in range(6)]
+    beasts[0].dead = 1
+    beasts[0].killed = True
+    beasts[1].dead = 1
+    beasts[2].dead = 4
+    population = Population(beasts)
+    metrics = PopulationMetrics()
+
+    metrics.record(1, population, births=2, fights=3)
+    sample = {column: series[-1] for column, series in metrics.history.series().items()}
+    assert [sample[column] for column in COUNT_COLUMNS[:-1]] == [1, 3, 3, 2, 2, 1, 3]
+    assert sample["mean_energy"] == pytest.approx(np.mean([beast.energy for beast in beasts[3:]]))
+    sizes = [beast.size for beast in beasts[3:]]
+    assert sample["size_mean"] == pytest.approx(np.mean(sizes)) and sample["size_var"] == pytest.approx(np.var(sizes))
+    assert len(gene_values(population.column("dna"))) * 2 + len(COUNT_COLUMNS) == len(metrics.columns)
+
+
+def test_metrics_are_streamed_to_csv(tmp_path):
+    path = tmp_path / "metrics.csv"
+    population = Population([Beast() for _ in range(3)])
+    metrics = PopulationMetrics()
+    metrics.export_to(str(path))
+    # The metrics were not recorded in step 9
+    for births, step in enumerate([7, 8, 10, 11]):
+        metrics.record(step, population, births, 0)
+    metrics.export_to(None)
+
+    with open(path) as file:
+        rows = list(csv.DictReader(file))
+    assert list(rows[0]) == metrics.columns
+    assert [float(row["births"]) for row in rows] == [0, 1, 2, 3]
+    assert [float(row["step"]) for row in rows] == [7, 8, 10, 11]
+    assert float(rows[-1]["alive"]) == 3
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from evolution.beast import beast as beast_module
+from evolution.beast.beast import Beast
+from evolution.beast.population import COLUMNS, Population
+from evolution.beast.simulate import simulate_beasts
+from evolution.world.snapshot import load_snapshot, save_snapshot
+from evolution.world.state import State
+from evolution.world.world import world
+
+
+def _make_state(num_beasts: int) -> State:
+    beasts = [Beast() for _ in range(num_beasts)]
+    child = Beast(beasts[0].dna.merge(beasts[1].dna), parents=(beasts[0], beasts[1]))
+    beasts[2].stats.fights = 3
+    beasts[2].stats.fights_won = 2
+    beasts[3].dead = 5
+    beasts[3].killed = True
+    return State(beasts=Population(beasts + [child]))
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "world.snapshot")
+    saved = _make_state(20)
+    save_snapshot(path, saved)
+
+    loaded = State()
+    load_snapshot(path, loaded)
+
+    assert len(loaded.beasts) == len(saved.beasts)
+    for name in COLUMNS:
+        np.testing.assert_array_equal(loaded.beasts.column(name), saved.beasts.column(name), err_msg=name)
+
+    for saved_beast, loaded_beast in zip(saved.beasts, loaded.beasts):
+        assert loaded_beast.id == saved_beast.id
+        assert loaded_beast.dna.dna == saved_beast.dna.dna
+        assert loaded_beast.color == saved_beast.color
+        assert loaded_beast.position == saved_beast.position
+        assert str(loaded_beast.stats) == str(saved_beast.stats)
+        for loaded_array, saved_array in zip(loaded_beast.brain.compile()[:3], saved_beast.brain.compile()[:3]):
+            np.testing.assert_array_equal(loaded_array, saved_array)
+    assert loaded.beasts[-1].parent_ids == (saved.beasts[0].id, saved.beasts[1].id)
+    assert beast_module.beast_counter > max(beast.id for beast in loaded.beasts)
+
+
+def test_snapshot_restores_the_size_of_the_world(tmp_path, monkeypatch):
+    monkeypatch.setattr(world, "width", world.width)
+    monkeypatch.setattr(world, "height", world.height)
+    path = str(tmp_path / "world.snapshot")
+    world.resize(1600, 1200)
+    save_snapshot(path, _make_state(5))
+
+    world.resize(900, 900)
+    load_snapshot(path, State())
+    assert world.size == (1600, 1200)
+
+
+def test_loaded_world_can_be_simulated(tmp_path, monkeypatch):
+    path = str(tmp_path / "world.snapshot")
+    save_snapshot(path, _make_state(50))
+
+    loaded = State()
+    load_snapshot(path, loaded)
+    monkeypatch.setattr("evolution.beast.simulate.state", loaded)
+    for _ in range(5):
+        simulate_beasts()
+    assert len(set(beast.id for beast in loaded.beasts)) == len(loaded.beasts)
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "not_a.snapshot"
+    path.write_bytes(b"beasts" * 20)
+    with pytest.raises(ValueError):
+        load_snapshot(str(path), State())